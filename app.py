@@ -1,37 +1,11 @@
 from flask import Flask, render_template, jsonify, request, redirect
 from flask_cors import CORS
-import folium
-import branca
 from database import init_database, get_crime_stats, get_last_fetch_info, get_crimes_list, get_filter_options
 from arrests_database import get_arrest_stats, get_arrests_list, get_arrest_filter_options
-from calls_database import get_calls_stats, get_calls_list, get_calls_filter_options
+from calls_database import get_calls_stats, get_calls_list, get_calls_filter_options, get_response_percentiles
 from insights import get_combined_insights, get_multi_period_insights
-from fetch_data import refresh_crime_data
-from fetch_arrests import refresh_arrests_data
-from fetch_calls import refresh_calls_data
-from scheduler import start_scheduler_thread, scheduled_refresh
-
-def manual_full_refresh():
-    """
-    Fetches ALL available data from all three sources.
-    Used when --refresh flag is provided to populate the entire database.
-    """
-    try:
-        # Fetch ALL crime data
-        refresh_crime_data(fetch_all=True)
-        print("All crime data fetched successfully")
-        
-        # Fetch ALL arrests data
-        refresh_arrests_data(fetch_all=True)
-        print("All arrests data fetched successfully")
-        
-        # Fetch ALL calls for service data
-        refresh_calls_data(fetch_all=True)
-        print("All calls for service data fetched successfully")
-        
-        print("\nAll historical data has been fetched successfully!")
-    except Exception as e:
-        print(f"Error during full data refresh: {e}")
+from refresh_worker import refresh_once
+from zip_geometry import get_zip_topology
 from security import require_api_key, rate_limit, ip_restrict, secure_headers, api_key_manager, get_client_ip
 from datetime import datetime
 import pytz
@@ -159,88 +133,13 @@ def dashboard():
             fetch_dt = pytz.utc.localize(fetch_dt)
         cst_time = fetch_dt.astimezone(CST)
         last_fetch['fetch_date_formatted'] = cst_time.strftime('%B %d, %Y at %I:%M %p CST')
-
-    # Load GeoJSON file
-    with open('static/texas_zip_codes.geojson') as f:
-        geojson_data = json.load(f)
-
-    # Convert stats to a dictionary for faster lookup
-    zip_count_dict = dict(stats['crime_count_zip_codes'])
-
-    # Create a new GeoJSON structure
-    filtered_geojson = {
-        "type": "FeatureCollection",
-        "features": []
-    }
-
-    # Iterate over all features and filter based on zip codes in stats
-    for feature in geojson_data['features']:
-        zip_code = feature['properties']['ZCTA5CE10']
-        if zip_code in zip_count_dict:
-            # Add the count to the properties
-            feature['properties']['count'] = zip_count_dict[zip_code]
-            # Add feature to the new GeoJSON
-            filtered_geojson['features'].append(feature)
-
-    # Optional: print or save the new geojson
-    # print(json.dumps(filtered_geojson, indent=2))
-
-    # create a folium map centered on San Antonio
-    # First, extract counts from filtered_geojson
-    counts = [feature['properties']['count'] for feature in filtered_geojson['features']]
-    min_count = min(counts)
-    max_count = max(counts)
-
-    # Create color scale: green (low) -> red (high)
-    colormap = branca.colormap.LinearColormap(
-        colors=['green', 'yellow', 'red'],
-        vmin=min_count,
-        vmax=max_count,
-        caption='Crime Count by Zip Code'
-    )
-
-    # Create Folium map
-    m = folium.Map(
-        tiles='https://{s}.tile.openstreetmap.fr/hot/{z}/{x}/{y}.png',
-        attr='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors, Tiles style by <a href="https://www.hotosm.org/" target="_blank">Humanitarian OpenStreetMap Team</a> hosted by <a href="https://openstreetmap.fr/" target="_blank">OpenStreetMap France</a>',
-        location=[29.4241, -98.4936],
-        zoom_start=10,
-        scrollWheelZoom=False,
-        dragging=False,
-        min_zoom=10,
-        max_zoom=10
-    )
-
-    # Add GeoJson with dynamic style function
-    folium.GeoJson(
-        filtered_geojson,
-        name="zip-codes",
-        tooltip=folium.features.GeoJsonTooltip(
-            fields=['ZCTA5CE10', 'count'],
-            aliases=["Zip Code:", "Crimes:"],
-            localize=True,
-        ),
-        style_function=lambda feature: {
-            'fillColor': colormap(feature['properties']['count']),
-            'color': 'black',
-            'weight': 0.5,
-            'fillOpacity': 0.6
-        }
-    ).add_to(m)
-
-    # Add color legend to the map
-    colormap.add_to(m)
-    # object to return
-    map_html = m._repr_html_()
-    header = m.get_root().header.render()
-    body_html = m.get_root().html.render()
-    script = m.get_root().script.render()
-
+    
+    # The map is drawn client-side from /api/map/zip-geometry and /api/map/zip-counts;
+    # the geometry URL carries its version so browsers can cache it indefinitely
+    _, zip_geometry_version = get_zip_topology()
+    
     return render_template('dashboard.html',
-                           header=header,
-                           body_html=body_html,
-                           script=script,
-                           map_html=map_html,
+                           zip_geometry_version=zip_geometry_version,
                            stats=stats,
                            last_fetch=last_fetch,
                            category_percentages=category_percentages,
@@ -255,6 +154,32 @@ def dashboard():
                            trend_labels=trend_labels,
                            trend_data=trend_data)
 
+@app.route('/api/map/zip-geometry')
+def api_zip_geometry():
+    # Static per deployment: serialized once per process and served as-is
+    body, etag = get_zip_topology()
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response.make_conditional(request)
+
+@app.route('/api/map/zip-counts')
+@rate_limit(max_requests=100, window=60)
+def api_zip_counts():
+    # Get days parameter (default to 30)
+    days = request.args.get('days', 30, type=int)
+    if days not in [30, 60, 90]:
+        days = 30
+    
+    stats = get_crime_stats(days)
+    
+    response = jsonify({
+        'days': days,
+        'counts': dict(stats['crime_count_zip_codes'])
+    })
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
 @app.route('/api/stats')
 @require_api_key
 @rate_limit(max_requests=100, window=60)
@@ -277,6 +202,30 @@ def api_stats():
         'daily_trend': [{'date': d, 'count': c} for d, c in stats['daily_trend']]
     })
 
+@app.route('/api/calls/response-times')
+@require_api_key
+@rate_limit(max_requests=100, window=60)
+def api_call_response_times():
+    # Get days parameter (default to 30)
+    days = request.args.get('days', 30, type=int)
+    if days not in [7, 30, 60, 90]:
+        days = 30
+    
+    percentiles = get_response_percentiles(days)
+    
+    def row(name, key, calls, p50, p90, p99):
+        return {name: key, 'calls': calls, 'p50': p50, 'p90': p90, 'p99': p99}
+    
+    return jsonify({
+        'days': days,
+        'calls': percentiles['calls'],
+        'p50': percentiles['p50'],
+        'p90': percentiles['p90'],
+        'p99': percentiles['p99'],
+        'by_priority': [row('priority', *r) for r in percentiles['by_priority']],
+        'by_area': [row('area', *r) for r in percentiles['by_area']]
+    })
+
 @app.route('/crimes')
 def crimes_list():
     # Get query parameters
@@ -307,7 +256,8 @@ def crimes_list():
         filters['search'] = search
     
     # Get crimes and filter options
-    result = get_crimes_list(page=page, per_page=100, filters=filters)
+    result = get_crimes_list(page=page, per_page=100, filters=filters,
+                             after=request.args.get('cursor'))
     filter_options = get_filter_options()
     
     # Calculate pagination range
@@ -320,6 +270,7 @@ def crimes_list():
                          total=result['total'],
                          page=result['page'],
                          total_pages=result['total_pages'],
+                         next_cursor=result['next_cursor'],
                          filters=filters,
                          filter_options=filter_options,
                          page_range=page_range,
@@ -340,7 +291,11 @@ def api_crimes():
         if value:
             filters[key] = value
     
-    result = get_crimes_list(page=page, per_page=per_page, filters=filters)
+    # Keyset pagination: pass back next_cursor as ?cursor= to walk the full set
+    # without deep OFFSET scans; include_total=0 skips the COUNT entirely
+    result = get_crimes_list(page=page, per_page=per_page, filters=filters,
+                             after=request.args.get('cursor'),
+                             include_total=request.args.get('include_total', '1') != '0')
     
     # Convert to JSON-friendly format
     crimes_data = []
@@ -360,7 +315,8 @@ def api_crimes():
         'total': result['total'],
         'page': result['page'],
         'per_page': result['per_page'],
-        'total_pages': result['total_pages']
+        'total_pages': result['total_pages'],
+        'next_cursor': result['next_cursor']
     })
 
 @app.route('/arrests-dashboard')
@@ -451,7 +407,8 @@ def arrests_list():
         filters['search'] = search
     
     # Get arrests and filter options
-    result = get_arrests_list(page=page, per_page=100, filters=filters)
+    result = get_arrests_list(page=page, per_page=100, filters=filters,
+                              after=request.args.get('cursor'))
     filter_options = get_arrest_filter_options()
     
     # Calculate pagination range
@@ -464,6 +421,7 @@ def arrests_list():
                          total=result['total'],
                          page=result['page'],
                          total_pages=result['total_pages'],
+                         next_cursor=result['next_cursor'],
                          filters=filters,
                          filter_options=filter_options,
                          days=days,
@@ -484,7 +442,11 @@ def api_arrests():
         if value:
             filters[key] = value
     
-    result = get_arrests_list(page=page, per_page=per_page, filters=filters)
+    # Keyset pagination: pass back next_cursor as ?cursor= to walk the full set
+    # without deep OFFSET scans; include_total=0 skips the COUNT entirely
+    result = get_arrests_list(page=page, per_page=per_page, filters=filters,
+                              after=request.args.get('cursor'),
+                              include_total=request.args.get('include_total', '1') != '0')
     
     # Convert to JSON-friendly format
     arrests_data = []
@@ -505,7 +467,8 @@ def api_arrests():
         'total': result['total'],
         'page': result['page'],
         'per_page': result['per_page'],
-        'total_pages': result['total_pages']
+        'total_pages': result['total_pages'],
+        'next_cursor': result['next_cursor']
     })
 
 @app.route('/calls-dashboard')
@@ -602,7 +565,8 @@ def calls_list():
         filters['search'] = search
     
     # Get calls and filter options
-    result = get_calls_list(page=page, per_page=100, filters=filters)
+    result = get_calls_list(page=page, per_page=100, filters=filters,
+                            after=request.args.get('cursor'))
     filter_options = get_calls_filter_options()
     
     # Calculate pagination range
@@ -615,6 +579,7 @@ def calls_list():
                          total=result['total'],
                          page=result['page'],
                          total_pages=result['total_pages'],
+                         next_cursor=result['next_cursor'],
                          filters=filters,
                          filter_options=filter_options,
                          page_range=page_range,
@@ -667,7 +632,11 @@ def api_calls():
         if value:
             filters[key] = value
     
-    result = get_calls_list(page=page, per_page=per_page, filters=filters)
+    # Keyset pagination: pass back next_cursor as ?cursor= to walk the full set
+    # without deep OFFSET scans; include_total=0 skips the COUNT entirely
+    result = get_calls_list(page=page, per_page=per_page, filters=filters,
+                            after=request.args.get('cursor'),
+                            include_total=request.args.get('include_total', '1') != '0')
     
     # Convert to JSON-friendly format
     calls_data = []
@@ -690,7 +659,8 @@ def api_calls():
         'total': result['total'],
         'page': result['page'],
         'per_page': result['per_page'],
-        'total_pages': result['total_pages']
+        'total_pages': result['total_pages'],
+        'next_cursor': result['next_cursor']
     })
 
 if __name__ == '__main__':
@@ -704,8 +674,9 @@ if __name__ == '__main__':
         print("\n========================================")
         print("MANUAL REFRESH TRIGGERED - FETCHING ALL DATA")
         print("========================================")
-        # Fetch ALL available data when manually refreshing
-        manual_full_refresh()
+        # Fetch ALL available data when manually refreshing; --resume
+        # continues an interrupted refresh from its checkpoints
+        refresh_once(full=True, resume='--resume' in sys.argv)
         print("========================================\n")
     else:
         # Check if database is empty and inform user
@@ -722,8 +693,8 @@ if __name__ == '__main__':
         if calls_stats['total_calls'] == 0:
             print("Note: Calls database is empty. Use './run.sh --refresh' to fetch data.")
     
-    # Start the scheduler for daily updates
-    start_scheduler_thread()
+    # Daily updates run in the refresh worker (python refresh_worker.py),
+    # never inside the web server
     
     # Determine if we're in production based on environment
     is_production = os.environ.get('FLASK_ENV') == 'production' or os.environ.get('DOCKER_CONTAINER')
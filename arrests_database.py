@@ -1,217 +1,268 @@
-import sqlite3
 from datetime import datetime
 import os
-from config import DB_PATH
+from pagination import encode_cursor, decode_cursor, cached_count
+from ingest import bulk_insert, report_rejects
+from connections import get_read_connection, writer
+from columnar import ColumnarTable, by_count, by_key, contains
+from result_cache import memoized
+from database import get_data_version
+from compact_storage import (CompactTable, plain, label, day, init_labels, day_text,
+                             label_id_sql, search_labels, day_number_sql, checked_date,
+                             LISTED_ZIP_CODES)
+
+# arrests is a view over arrest_records, which stores label ids and day numbers
+ARREST_TABLE = CompactTable('arrests', 'arrest_records', [
+    plain('report_id'),
+    day('report_date', 'report_epoch_day'),
+    plain('person_id'),
+    label('offense'),
+    label('severity'),
+    label('service_area'),
+    label('report_month'),
+    label('zip_code'),
+    plain('datetime_occurred'),
+])
 
 def init_arrests_table():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS arrests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            report_id TEXT UNIQUE NOT NULL,
-            report_date DATE NOT NULL,
-            person_id TEXT NOT NULL,
-            offense TEXT NOT NULL,
-            severity TEXT NOT NULL,
-            service_area TEXT NOT NULL,
-            report_month TEXT,
-            zip_code TEXT,
-            datetime_occurred TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_arrests_report_date ON arrests(report_date);
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_arrests_offense ON arrests(offense);
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_arrests_service_area ON arrests(service_area);
-    ''')
+    with writer() as conn:
+        cursor = conn.cursor()
+        
+        init_labels(cursor)
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS arrest_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                report_id TEXT UNIQUE NOT NULL,
+                report_epoch_day INTEGER NOT NULL,
+                person_id TEXT NOT NULL,
+                offense_id INTEGER NOT NULL,
+                severity_id INTEGER NOT NULL,
+                service_area_id INTEGER NOT NULL,
+                report_month_id INTEGER,
+                zip_code_id INTEGER,
+                datetime_occurred TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Databases created before compact storage have an arrests table
+        ARREST_TABLE.migrate(conn)
+        ARREST_TABLE.create_view(cursor)
+        ARREST_TABLE.init_label_counts(cursor)
+        
+        # Matches the list views' ORDER BY so keyset pages are index seeks
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_arrest_records_day_id ON arrest_records(report_epoch_day, report_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_arrest_records_offense ON arrest_records(offense_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_arrest_records_area ON arrest_records(service_area_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_arrest_records_severity ON arrest_records(severity_id);
+        ''')
+
+ARREST_COLUMNS = (
+    'report_id', 'report_date', 'person_id', 'offense',
+    'severity', 'service_area', 'report_month', 'zip_code', 'datetime_occurred'
+)
+
+def arrest_record_to_row(record):
+    return (
+        record['Report_ID'],
+        checked_date(record['Report_Date']),
+        record['Person'],
+        record['Offense'],
+        record['Severity'],
+        record['Service_Area'],
+        record.get('Report_Month', ''),
+        record.get('Zip_Code', 'Unknown'),
+        record.get('DateTime', record['Report_Date'])
+    )
+
+def insert_arrest_records(records, rejects=None):
+    if rejects is None:
+        rejects = []
     
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_arrests_severity ON arrests(severity);
-    ''')
+    with writer() as conn:
+        inserted_count = bulk_insert(conn, ARREST_TABLE, ARREST_COLUMNS, records,
+                                     arrest_record_to_row, rejects)
+    report_rejects(rejects, 'arrest')
     
-    conn.commit()
-    conn.close()
+    return inserted_count
 
-def insert_arrest_records(records):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Recent arrests held in memory for get_arrest_stats and the insights
+arrest_window = ColumnarTable('arrest_records', 'report_epoch_day', labels={
+    'offense': 'offense_id',
+    'severity': 'severity_id',
+    'service_area': 'service_area_id',
+    'zip_code': 'zip_code_id',
+})
+
+def _columnar_arrest_stats(days):
+    window = arrest_window.window(days)
+    if window is None:
+        return None
     
-    inserted_count = 0
-    for record in records:
-        try:
-            cursor.execute('''
-                INSERT OR IGNORE INTO arrests (
-                    report_id, report_date, person_id, offense,
-                    severity, service_area, report_month, zip_code, datetime_occurred
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                record['Report_ID'],
-                record['Report_Date'],
-                record['Person'],
-                record['Offense'],
-                record['Severity'],
-                record['Service_Area'],
-                record.get('Report_Month', ''),
-                record.get('Zip_Code', 'Unknown'),
-                record.get('DateTime', record['Report_Date'])
-            ))
-            if cursor.rowcount > 0:
-                inserted_count += 1
-        except Exception as e:
-            print(f"Error inserting arrest record {record.get('Report_ID')}: {e}")
+    listed_zips = window.matching(
+        'zip_code', lambda zip_code: zip_code is not None
+        and not contains(zip_code, 'Out of') and zip_code != 'Unknown')
+    felonies = window.matching('severity', lambda severity: contains(severity, 'Felony'))
     
-    conn.commit()
-    conn.close()
-    return inserted_count
+    return {
+        'total_arrests': window.total(),
+        'arrests_by_offense': by_count(window.counts('offense'), 10),
+        'arrests_by_severity': by_count(window.counts('severity')),
+        'arrests_by_area': by_count(window.counts('service_area')),
+        'top_zip_codes': by_count(window.counts('zip_code', listed_zips), 10),
+        'daily_trend': [(day_text(day), count) for day, count in by_key(window.counts('day'))],
+        'felony_arrests': window.total(felonies)
+    }
 
 def get_arrest_stats(days=30):
-    conn = sqlite3.connect(DB_PATH)
+    stats = _columnar_arrest_stats(days)
+    if stats is not None:
+        return stats
+    
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     stats = {}
     
-    # Get the most recent date in the database
-    cursor.execute('SELECT MAX(report_date) FROM arrests')
-    max_date_result = cursor.fetchone()
+    # First day of the window ending on the most recent date in the database
+    cursor.execute('SELECT MAX(report_epoch_day) - ? FROM arrests', (days-1,))
+    window_start = cursor.fetchone()[0]
     
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         # Calculate date range based on most recent data
         cursor.execute('''
             SELECT COUNT(*) FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-        ''', (max_date_result[0], days-1))
+            WHERE report_epoch_day >= ?
+        ''', (window_start,))
     else:
         cursor.execute('SELECT COUNT(*) FROM arrests')
     
     stats['total_arrests'] = cursor.fetchone()[0]
     
     # Arrests by offense type
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT offense, COUNT(*) as count 
             FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY offense 
+            WHERE report_epoch_day >= ?
+            GROUP BY offense_id 
             ORDER BY count DESC 
             LIMIT 10
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT offense, COUNT(*) as count 
             FROM arrests 
-            GROUP BY offense 
+            GROUP BY offense_id 
             ORDER BY count DESC 
             LIMIT 10
         ''')
     stats['arrests_by_offense'] = cursor.fetchall()
     
     # Arrests by severity
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT severity, COUNT(*) as count 
             FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY severity 
+            WHERE report_epoch_day >= ?
+            GROUP BY severity_id 
             ORDER BY count DESC
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT severity, COUNT(*) as count 
             FROM arrests 
-            GROUP BY severity 
+            GROUP BY severity_id 
             ORDER BY count DESC
         ''')
     stats['arrests_by_severity'] = cursor.fetchall()
     
     # Arrests by service area
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT service_area, COUNT(*) as count 
             FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY service_area 
+            WHERE report_epoch_day >= ?
+            GROUP BY service_area_id 
             ORDER BY count DESC
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT service_area, COUNT(*) as count 
             FROM arrests 
-            GROUP BY service_area 
+            GROUP BY service_area_id 
             ORDER BY count DESC
         ''')
     stats['arrests_by_area'] = cursor.fetchall()
     
     # Top zip codes
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT zip_code, COUNT(*) as count 
             FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND zip_code NOT LIKE '%Out of%' 
-            AND zip_code != 'Unknown'
-            GROUP BY zip_code 
+            WHERE report_epoch_day >= ?
+            AND zip_code_id IN (SELECT id FROM labels WHERE value NOT LIKE '%Out of%' AND value != 'Unknown')
+            GROUP BY zip_code_id 
             ORDER BY count DESC 
             LIMIT 10
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT zip_code, COUNT(*) as count 
             FROM arrests 
-            WHERE zip_code NOT LIKE '%Out of%' 
-            AND zip_code != 'Unknown'
-            GROUP BY zip_code 
+            WHERE zip_code_id IN (SELECT id FROM labels WHERE value NOT LIKE '%Out of%' AND value != 'Unknown')
+            GROUP BY zip_code_id 
             ORDER BY count DESC 
             LIMIT 10
         ''')
     stats['top_zip_codes'] = cursor.fetchall()
     
     # Daily trend
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT report_date, COUNT(*) as count 
             FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY report_date 
-            ORDER BY report_date
-        ''', (max_date_result[0], days-1))
+            WHERE report_epoch_day >= ?
+            GROUP BY report_epoch_day 
+            ORDER BY report_epoch_day
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT report_date, COUNT(*) as count 
             FROM arrests 
-            GROUP BY report_date 
-            ORDER BY report_date
+            GROUP BY report_epoch_day 
+            ORDER BY report_epoch_day
         ''')
     stats['daily_trend'] = cursor.fetchall()
     
     # Felony arrests count
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT COUNT(*) FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND severity LIKE '%Felony%'
-        ''', (max_date_result[0], days-1))
+            WHERE report_epoch_day >= ?
+            AND severity_id IN (SELECT id FROM labels WHERE value LIKE '%Felony%')
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT COUNT(*) FROM arrests 
-            WHERE severity LIKE '%Felony%'
+            WHERE severity_id IN (SELECT id FROM labels WHERE value LIKE '%Felony%')
         ''')
     stats['felony_arrests'] = cursor.fetchone()[0]
     
-    conn.close()
     return stats
 
-def get_arrests_list(page=1, per_page=100, filters=None):
-    conn = sqlite3.connect(DB_PATH)
+def get_arrests_list(page=1, per_page=100, filters=None, after=None, include_total=True):
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     # Base query
@@ -226,92 +277,79 @@ def get_arrests_list(page=1, per_page=100, filters=None):
     # Apply filters
     if filters:
         if filters.get('offense'):
-            query += ' AND offense = ?'
+            query += f' AND offense_id = {label_id_sql("?")}'
             params.append(filters['offense'])
         
         if filters.get('severity'):
-            query += ' AND severity = ?'
+            query += f' AND severity_id = {label_id_sql("?")}'
             params.append(filters['severity'])
-            
+        
         if filters.get('service_area'):
-            query += ' AND service_area = ?'
+            query += f' AND service_area_id = {label_id_sql("?")}'
             params.append(filters['service_area'])
         
         if filters.get('zip_code'):
-            query += ' AND zip_code = ?'
+            query += f' AND zip_code_id = {label_id_sql("?")}'
             params.append(filters['zip_code'])
         
         if filters.get('date_from'):
-            query += ' AND report_date >= ?'
+            query += f' AND report_epoch_day >= {day_number_sql("?")}'
             params.append(filters['date_from'])
         
         if filters.get('date_to'):
-            query += ' AND report_date <= ?'
+            query += f' AND report_epoch_day <= {day_number_sql("?")}'
             params.append(filters['date_to'])
         
         if filters.get('search'):
-            query += ' AND offense LIKE ?'
-            search_term = f'%{filters["search"]}%'
+            matching, search_term = search_labels(filters['search'], 'arrests', ('offense',))
+            query += f' AND offense_id IN {matching}'
             params.append(search_term)
     
-    # Count total records
-    count_query = f'SELECT COUNT(*) FROM ({query})'
-    cursor.execute(count_query, params)
-    total_count = cursor.fetchone()[0]
+    # Count total records (cached until new rows arrive; optional for API clients)
+    total_count = cached_count(cursor, 'arrests', query, params) if include_total else None
+    
+    # Seek past the previous page's last row when a cursor is given,
+    # otherwise fall back to offset pagination
+    sort_key = decode_cursor(after)
+    if sort_key:
+        query += f' AND (report_epoch_day, report_id) < ({day_number_sql("?")}, ?)'
+        params.extend(sort_key)
     
     # Add ordering and pagination
-    query += ' ORDER BY report_date DESC, report_id DESC'
-    query += ' LIMIT ? OFFSET ?'
-    params.extend([per_page, (page - 1) * per_page])
+    query += ' ORDER BY report_epoch_day DESC, report_id DESC'
+    if sort_key:
+        query += ' LIMIT ?'
+        params.append(per_page)
+    else:
+        query += ' LIMIT ? OFFSET ?'
+        params.extend([per_page, (page - 1) * per_page])
     
     cursor.execute(query, params)
     arrests = cursor.fetchall()
     
-    conn.close()
+    # Cursor for the following page, encoding the last row's sort key
+    next_cursor = encode_cursor((arrests[-1][1], arrests[-1][0])) if len(arrests) == per_page else None
     
     return {
         'arrests': arrests,
         'total': total_count,
         'page': page,
         'per_page': per_page,
-        'total_pages': (total_count + per_page - 1) // per_page
+        'total_pages': (total_count + per_page - 1) // per_page if total_count is not None else None,
+        'next_cursor': next_cursor
     }
 
 def get_arrest_filter_options():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get unique offenses (top 50 most common)
-    cursor.execute('''
-        SELECT offense, COUNT(*) as count 
-        FROM arrests 
-        GROUP BY offense 
-        ORDER BY count DESC 
-        LIMIT 50
-    ''')
-    offenses = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique severities
-    cursor.execute('SELECT DISTINCT severity FROM arrests ORDER BY severity')
-    severities = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique service areas
-    cursor.execute('SELECT DISTINCT service_area FROM arrests ORDER BY service_area')
-    service_areas = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique zip codes
-    cursor.execute('''
-        SELECT DISTINCT zip_code FROM arrests 
-        WHERE zip_code NOT LIKE '%Out of%' AND zip_code != 'Unknown'
-        ORDER BY zip_code
-    ''')
-    zip_codes = [row[0] for row in cursor.fetchall()]
-    
-    conn.close()
+    """Dropdown values for the arrests list, from label_counts and cached per data version"""
+    return memoized('arrest_filter_options', get_data_version(), _arrest_filter_options)
+
+def _arrest_filter_options():
+    cursor = get_read_connection().cursor()
     
     return {
-        'offenses': offenses,
-        'severities': severities,
-        'service_areas': service_areas,
-        'zip_codes': zip_codes
+        # Top 50 most common
+        'offenses': ARREST_TABLE.label_values(cursor, 'offense', by_count=True, limit=50),
+        'severities': ARREST_TABLE.label_values(cursor, 'severity'),
+        'service_areas': ARREST_TABLE.label_values(cursor, 'service_area'),
+        'zip_codes': ARREST_TABLE.label_values(cursor, 'zip_code', LISTED_ZIP_CODES)
     }
\ No newline at end of file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the columnar analytics engine behind get_calls_stats.
+
+Loads synthetic calls for service into a scratch database and times
+get_calls_stats with ANALYTICS_ENGINE set to 'sql' (one table scan per
+breakdown) and 'numpy' (vectorized counts over the in-memory copy), then
+times the incremental refresh after a batch of new calls arrives.
+
+Usage:
+    python benchmarks/bench_columnar.py [calls] [repeats]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+
+DAYS = 120
+WINDOWS = (7, 30, 90)
+PROBLEMS = ['DISTURBANCE', 'ALARM', 'ACCIDENT', 'SUSPICIOUS PERSON', 'THEFT REPORT',
+            'WELFARE CHECK', 'NOISE', 'TRAFFIC HAZARD']
+AREAS = ['CENTRAL', 'EAST', 'NORTH', 'NORTHEAST', 'PRUE', 'SOUTH', 'WEST']
+ZIPS = [f'782{n:02d}' for n in range(1, 60)] + ['Out of Town', 'Unknown']
+
+def make_calls(count, first=0):
+    newest = datetime(2025, 6, 30)
+    records = []
+    for n in range(first, first + count):
+        day = newest - timedelta(days=random.randrange(DAYS), seconds=random.randrange(86400))
+        records.append({
+            'Master_Incident_Number': f'B{n:09d}',
+            'Response_Date': day.strftime('%Y-%m-%d %H:%M:%S'),
+            'Priority': random.choice(['1', '2', '3', '4']),
+            'Problem': random.choice(PROBLEMS),
+            'Type': random.choice(['Emergency', 'Non-Emergency']),
+            'Service_Area': random.choice(AREAS),
+            'Seconds': random.choice([None, 0, random.randrange(60, 5000)]),
+            'Disposition_Type': random.choice(['', 'REPORT', 'NO REPORT', 'ARREST']),
+            'Postal_Code': random.choice(ZIPS)
+        })
+    return records
+
+def timed(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats, result
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = os.path.join(tmp, 'crime_data.db')
+        import columnar
+        import calls_database
+        
+        calls_database.init_calls_table()
+        calls_database.insert_call_records(make_calls(calls))
+        
+        if not columnar.engine_enabled():
+            print("NumPy is not installed; only the SQL engine is available")
+            return
+        
+        start = time.perf_counter()
+        calls_database.calls_window.refresh()
+        print(f"Initial load of {len(calls_database.calls_window.codes['day'])} calls: "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms\n")
+        
+        for days in WINDOWS:
+            columnar.ANALYTICS_ENGINE = 'sql'
+            sql_time, sql_stats = timed(lambda: calls_database.get_calls_stats(days), repeats)
+            columnar.ANALYTICS_ENGINE = 'numpy'
+            numpy_time, numpy_stats = timed(lambda: calls_database.get_calls_stats(days), repeats)
+            same = sql_stats['total_calls'] == numpy_stats['total_calls']
+            print(f"{days:>3} days  sql {sql_time * 1000:7.1f} ms  numpy {numpy_time * 1000:7.1f} ms  "
+                  f"({sql_time / numpy_time:4.1f}x)  totals match: {same}")
+        
+        calls_database.insert_call_records(make_calls(1000, first=calls))
+        start = time.perf_counter()
+        calls_database.calls_window.refresh()
+        print(f"\nIncremental refresh after 1000 new calls: "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the compact storage schema of calls_for_service.
+
+Loads synthetic calls for service into a scratch database (label ids and
+day numbers in call_records behind the calls_for_service view), copies the
+decoded rows into a plain TEXT-column table with the previous indexes, and
+compares the two files' sizes and the time of the grouped counts and
+filtered list pages the dashboard runs.
+
+Usage:
+    python benchmarks/bench_compact_storage.py [calls] [repeats]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+
+DAYS = 365
+PROBLEMS = ['DISTURBANCE', 'ALARM', 'ACCIDENT', 'SUSPICIOUS PERSON', 'THEFT REPORT',
+            'WELFARE CHECK', 'NOISE', 'TRAFFIC HAZARD']
+AREAS = ['CENTRAL', 'EAST', 'NORTH', 'NORTHEAST', 'PRUE', 'SOUTH', 'WEST']
+ZIPS = [f'782{n:02d}' for n in range(1, 60)] + ['Out of Town', 'Unknown']
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+TEXT_INDEXES = [
+    'response_day', 'response_date, incident_number', 'problem',
+    'service_area', 'priority', 'call_type'
+]
+
+def make_calls(count):
+    newest = datetime(2025, 6, 30)
+    records = []
+    for n in range(count):
+        day = newest - timedelta(days=random.randrange(DAYS), seconds=random.randrange(86400))
+        records.append({
+            'Master_Incident_Number': f'B{n:09d}',
+            'Response_Date': day.strftime('%Y-%m-%d %H:%M:%S'),
+            'Priority': random.choice(['1', '2', '3', '4']),
+            'Problem': random.choice(PROBLEMS),
+            'Type': random.choice(['Emergency', 'Non-Emergency']),
+            'Service_Area': random.choice(AREAS),
+            'Seconds': random.choice([None, 0, random.randrange(60, 5000)]),
+            'Weekday': WEEKDAYS[day.weekday()],
+            'Disposition_Groups': random.choice(['Report Taken', 'No Report', 'Cancelled']),
+            'Disposition_Type': random.choice(['', 'REPORT', 'NO REPORT', 'ARREST']),
+            'Postal_Code': random.choice(ZIPS)
+        })
+    return records
+
+def copy_as_text(compact_path, text_path):
+    """The decoded rows in a TEXT-column table with the pre-compact indexes"""
+    conn = sqlite3.connect(text_path)
+    conn.execute('ATTACH DATABASE ? AS compact', (compact_path,))
+    conn.execute('''
+        CREATE TABLE calls_for_service AS
+        SELECT id, incident_number, response_date, priority, problem, service_area,
+               call_type, response_seconds, weekday, disposition_group,
+               disposition_type, postal_code, created_at, response_day, response_hour
+        FROM compact.calls_for_service
+    ''')
+    conn.commit()
+    conn.execute('DETACH DATABASE compact')
+    for n, columns in enumerate(TEXT_INDEXES):
+        conn.execute(f'CREATE INDEX idx_text_{n} ON calls_for_service({columns})')
+    conn.commit()
+    return conn
+
+def timed(conn, sql, params, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        rows = conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / repeats, rows
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = os.path.join(tmp, 'crime_data.db')
+        import calls_database
+        from compact_storage import label_id_sql, day_number_sql
+        
+        calls_database.init_calls_table()
+        calls_database.insert_call_records(make_calls(calls))
+        
+        compact = sqlite3.connect(config.DB_PATH)
+        compact.execute('VACUUM')
+        text = copy_as_text(config.DB_PATH, os.path.join(tmp, 'text.db'))
+        text.execute('VACUUM')
+        
+        compact_size = os.path.getsize(config.DB_PATH)
+        text_size = os.path.getsize(os.path.join(tmp, 'text.db'))
+        print(f"{calls} calls: text {text_size / 1e6:.1f} MB, compact {compact_size / 1e6:.1f} MB "
+              f"({compact_size / text_size:.0%})\n")
+        
+        newest = text.execute('SELECT MAX(response_day) FROM calls_for_service').fetchone()[0]
+        queries = [
+            ('problems, last 30 days',
+             "SELECT problem, COUNT(*) FROM calls_for_service "
+             "WHERE response_day >= date(?, '-29 days') GROUP BY problem", (newest,),
+             f"SELECT problem, COUNT(*) FROM calls_for_service "
+             f"WHERE response_epoch_day >= {day_number_sql('?')} - 29 GROUP BY problem_id", (newest,)),
+            ('areas, last 365 days',
+             "SELECT service_area, COUNT(*) FROM calls_for_service "
+             "WHERE response_day >= date(?, '-364 days') GROUP BY service_area", (newest,),
+             f"SELECT service_area, COUNT(*) FROM calls_for_service "
+             f"WHERE response_epoch_day >= {day_number_sql('?')} - 364 GROUP BY service_area_id", (newest,)),
+            ('list page, one area',
+             "SELECT incident_number, problem, priority FROM calls_for_service WHERE service_area = ? "
+             "ORDER BY response_date DESC, incident_number DESC LIMIT 50", ('PRUE',),
+             f"SELECT incident_number, problem, priority FROM calls_for_service WHERE service_area_id = {label_id_sql('?')} "
+             f"ORDER BY response_date DESC, incident_number DESC LIMIT 50", ('PRUE',)),
+            ('count, one problem and month',
+             "SELECT COUNT(*) FROM calls_for_service WHERE problem = ? "
+             "AND response_day BETWEEN '2025-03-01' AND '2025-03-31'", ('ALARM',),
+             f"SELECT COUNT(*) FROM calls_for_service WHERE problem_id = {label_id_sql('?')} "
+             f"AND response_epoch_day BETWEEN {day_number_sql(repr('2025-03-01'))} "
+             f"AND {day_number_sql(repr('2025-03-31'))}", ('ALARM',)),
+        ]
+        
+        for name, text_sql, text_params, compact_sql, compact_params in queries:
+            text_time, text_rows = timed(text, text_sql, text_params, repeats)
+            compact_time, compact_rows = timed(compact, compact_sql, compact_params, repeats)
+            same = sorted(map(tuple, text_rows)) == sorted(map(tuple, compact_rows))
+            print(f"{name:<30} text {text_time * 1000:7.1f} ms  compact {compact_time * 1000:7.1f} ms  "
+                  f"({text_time / compact_time:4.1f}x)  same rows: {same}")
+        
+        compact.close()
+        text.close()
+
+if __name__ == "__main__":
+    main()
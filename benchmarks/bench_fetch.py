@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the fetch engine, offline, against the stand-in CKAN server.
+
+Starts benchmarks/ckan_server.py in its own process with a fixed latency
+per request, then in a fresh process per run:
+- pages through every crime record (fetch and JSON decode only) at
+  several FETCH_MAX_IN_FLIGHT settings, reporting pages and records per
+  second, the most requests the server saw at once and peak memory;
+- runs a full refresh of all three sources into a scratch database while
+  recording the pages (FETCH_CACHE_MODE=record), then again from the
+  recording with the server out of the picture (FETCH_CACHE_MODE=replay).
+
+Usage:
+    python benchmarks/bench_fetch.py [records] [latency]
+"""
+
+import json
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+IN_FLIGHT = (1, 2, 4, 8)
+
+def serve(records, latency, port_queue):
+    from ckan_server import start_server
+    server = start_server(records=records, latency=latency)
+    port_queue.put(server.server_address[1])
+    while True:
+        time.sleep(3600)
+
+def server_stats(url, reset=False):
+    stats_url = url.split('/api/')[0] + '/_stats' + ('?reset=1' if reset else '')
+    with urlopen(stats_url) as response:
+        return json.load(response)
+
+def run(job, settings, results):
+    """One measured run in a fresh process, so imports pick up the settings and RSS is its own"""
+    # Silence the fetchers' per-page progress output
+    sys.stdout = open(os.devnull, 'w')
+    
+    import config
+    for name, value in settings.items():
+        setattr(config, name, value)
+    import fetch_data
+    from fetch_arrests import refresh_arrests_data
+    from fetch_calls import refresh_calls_data
+    from fetch_engine import run_concurrently
+    
+    start = time.perf_counter()
+    pages = records = 0
+    if job == 'fetch':
+        for _, page in fetch_data.fetch_all_crime_data(fetch_all=True):
+            pages += 1
+            records += len(page)
+    else:
+        run_concurrently([
+            ('crime', lambda: fetch_data.refresh_crime_data(fetch_all=True)),
+            ('arrests', lambda: refresh_arrests_data(fetch_all=True)),
+            ('calls for service', lambda: refresh_calls_data(fetch_all=True)),
+        ])
+        conn = sqlite3.connect(config.DB_PATH)
+        records = sum(conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ('crimes', 'arrests', 'calls_for_service'))
+    elapsed = time.perf_counter() - start
+    
+    # ru_maxrss is in kilobytes on Linux
+    results.put((elapsed, pages, records, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+def measure(context, job, settings):
+    results = context.Queue()
+    process = context.Process(target=run, args=(job, settings, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    
+    context = multiprocessing.get_context('spawn')
+    port_queue = context.Queue()
+    server = context.Process(target=serve, args=(records, latency, port_queue), daemon=True)
+    server.start()
+    url = f'http://127.0.0.1:{port_queue.get()}/api/3/action/datastore_search'
+    
+    print(f"{records} records per resource, {latency * 1000:.0f} ms per request\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Crime pages, fetch and decode only:")
+        for in_flight in IN_FLIGHT:
+            server_stats(url, reset=True)
+            elapsed, pages, fetched, rss = measure(context, 'fetch', {
+                'DB_PATH': os.path.join(tmp, 'unused.db'),
+                'FETCH_API_URL': url,
+                'FETCH_MAX_IN_FLIGHT': in_flight,
+                'FETCH_REQUESTS_PER_SECOND': 0,
+            })
+            stats = server_stats(url)
+            print(f"  {in_flight} in flight  {elapsed:6.2f} s  {pages / elapsed:6.1f} pages/s  "
+                  f"{fetched / elapsed:8.0f} records/s  server saw {stats['max_in_flight']} at once  "
+                  f"peak RSS {rss:.0f} MB")
+        
+        print("\nFull refresh of all three sources into a scratch database:")
+        for mode in ('record', 'replay'):
+            server_stats(url, reset=True)
+            elapsed, _, stored, rss = measure(context, 'refresh', {
+                'DB_PATH': os.path.join(tmp, f'{mode}.db'),
+                'FETCH_API_URL': url,
+                'FETCH_REQUESTS_PER_SECOND': 0,
+                'FETCH_CACHE_MODE': mode,
+                'FETCH_CACHE_DIR': os.path.join(tmp, 'fetch_cache'),
+            })
+            stats = server_stats(url)
+            print(f"  {mode:<7} {elapsed:6.2f} s  {stored} records stored  "
+                  f"{stats['served']} server requests  peak RSS {rss:.0f} MB")
+        
+        cache_size = sum(os.path.getsize(os.path.join(root, name))
+                         for root, _, names in os.walk(os.path.join(tmp, 'fetch_cache')) for name in names)
+        print(f"  recording: {cache_size / 1e6:.1f} MB compressed")
+
+if __name__ == "__main__":
+    main()
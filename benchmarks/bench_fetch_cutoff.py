@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the per-page day cutoff check in the fetch loops.
+
+Compares the running DayCounter used by fetch_all_*_data against the
+previous approach of rebuilding sorted(set(...)) over every accumulated
+record on each page. The DayCounter's per-page cost should stay flat as
+the page count grows; the old approach grows linearly per page.
+
+Usage:
+    python benchmarks/bench_fetch_cutoff.py [pages]
+"""
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fetch_engine import DayCounter
+
+RECORDS_PER_PAGE = 1000
+RECORDS_PER_DAY = 350
+# Never reached, so every page pays the full check
+DAYS = 100000
+
+def make_pages(pages):
+    """Synthetic newest-first pages of records with a Report_Date"""
+    newest = date(2025, 6, 30)
+    result = []
+    for page in range(pages):
+        records = []
+        for i in range(RECORDS_PER_PAGE):
+            n = page * RECORDS_PER_PAGE + i
+            day = newest - timedelta(days=n // RECORDS_PER_DAY)
+            records.append({'Report_ID': str(n), 'Report_Date': day.isoformat()})
+        result.append(records)
+    return result
+
+def time_day_counter(pages):
+    counter = DayCounter(DAYS)
+    timings = []
+    for records in pages:
+        start = time.perf_counter()
+        counter.add(r.get('Report_Date') for r in records)
+        counter.cutoff()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def time_rescan(pages):
+    all_records = []
+    timings = []
+    for records in pages:
+        start = time.perf_counter()
+        all_records.extend(records)
+        dates = sorted(set(r['Report_Date'] for r in all_records if 'Report_Date' in r), reverse=True)
+        len(dates) >= DAYS
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pages = make_pages(page_count)
+    
+    counter_timings = time_day_counter(pages)
+    rescan_timings = time_rescan(pages)
+    
+    print(f"{'page':>6} {'DayCounter (ms)':>16} {'full rescan (ms)':>17}")
+    checkpoints = sorted({1, 10, 50, 100, 150, page_count} & set(range(1, page_count + 1)))
+    for page in checkpoints:
+        print(f"{page:>6} {counter_timings[page - 1] * 1000:>16.3f} {rescan_timings[page - 1] * 1000:>17.3f}")
+    
+    print(f"\nTotal over {page_count} pages: "
+          f"DayCounter {sum(counter_timings) * 1000:.1f} ms, "
+          f"full rescan {sum(rescan_timings) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark for server-side filtering and column projection, offline,
+against the stand-in CKAN server.
+
+Runs the nightly crime fetch (90 days back, stopping at a watermark a
+week old) and a full crime fetch against three stand-in servers, each in
+its own process: one refusing both `fields` and datastore_search_sql, so
+the fetcher falls back to the previous requests; one accepting `fields`
+only; and one accepting both. Reports bytes the server sent, requests,
+elapsed time and records fetched. The records carry unused columns like
+the portal's, so projection has something to leave out.
+
+Usage:
+    python benchmarks/bench_fetch_filters.py [records] [latency] [extra_columns]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_fetch import server_stats
+
+SERVERS = (
+    ('neither', {'fields': False, 'sql': False}),
+    ('fields', {'fields': True, 'sql': False}),
+    ('fields + sql', {'fields': True, 'sql': True}),
+)
+
+def serve(options, port_queue):
+    from ckan_server import start_server
+    server = start_server(**options)
+    port_queue.put(server.server_address[1])
+    while True:
+        time.sleep(3600)
+
+def run(job, url, results):
+    """One fetch in a fresh process, so the fetch engine starts with no fallback decided"""
+    sys.stdout = open(os.devnull, 'w')
+    
+    import config
+    config.FETCH_API_URL = url
+    config.FETCH_REQUESTS_PER_SECOND = 0
+    import fetch_data
+    from ckan_server import NEWEST
+    
+    if job == 'nightly':
+        watermark = {'date': (NEWEST - timedelta(days=7)).isoformat(), 'ids': set()}
+        pages = fetch_data.fetch_all_crime_data(days=90, watermark=watermark)
+    else:
+        pages = fetch_data.fetch_all_crime_data(fetch_all=True)
+    
+    start = time.perf_counter()
+    records = sum(len(page) for _, page in pages)
+    results.put((time.perf_counter() - start, records))
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    extra_columns = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    
+    context = multiprocessing.get_context('spawn')
+    print(f"{records} crime records over a year, {latency * 1000:.0f} ms per request, "
+          f"{extra_columns} unused columns\n")
+    for job in ('nightly', 'full'):
+        print("Nightly fetch, watermark a week old:" if job == 'nightly' else "\nFull fetch:")
+        for name, flags in SERVERS:
+            port_queue = context.Queue()
+            server = context.Process(target=serve, daemon=True, args=(dict(
+                records=records, latency=latency, extra_columns=extra_columns, **flags), port_queue))
+            server.start()
+            url = f'http://127.0.0.1:{port_queue.get()}/api/3/action/datastore_search'
+            
+            results = context.Queue()
+            process = context.Process(target=run, args=(job, url, results))
+            process.start()
+            elapsed, fetched = results.get()
+            process.join()
+            stats = server_stats(url)
+            server.terminate()
+            
+            print(f"  {name:<13} {stats['bytes'] / 1e6:7.2f} MB  {stats['served']:4} requests  "
+                  f"{elapsed:6.2f} s  {fetched} records")
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the shared rate limiter at many distinct clients.
+
+Drives security.RateLimiter with requests spread over a large number of
+distinct identifiers and reports per-check latency and the size of the
+shared state. Also runs the previous per-process timestamp-list limiter
+over the same traffic for comparison of memory growth, and checks that
+several worker processes enforce one combined limit.
+
+Usage:
+    python benchmarks/bench_rate_limiter.py [clients] [requests_per_client]
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from security import RateLimiter
+
+WORKERS = 4
+SHARED_LIMIT = 100
+
+class ListRateLimiter:
+    """The previous implementation: a timestamp list per identifier, never evicted"""
+    def __init__(self):
+        self.requests = defaultdict(list)
+    
+    def is_allowed(self, identifier, max_requests=60, window=60):
+        now = time.time()
+        self.requests[identifier] = [t for t in self.requests[identifier] if t > now - window]
+        if len(self.requests[identifier]) >= max_requests:
+            return False, "limited"
+        self.requests[identifier].append(now)
+        return True, None
+
+def drive(limiter, clients, per_client):
+    timings = []
+    for round_number in range(per_client):
+        for client in range(clients):
+            start = time.perf_counter()
+            limiter.is_allowed(f"ip:10.{client >> 16}.{(client >> 8) & 255}.{client & 255}", 100, 60)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings
+
+def report(label, timings):
+    count = len(timings)
+    print(f"{label:<22} {count:>8} checks  "
+          f"p50 {timings[count // 2] * 1e6:7.1f} us  "
+          f"p99 {timings[int(count * 0.99)] * 1e6:7.1f} us  "
+          f"total {sum(timings):6.2f} s")
+
+def hammer(db_path, attempts, results):
+    limiter = RateLimiter(db_path)
+    allowed = sum(1 for _ in range(attempts) if limiter.is_allowed('ip:192.0.2.1', SHARED_LIMIT, 60)[0])
+    results.put(allowed)
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'rate_limits.db')
+        shared = RateLimiter(db_path)
+        report('shared (SQLite WAL)', drive(shared, clients, per_client))
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        rows = shared._connection().execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0]
+        print(f"{'':<22} {rows} tracked clients, {size / 1024:.0f} KiB on disk, "
+              f"no per-process state")
+        
+        tracemalloc.start()
+        legacy = ListRateLimiter()
+        timings = drive(legacy, clients, per_client)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report('per-process lists', timings)
+        print(f"{'':<22} {len(legacy.requests)} tracked clients, {current / 1024:.0f} KiB "
+              f"in each worker, never evicted")
+        
+        # Every worker hammers one client; together they may only pass the limit once
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=hammer, args=(db_path, SHARED_LIMIT, results))
+                   for _ in range(WORKERS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        allowed = sum(results.get() for _ in workers)
+        print(f"\n{WORKERS} workers x {SHARED_LIMIT} requests from one client: "
+              f"{allowed} allowed (limit {SHARED_LIMIT}; per-process limiters would allow "
+              f"{WORKERS * SHARED_LIMIT})")
+
+if __name__ == "__main__":
+    main()
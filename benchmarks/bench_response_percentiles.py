@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the response-time percentiles behind the calls dashboard.
+
+Loads synthetic calls over a fixed 90 days into a scratch database in
+steps, so each step has more calls per day, and at each size times
+get_response_percentiles (merging the daily histograms) against an exact
+percentile computed by sorting every response time in the window. Also
+reports the largest relative difference between the two.
+
+Usage:
+    python benchmarks/bench_response_percentiles.py [final_size] [repeats]
+"""
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+
+DAYS = 90
+STEPS = 3
+WINDOWS = (7, 30, 90)
+AREAS = ['CENTRAL', 'EAST', 'NORTH', 'NORTHEAST', 'PRUE', 'SOUTH', 'WEST']
+
+EXACT_SQL = '''
+    SELECT CAST(response_seconds AS REAL) FROM calls_for_service
+    WHERE response_epoch_day >= (SELECT MAX(response_epoch_day) FROM call_records) - ?
+    AND CAST(response_seconds AS REAL) > 0
+    ORDER BY 1
+'''
+
+def make_calls(count, first):
+    newest = datetime(2025, 6, 30)
+    records = []
+    for n in range(first, first + count):
+        day = newest - timedelta(days=random.randrange(DAYS), seconds=random.randrange(86400))
+        records.append({
+            'Master_Incident_Number': f'R{n:09d}',
+            'Response_Date': day.strftime('%Y-%m-%d %H:%M:%S'),
+            'Priority': random.choice(['1', '2', '3', '4']),
+            'Problem': 'DISTURBANCE',
+            'Type': random.choice(['Emergency', 'Non-Emergency']),
+            'Service_Area': random.choice(AREAS),
+            # Long-tailed, like real dispatch times
+            'Seconds': random.choice([None, int(random.lognormvariate(6.5, 0.8))]),
+            'Postal_Code': '78201'
+        })
+    return records
+
+def exact_percentiles(cursor, days):
+    values = [row[0] for row in cursor.execute(EXACT_SQL, (days - 1,))]
+    return [round(values[max(1, math.ceil(len(values) * q)) - 1] / 60, 1)
+            for q in (0.5, 0.9, 0.99)]
+
+def timed(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats, result
+
+def main():
+    final_size = int(sys.argv[1]) if len(sys.argv) > 1 else 900000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = os.path.join(tmp, 'crime_data.db')
+        import calls_database
+        from connections import get_read_connection
+        
+        calls_database.init_calls_table()
+        
+        loaded = 0
+        for step in range(STEPS, 0, -1):
+            size = final_size // 3 ** (step - 1)
+            calls_database.insert_call_records(make_calls(size - loaded, loaded))
+            loaded = size
+            cursor = get_read_connection().cursor()
+            
+            histogram_rows = cursor.execute('SELECT COUNT(*) FROM call_response_histogram').fetchone()[0]
+            print(f"{size} calls over {DAYS} days ({histogram_rows} histogram rows)")
+            for days in WINDOWS:
+                sketch_time, sketch = timed(lambda: calls_database.get_response_percentiles(days), repeats)
+                exact_time, exact = timed(lambda: exact_percentiles(cursor, days), repeats)
+                error = max(abs(a - b) / b for a, b in zip((sketch['p50'], sketch['p90'], sketch['p99']), exact))
+                print(f"  {days:>2} days  exact sort {exact_time * 1000:7.1f} ms  "
+                      f"histograms {sketch_time * 1000:6.1f} ms  ({exact_time / sketch_time:5.1f}x)  "
+                      f"max difference {error:.1%}")
+
+if __name__ == "__main__":
+    main()
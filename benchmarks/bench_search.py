@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the list views' search filter as the crimes table grows.
+
+Loads synthetic crimes spread over three years into a scratch database in
+steps and, at each size, times a first page plus its total for a common
+and a rare search term two ways: get_crimes_list, which matches the term
+against the FTS5 label index and seeks the matching label ids, and the
+previous per-row `crime_type LIKE ? OR nibrs_group LIKE ?` scan.
+
+Usage:
+    python benchmarks/bench_search.py [final_size] [repeats]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+
+DAYS = 3 * 365
+STEPS = 3
+TYPES = [('Theft', 'Property'), ('Assault', 'Person'), ('Burglary of Habitation', 'Property'),
+         ('Motor Vehicle Theft', 'Property'), ('Drug/Narcotic Violations', 'Society'),
+         ('Destruction/Damage/Vandalism of Property', 'Property'), ('Robbery', 'Property'),
+         ('Aggravated Assault', 'Person'), ('Shoplifting', 'Property'), ('Fraud', 'Property')]
+RARE = ('Bribery', 'Society')
+AREAS = ['CENTRAL', 'EAST', 'NORTH', 'NORTHEAST', 'PRUE', 'SOUTH', 'WEST']
+ZIPS = [f'782{n:02d}' for n in range(1, 60)] + ['Unknown']
+TERMS = ['theft', 'bribery']
+
+LIKE_PAGE = '''
+    SELECT report_id, report_date, crime_type FROM crimes
+    WHERE crime_type LIKE ? OR nibrs_group LIKE ?
+    ORDER BY report_date DESC, report_id DESC LIMIT 50
+'''
+LIKE_COUNT = 'SELECT COUNT(*) FROM crimes WHERE crime_type LIKE ? OR nibrs_group LIKE ?'
+
+def make_crimes(count, first):
+    newest = date(2025, 6, 30)
+    records = []
+    for n in range(first, first + count):
+        day = (newest - timedelta(days=random.randrange(DAYS))).isoformat()
+        crime_type, against = RARE if random.random() < 0.001 else random.choice(TYPES)
+        records.append({
+            'Report_ID': f'S{n:09d}',
+            'Report_Date': day,
+            'NIBRS_Code_Name': crime_type,
+            'NIBRS_Crime_Against': against,
+            'Service_Area': random.choice(AREAS),
+            'Zip_Code': random.choice(ZIPS),
+            'NIBRS_Group': random.choice(['A', 'B']),
+            'DateTime': day
+        })
+    return records
+
+def timed(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats, result
+
+def main():
+    final_size = int(sys.argv[1]) if len(sys.argv) > 1 else 800000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = os.path.join(tmp, 'crime_data.db')
+        import database
+        import pagination
+        from connections import get_read_connection
+        
+        database.init_database()
+        
+        loaded = 0
+        for step in range(STEPS, 0, -1):
+            size = final_size // 4 ** (step - 1)
+            database.insert_crime_records(make_crimes(size - loaded, loaded))
+            loaded = size
+            cursor = get_read_connection().cursor()
+            
+            print(f"{size} crimes")
+            for term in TERMS:
+                def indexed():
+                    # Time the total as well as the page, not the count cache
+                    pagination._count_cache.clear()
+                    return database.get_crimes_list(1, 50, {'search': term})['total']
+                
+                def scanned():
+                    pattern = f'%{term}%'
+                    cursor.execute(LIKE_PAGE, (pattern, pattern)).fetchall()
+                    return cursor.execute(LIKE_COUNT, (pattern, pattern)).fetchone()[0]
+                
+                fts_time, fts_total = timed(indexed, repeats)
+                like_time, like_total = timed(scanned, repeats)
+                print(f"  {term:<8} {fts_total:>7} matches  LIKE {like_time * 1000:7.1f} ms  "
+                      f"FTS5 {fts_time * 1000:7.1f} ms  ({like_time / fts_time:5.1f}x)  "
+                      f"totals match: {fts_total == like_total}")
+
+if __name__ == "__main__":
+    main()
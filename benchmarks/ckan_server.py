@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the portal's CKAN datastore_search endpoint.
+
+Serves synthetic crime, arrest and call records under the fetchers'
+resource IDs, newest first, with configurable size, per-request latency
+and a rate of 503 errors, so the fetch engine can be exercised and
+benchmarked without network access. Records are generated from their
+offset on each request, so any size costs no memory. Supports the
+`fields` parameter and the date-filtered datastore_search_sql query the
+fetchers send, and can refuse either to exercise their fallback.
+GET /_stats reports the requests served, bytes sent and the most requests
+in flight at once.
+
+Usage:
+    python benchmarks/ckan_server.py [--port 8765] [--records 100000] [--days 365]
+                                     [--latency 0.05] [--error-rate 0] [--extra-columns 0]
+                                     [--no-fields] [--no-sql]
+
+Then point the app at it:
+    FETCH_API_URL=http://127.0.0.1:8765/api/3/action/datastore_search python refresh_worker.py --full
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fetch_data import RESOURCE_ID as CRIME_RESOURCE_ID
+from fetch_arrests import RESOURCE_ID as ARRESTS_RESOURCE_ID
+from fetch_calls import RESOURCE_ID as CALLS_RESOURCE_ID
+
+NEWEST = datetime(2025, 6, 30, 23, 59, 59)
+MAX_LIMIT = 32000
+AREAS = ['CENTRAL', 'EAST', 'NORTH', 'NORTHEAST', 'PRUE', 'SOUTH', 'WEST']
+ZIPS = [f'782{n:02d}' for n in range(1, 60)] + ['Unknown']
+CRIME_TYPES = [('Theft', 'Property'), ('Assault', 'Person'), ('Burglary of Habitation', 'Property'),
+               ('Motor Vehicle Theft', 'Property'), ('Drug/Narcotic Violations', 'Society'),
+               ('Destruction/Damage/Vandalism of Property', 'Property'), ('Robbery', 'Property'),
+               ('Aggravated Assault', 'Person'), ('Shoplifting', 'Property'), ('Fraud', 'Property')]
+OFFENSES = [('DWI', 'Misdemeanor B'), ('THEFT', 'Misdemeanor A'), ('ASSAULT', 'Felony'),
+            ('POSS MARIJ', 'Misdemeanor B'), ('EVADING ARREST', 'Misdemeanor A')]
+PROBLEMS = ['DISTURBANCE', 'ALARM', 'ACCIDENT', 'SUSPICIOUS PERSON', 'THEFT REPORT', 'WELFARE CHECK']
+
+def crime_record(n, when, rng):
+    crime_type, against = rng.choice(CRIME_TYPES)
+    return {
+        'Report_ID': f'SC{n:09d}',
+        'Report_Date': when.strftime('%Y-%m-%d'),
+        'NIBRS_Code_Name': crime_type,
+        'NIBRS_Crime_Against': against,
+        'NIBRS_Group': rng.choice(['A', 'B']),
+        'Service_Area': rng.choice(AREAS),
+        'Zip_Code': rng.choice(ZIPS),
+        'DateTime': when.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def arrest_record(n, when, rng):
+    offense, severity = rng.choice(OFFENSES)
+    return {
+        'Report_ID': f'SA{n:09d}',
+        'Report_Date': when.strftime('%Y-%m-%d'),
+        'Person': f'P{rng.randrange(10 ** 7):07d}',
+        'Offense': offense,
+        'Severity': severity,
+        'Service_Area': rng.choice(AREAS),
+        'Report_Month': when.strftime('%Y-%m'),
+        'Zip_Code': rng.choice(ZIPS),
+        'DateTime': when.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def call_record(n, when, rng):
+    return {
+        'Master_Incident_Number': f'SI{n:09d}',
+        'Response_Date': when.strftime('%Y-%m-%d %H:%M:%S'),
+        'Priority': rng.choice(['1', '2', '3', '4']),
+        'Problem': rng.choice(PROBLEMS),
+        'Type': rng.choice(['Emergency', 'Non-Emergency']),
+        'Service_Area': rng.choice(AREAS),
+        'Seconds': rng.choice([None, int(rng.lognormvariate(6.5, 0.8))]),
+        'Weekday': when.strftime('%A'),
+        'Disposition_Groups': rng.choice(['Report Taken', 'No Report', 'Cancelled']),
+        'Disposition_Type': rng.choice(['', 'REPORT', 'NO REPORT', 'ARREST']),
+        'Postal_Code': rng.choice(ZIPS)
+    }
+
+DATASETS = {
+    CRIME_RESOURCE_ID: ('Report_Date', crime_record),
+    ARRESTS_RESOURCE_ID: ('Report_Date', arrest_record),
+    CALLS_RESOURCE_ID: ('Response_Date', call_record),
+}
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def __init__(self, address, records, days, latency, error_rate, extra_columns, fields=True, sql=True):
+        super().__init__(address, StandInHandler)
+        self.records = records
+        self.spacing = days * 86400 / max(1, records)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.extra_columns = extra_columns
+        self.fields = fields
+        self.sql = sql
+        self.lock = threading.Lock()
+        self.reset_stats()
+    
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/api/3/action/datastore_search'
+    
+    def reset_stats(self):
+        with self.lock:
+            self.served = 0
+            self.bytes_sent = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+    
+    def record(self, resource_id, offset):
+        """Record at offset: evenly spaced over the days, newest first, the same on every request"""
+        _, make = DATASETS[resource_id]
+        rng = random.Random(f'{resource_id}:{offset}')
+        record = {'_id': offset + 1}
+        record.update(make(offset, NEWEST - timedelta(seconds=offset * self.spacing), rng))
+        for column in range(1, self.extra_columns + 1):
+            record[f'Extra_{column}'] = f'{rng.getrandbits(64):016x}'
+        return record
+    
+    def field_names(self, resource_id):
+        return list(self.record(resource_id, 0))
+    
+    def count_since(self, since):
+        """Number of records on or after a YYYY-MM-DD day; they are the first ones, newest first"""
+        age = (NEWEST - datetime.fromisoformat(since)).total_seconds()
+        return max(0, min(self.records, int(age // self.spacing) + 1))
+    
+    def records_between(self, resource_id, start, stop, columns):
+        records = [self.record(resource_id, n) for n in range(start, stop)]
+        if columns:
+            records = [{column: record[column] for column in columns} for record in records]
+        return records
+    
+    def search(self, params):
+        """datastore_search: resource_id, limit, offset and optionally fields"""
+        resource_id = params['resource_id']
+        columns = params['fields'].split(',') if 'fields' in params else None
+        names = self.field_names(resource_id)
+        if columns and not self.fields:
+            return 409, {'success': False, 'error': {'message': 'fields is not supported by this stand-in'}}
+        if columns and set(columns) - set(names):
+            return 409, {'success': False, 'error': {'fields': [f'field "{column}" not in resource'
+                                                                for column in set(columns) - set(names)]}}
+        
+        date_field, _ = DATASETS[resource_id]
+        limit = min(int(params.get('limit', 100)), MAX_LIMIT)
+        offset = int(params.get('offset', 0))
+        return 200, {
+            'success': True,
+            'result': {
+                'resource_id': resource_id,
+                'fields': [{'id': name, 'type': 'int' if name == '_id' else 'text'}
+                           for name in (columns or names)],
+                'records': self.records_between(resource_id, offset, min(offset + limit, self.records), columns),
+                'sort': f'{date_field} desc',
+                'limit': limit,
+                'offset': offset,
+                'total': self.records
+            }
+        }
+    
+    def search_sql(self, params):
+        """datastore_search_sql, for the one query shape fetch_engine.fetch_page sends"""
+        if not self.sql:
+            return 403, {'success': False, 'error': {'message': 'Access denied: datastore_search_sql is disabled'}}
+        match = SQL_QUERY.fullmatch(params.get('sql', ''))
+        if not match or match['resource_id'] not in DATASETS:
+            return 409, {'success': False, 'error': {'message': 'Query not supported by this stand-in'}}
+        
+        resource_id = match['resource_id']
+        columns = None if match['columns'] == '*' else re.findall(r'"(\w+)"', match['columns'])
+        stop = self.count_since(match['since'])
+        offset = int(match['offset'])
+        return 200, {
+            'success': True,
+            'result': {
+                'records': self.records_between(resource_id, min(offset, stop),
+                                                min(offset + int(match['limit']), stop), columns),
+                'fields': [{'id': name, 'type': 'text'} for name in (columns or self.field_names(resource_id))],
+                'sql': params['sql']
+            }
+        }
+
+SQL_QUERY = re.compile(
+    r'SELECT (?P<columns>.+?) FROM "(?P<resource_id>[^"]+)" WHERE "\w+" >= \'(?P<since>\d{4}-\d{2}-\d{2})\' '
+    r'ORDER BY "\w+" DESC LIMIT (?P<limit>\d+) OFFSET (?P<offset>\d+)')
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path == '/_stats':
+            with server.lock:
+                stats = {'served': server.served, 'bytes': server.bytes_sent,
+                         'max_in_flight': server.max_in_flight}
+            if 'reset' in parse_qs(url.query):
+                server.reset_stats()
+            return self.reply(200, stats)
+        
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if server.error_rate and random.random() < server.error_rate:
+                return self.reply(503, {'success': False, 'error': {'message': 'Service Unavailable'}})
+            if url.path.endswith('/datastore_search_sql'):
+                return self.reply(*server.search_sql(params))
+            if not url.path.endswith('/datastore_search') or params.get('resource_id') not in DATASETS:
+                return self.reply(404, {'success': False, 'error': {'message': 'Not found: Resource was not found.'}})
+            self.reply(*server.search(params))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+                server.served += 1
+    
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path.startswith('/api/'):
+            with self.server.lock:
+                self.server.bytes_sent += len(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_server(records=100000, days=365, latency=0.0, error_rate=0.0, extra_columns=0,
+                 fields=True, sql=True, port=0):
+    """Serve from a background thread; the returned server's .url is the endpoint to fetch from"""
+    server = StandInServer(('127.0.0.1', port), records, days, latency, error_rate, extra_columns, fields, sql)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in CKAN datastore_search server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--records', type=int, default=100000, help='records per resource')
+    parser.add_argument('--days', type=int, default=365, help='days the records are spread over')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 503')
+    parser.add_argument('--extra-columns', type=int, default=0,
+                        help='unused text columns per record, like the portal columns the app ignores')
+    parser.add_argument('--no-fields', action='store_true', help='refuse the fields parameter')
+    parser.add_argument('--no-sql', action='store_true', help='refuse datastore_search_sql')
+    args = parser.parse_args()
+    
+    server = StandInServer(('127.0.0.1', args.port), args.records, args.days, args.latency,
+                           args.error_rate, args.extra_columns, not args.no_fields, not args.no_sql)
+    print(f"Serving {args.records} records per resource at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
+
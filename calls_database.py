@@ -1,246 +1,374 @@
-import sqlite3
-from datetime import datetime
-import os
-from config import DB_PATH
+from pagination import encode_cursor, decode_cursor, cached_count
+from ingest import bulk_insert, report_rejects
+from connections import get_read_connection, writer
+from collections import Counter
+from columnar import ColumnarTable, by_count, by_key, contains
+from result_cache import memoized
+from log_histogram import bucket_of, quantiles
+from database import get_data_version
+from compact_storage import (CompactTable, Column, plain, label, day, init_labels, day_text,
+                             label_id_sql, label_sql, search_labels, day_number_sql,
+                             checked_date, LISTED_ZIP_CODES)
+
+# calls_for_service is a view over call_records, which stores label ids and
+# day numbers. response_day and response_hour are derived from response_date
+# at ingest so date filters can use an index instead of a function call.
+CALL_TABLE = CompactTable('calls_for_service', 'call_records', [
+    plain('incident_number'),
+    plain('response_date'),
+    label('priority'),
+    label('problem'),
+    label('call_type'),
+    label('service_area'),
+    plain('response_seconds'),
+    label('weekday'),
+    label('disposition_group'),
+    label('disposition_type'),
+    label('postal_code'),
+    day('response_day', 'response_epoch_day', source='response_date'),
+    Column('response_hour', 'response_hour', "strftime('%H', response_date)", 'response_hour'),
+])
 
 def init_calls_table():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS calls_for_service (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            incident_number TEXT UNIQUE NOT NULL,
-            response_date TIMESTAMP NOT NULL,
-            priority TEXT NOT NULL,
-            problem TEXT NOT NULL,
-            service_area TEXT NOT NULL,
-            call_type TEXT NOT NULL,
-            response_seconds INTEGER,
-            weekday TEXT,
-            disposition_group TEXT,
-            disposition_type TEXT,
-            postal_code TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_calls_response_date ON calls_for_service(response_date);
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_calls_problem ON calls_for_service(problem);
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_calls_service_area ON calls_for_service(service_area);
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_calls_priority ON calls_for_service(priority);
-    ''')
+    with writer() as conn:
+        cursor = conn.cursor()
+        
+        init_labels(cursor)
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS call_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                incident_number TEXT UNIQUE NOT NULL,
+                response_date TIMESTAMP NOT NULL,
+                priority_id INTEGER NOT NULL,
+                problem_id INTEGER NOT NULL,
+                call_type_id INTEGER NOT NULL,
+                service_area_id INTEGER NOT NULL,
+                response_seconds INTEGER,
+                weekday_id INTEGER,
+                disposition_group_id INTEGER,
+                disposition_type_id INTEGER,
+                postal_code_id INTEGER,
+                response_epoch_day INTEGER,
+                response_hour TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Databases created before compact storage have a calls_for_service
+        # table; response_day and response_hour are recomputed as it moves
+        CALL_TABLE.migrate(conn)
+        CALL_TABLE.create_view(cursor)
+        CALL_TABLE.init_label_counts(cursor)
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_call_records_day ON call_records(response_epoch_day);
+        ''')
+        
+        # Matches the list views' ORDER BY so keyset pages are index seeks
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_call_records_date_incident ON call_records(response_date, incident_number);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_call_records_problem ON call_records(problem_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_call_records_area ON call_records(service_area_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_call_records_priority ON call_records(priority_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_call_records_type ON call_records(call_type_id);
+        ''')
+        
+        # Response-time histograms per day for each priority and each service
+        # area, kept current at ingest; any window's percentiles merge the
+        # rows of its days
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS call_response_histogram (
+                dimension TEXT NOT NULL,
+                response_epoch_day INTEGER NOT NULL,
+                label_id INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (dimension, response_epoch_day, label_id, bucket)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Backfill the histogram for databases created before it existed
+        cursor.execute('SELECT 1 FROM call_response_histogram LIMIT 1')
+        if cursor.fetchone() is None:
+            update_response_histogram(cursor, 0)
+
+CALL_COLUMNS = (
+    'incident_number', 'response_date', 'priority', 'problem',
+    'call_type', 'service_area', 'response_seconds', 'weekday',
+    'disposition_group', 'disposition_type', 'postal_code'
+)
+
+def call_record_to_row(record):
+    return (
+        record['Master_Incident_Number'],
+        checked_date(record['Response_Date']),
+        record['Priority'],
+        record['Problem'],
+        record['Type'],
+        record['Service_Area'],
+        record.get('Seconds', None),
+        record.get('Weekday', ''),
+        record.get('Disposition_Groups', ''),
+        record.get('Disposition_Type', ''),
+        record.get('Postal_Code', 'Unknown')
+    )
+
+def insert_call_records(records, rejects=None):
+    if rejects is None:
+        rejects = []
     
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_calls_type ON calls_for_service(call_type);
-    ''')
+    with writer() as conn:
+        inserted_count = bulk_insert(conn, CALL_TABLE, CALL_COLUMNS, records,
+                                     call_record_to_row, rejects,
+                                     on_insert=update_response_histogram)
+    report_rejects(rejects, 'call')
     
-    conn.commit()
-    conn.close()
+    return inserted_count
 
-def insert_call_records(records):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Label columns with their own response-time histograms
+RESPONSE_DIMENSIONS = ('priority', 'service_area')
+
+def update_response_histogram(cursor, last_id):
+    """Add calls with id > last_id and a positive response time to call_response_histogram"""
+    cursor.execute(f'''
+        SELECT response_epoch_day, CAST(response_seconds AS REAL),
+               {', '.join(f'{dimension}_id' for dimension in RESPONSE_DIMENSIONS)}
+        FROM call_records
+        WHERE id > ? AND response_epoch_day IS NOT NULL
+        AND CAST(response_seconds AS REAL) > 0
+    ''', (last_id,))
+    counts = Counter()
+    for day, seconds, *label_ids in cursor.fetchall():
+        bucket = bucket_of(seconds)
+        for dimension, label_id in zip(RESPONSE_DIMENSIONS, label_ids):
+            counts[dimension, day, label_id, bucket] += 1
+    
+    cursor.executemany('''
+        INSERT INTO call_response_histogram (
+            dimension, response_epoch_day, label_id, bucket, count
+        )
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (dimension, response_epoch_day, label_id, bucket)
+        DO UPDATE SET count = count + excluded.count
+    ''', [key + (count,) for key, count in counts.items()])
+
+# Recent calls held in memory for get_calls_stats and the insights
+calls_window = ColumnarTable('call_records', 'response_epoch_day', columns={
+    'response_hour': 'response_hour',
+}, labels={
+    'problem': 'problem_id',
+    'priority': 'priority_id',
+    'call_type': 'call_type_id',
+    'service_area': 'service_area_id',
+    'postal_code': 'postal_code_id',
+    'disposition_type': 'disposition_type_id',
+}, measures={
+    # Same filter as the SQL average; non-numeric text counts as 0, as in AVG()
+    'response_seconds': 'CASE WHEN response_seconds > 0 THEN response_seconds END',
+})
+
+def _columnar_calls_stats(days):
+    window = calls_window.window(days)
+    if window is None:
+        return None
+    
+    listed_zips = window.matching(
+        'postal_code', lambda zip_code: zip_code is not None
+        and not contains(zip_code, 'Out of') and zip_code != 'Unknown')
+    emergencies = window.matching('call_type', lambda call_type: call_type == 'Emergency')
+    dispositions = window.matching(
+        'disposition_type', lambda disposition: disposition is not None and disposition != '')
+    avg_seconds = window.mean('response_seconds')
     
-    inserted_count = 0
-    for record in records:
-        try:
-            cursor.execute('''
-                INSERT OR IGNORE INTO calls_for_service (
-                    incident_number, response_date, priority, problem,
-                    call_type, service_area, response_seconds, weekday,
-                    disposition_group, disposition_type, postal_code
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                record['Master_Incident_Number'],
-                record['Response_Date'],
-                record['Priority'],
-                record['Problem'],
-                record['Type'],
-                record['Service_Area'],
-                record.get('Seconds', None),
-                record.get('Weekday', ''),
-                record.get('Disposition_Groups', ''),
-                record.get('Disposition_Type', ''),
-                record.get('Postal_Code', 'Unknown')
-            ))
-            if cursor.rowcount > 0:
-                inserted_count += 1
-        except Exception as e:
-            print(f"Error inserting call record {record.get('Master_Incident_Number')}: {e}")
-    
-    conn.commit()
-    conn.close()
-    return inserted_count
+    return {
+        'total_calls': window.total(),
+        'calls_by_problem': by_count(window.counts('problem'), 10),
+        'calls_by_priority': by_key(window.counts('priority')),
+        'calls_by_type': by_count(window.counts('call_type')),
+        'calls_by_area': by_count(window.counts('service_area')),
+        'top_zip_codes': by_count(window.counts('postal_code', listed_zips), 10),
+        'daily_trend': [(day_text(day), count) for day, count in by_key(window.counts('day'))],
+        'emergency_calls': window.total(emergencies),
+        'avg_response_minutes': round(avg_seconds / 60, 1) if avg_seconds else None,
+        'calls_by_disposition': by_count(window.counts('disposition_type', dispositions), 5)
+    }
 
 def get_calls_stats(days=30):
-    conn = sqlite3.connect(DB_PATH)
+    stats = _columnar_calls_stats(days)
+    if stats is None:
+        stats = _sql_calls_stats(days)
+    stats['response_percentiles'] = get_response_percentiles(days)
+    return stats
+
+def _sql_calls_stats(days):
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     stats = {}
     
-    # Get the most recent date in the database
-    cursor.execute('SELECT MAX(date(response_date)) FROM calls_for_service')
-    max_date_result = cursor.fetchone()
+    # First day of the window ending on the most recent date in the database
+    cursor.execute('SELECT MAX(response_epoch_day) - ? FROM calls_for_service', (days-1,))
+    window_start = cursor.fetchone()[0]
     
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         # Calculate date range based on most recent data
         cursor.execute('''
             SELECT COUNT(*) FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-        ''', (max_date_result[0], days-1))
+            WHERE response_epoch_day >= ?
+        ''', (window_start,))
     else:
         cursor.execute('SELECT COUNT(*) FROM calls_for_service')
     
     stats['total_calls'] = cursor.fetchone()[0]
     
     # Calls by problem type (top 10)
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT problem, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            GROUP BY problem 
+            WHERE response_epoch_day >= ?
+            GROUP BY problem_id 
             ORDER BY count DESC 
             LIMIT 10
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT problem, COUNT(*) as count 
             FROM calls_for_service 
-            GROUP BY problem 
+            GROUP BY problem_id 
             ORDER BY count DESC 
             LIMIT 10
         ''')
     stats['calls_by_problem'] = cursor.fetchall()
     
     # Calls by priority
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT priority, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            GROUP BY priority 
+            WHERE response_epoch_day >= ?
+            GROUP BY priority_id 
             ORDER BY priority
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT priority, COUNT(*) as count 
             FROM calls_for_service 
-            GROUP BY priority 
+            GROUP BY priority_id 
             ORDER BY priority
         ''')
     stats['calls_by_priority'] = cursor.fetchall()
     
     # Calls by type (Emergency vs Non-Emergency)
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT call_type, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            GROUP BY call_type 
+            WHERE response_epoch_day >= ?
+            GROUP BY call_type_id 
             ORDER BY count DESC
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT call_type, COUNT(*) as count 
             FROM calls_for_service 
-            GROUP BY call_type 
+            GROUP BY call_type_id 
             ORDER BY count DESC
         ''')
     stats['calls_by_type'] = cursor.fetchall()
     
     # Calls by service area
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT service_area, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            GROUP BY service_area 
+            WHERE response_epoch_day >= ?
+            GROUP BY service_area_id 
             ORDER BY count DESC
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT service_area, COUNT(*) as count 
             FROM calls_for_service 
-            GROUP BY service_area 
+            GROUP BY service_area_id 
             ORDER BY count DESC
         ''')
     stats['calls_by_area'] = cursor.fetchall()
     
     # Top zip codes
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT postal_code, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            AND postal_code NOT LIKE '%Out of%' 
-            AND postal_code != 'Unknown'
-            GROUP BY postal_code 
+            WHERE response_epoch_day >= ?
+            AND postal_code_id IN (SELECT id FROM labels WHERE value NOT LIKE '%Out of%' AND value != 'Unknown')
+            GROUP BY postal_code_id 
             ORDER BY count DESC 
             LIMIT 10
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT postal_code, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE postal_code NOT LIKE '%Out of%' 
-            AND postal_code != 'Unknown'
-            GROUP BY postal_code 
+            WHERE postal_code_id IN (SELECT id FROM labels WHERE value NOT LIKE '%Out of%' AND value != 'Unknown')
+            GROUP BY postal_code_id 
             ORDER BY count DESC 
             LIMIT 10
         ''')
     stats['top_zip_codes'] = cursor.fetchall()
     
     # Daily trend
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
-            SELECT date(response_date) as date, COUNT(*) as count 
+            SELECT response_day as date, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            GROUP BY date(response_date) 
-            ORDER BY date(response_date)
-        ''', (max_date_result[0], days-1))
+            WHERE response_epoch_day >= ?
+            GROUP BY response_epoch_day 
+            ORDER BY response_epoch_day
+        ''', (window_start,))
     else:
         cursor.execute('''
-            SELECT date(response_date) as date, COUNT(*) as count 
+            SELECT response_day as date, COUNT(*) as count 
             FROM calls_for_service 
-            GROUP BY date(response_date) 
-            ORDER BY date(response_date)
+            GROUP BY response_epoch_day 
+            ORDER BY response_epoch_day
         ''')
     stats['daily_trend'] = cursor.fetchall()
     
     # Emergency calls count
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT COUNT(*) FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            AND call_type = 'Emergency'
-        ''', (max_date_result[0], days-1))
+            WHERE response_epoch_day >= ?
+            AND call_type_id IN (SELECT id FROM labels WHERE value = 'Emergency')
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT COUNT(*) FROM calls_for_service 
-            WHERE call_type = 'Emergency'
+            WHERE call_type_id IN (SELECT id FROM labels WHERE value = 'Emergency')
         ''')
     stats['emergency_calls'] = cursor.fetchone()[0]
     
     # Average response time (for calls with response time data)
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT AVG(response_seconds) FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
+            WHERE response_epoch_day >= ?
             AND response_seconds IS NOT NULL AND response_seconds > 0
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT AVG(response_seconds) FROM calls_for_service 
@@ -250,32 +378,85 @@ def get_calls_stats(days=30):
     stats['avg_response_minutes'] = round(avg_seconds / 60, 1) if avg_seconds else None
     
     # Calls by disposition type
-    if max_date_result and max_date_result[0]:
+    if window_start is not None:
         cursor.execute('''
             SELECT disposition_type, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            AND disposition_type != ''
-            GROUP BY disposition_type 
+            WHERE response_epoch_day >= ?
+            AND disposition_type_id IN (SELECT id FROM labels WHERE value != '')
+            GROUP BY disposition_type_id 
             ORDER BY count DESC
             LIMIT 5
-        ''', (max_date_result[0], days-1))
+        ''', (window_start,))
     else:
         cursor.execute('''
             SELECT disposition_type, COUNT(*) as count 
             FROM calls_for_service 
-            WHERE disposition_type != ''
-            GROUP BY disposition_type 
+            WHERE disposition_type_id IN (SELECT id FROM labels WHERE value != '')
+            GROUP BY disposition_type_id 
             ORDER BY count DESC
             LIMIT 5
         ''')
     stats['calls_by_disposition'] = cursor.fetchall()
     
-    conn.close()
     return stats
 
-def get_calls_list(page=1, per_page=100, filters=None):
-    conn = sqlite3.connect(DB_PATH)
+RESPONSE_PERCENTILES = (0.5, 0.9, 0.99)
+
+def _percentile_row(buckets):
+    """(calls, p50, p90, p99) in minutes from a merged {bucket: count}"""
+    values = quantiles(buckets, RESPONSE_PERCENTILES)
+    return (sum(buckets.values()),) + tuple(
+        round(seconds / 60, 1) if seconds is not None else None for seconds in values
+    )
+
+def _merged_histograms(cursor, window_start, dimension):
+    """{label: {bucket: count}} of a dimension over the days from window_start"""
+    if window_start is None:
+        return {}
+    cursor.execute(f'''
+        SELECT {label_sql('label_id')}, bucket, SUM(count)
+        FROM call_response_histogram
+        WHERE dimension = ? AND response_epoch_day >= ?
+        GROUP BY label_id, bucket
+    ''', (dimension, window_start))
+    merged = {}
+    for value, bucket, count in cursor.fetchall():
+        merged.setdefault(value, {})[bucket] = count
+    return merged
+
+def get_response_percentiles(days=30):
+    """
+    p50/p90/p99 response times in minutes over the last `days` days, for all
+    calls and per priority and service area, merged from the daily
+    histograms. Only calls with a positive response time are counted.
+    """
+    cursor = get_read_connection().cursor()
+    
+    # First day of the window ending on the most recent date in the database
+    cursor.execute('SELECT MAX(response_epoch_day) - ? FROM call_records', (days-1,))
+    window_start = cursor.fetchone()[0]
+    
+    by_priority = _merged_histograms(cursor, window_start, 'priority')
+    by_area = _merged_histograms(cursor, window_start, 'service_area')
+    
+    overall = Counter()
+    for buckets in by_priority.values():
+        overall.update(buckets)
+    
+    calls, p50, p90, p99 = _percentile_row(overall)
+    return {
+        'calls': calls,
+        'p50': p50,
+        'p90': p90,
+        'p99': p99,
+        'by_priority': [(priority,) + _percentile_row(by_priority[priority])
+                        for priority in sorted(by_priority)],
+        'by_area': [(area,) + _percentile_row(by_area[area]) for area in sorted(by_area)]
+    }
+
+def get_calls_list(page=1, per_page=100, filters=None, after=None, include_total=True):
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     # Base query
@@ -291,101 +472,84 @@ def get_calls_list(page=1, per_page=100, filters=None):
     # Apply filters
     if filters:
         if filters.get('problem'):
-            query += ' AND problem = ?'
+            query += f' AND problem_id = {label_id_sql("?")}'
             params.append(filters['problem'])
         
         if filters.get('priority'):
-            query += ' AND priority = ?'
+            query += f' AND priority_id = {label_id_sql("?")}'
             params.append(filters['priority'])
-            
+        
         if filters.get('call_type'):
-            query += ' AND call_type = ?'
+            query += f' AND call_type_id = {label_id_sql("?")}'
             params.append(filters['call_type'])
-            
+        
         if filters.get('service_area'):
-            query += ' AND service_area = ?'
+            query += f' AND service_area_id = {label_id_sql("?")}'
             params.append(filters['service_area'])
         
         if filters.get('postal_code'):
-            query += ' AND postal_code = ?'
+            query += f' AND postal_code_id = {label_id_sql("?")}'
             params.append(filters['postal_code'])
         
         if filters.get('date_from'):
-            query += ' AND date(response_date) >= ?'
+            query += f' AND response_epoch_day >= {day_number_sql("?")}'
             params.append(filters['date_from'])
         
         if filters.get('date_to'):
-            query += ' AND date(response_date) <= ?'
+            query += f' AND response_epoch_day <= {day_number_sql("?")}'
             params.append(filters['date_to'])
         
         if filters.get('search'):
-            query += ' AND problem LIKE ?'
-            search_term = f'%{filters["search"]}%'
+            matching, search_term = search_labels(filters['search'], 'calls_for_service', ('problem',))
+            query += f' AND problem_id IN {matching}'
             params.append(search_term)
     
-    # Count total records
-    count_query = f'SELECT COUNT(*) FROM ({query})'
-    cursor.execute(count_query, params)
-    total_count = cursor.fetchone()[0]
+    # Count total records (cached until new rows arrive; optional for API clients)
+    total_count = cached_count(cursor, 'calls_for_service', query, params) if include_total else None
+    
+    # Seek past the previous page's last row when a cursor is given,
+    # otherwise fall back to offset pagination
+    sort_key = decode_cursor(after)
+    if sort_key:
+        query += ' AND (response_date, incident_number) < (?, ?)'
+        params.extend(sort_key)
     
     # Add ordering and pagination
     query += ' ORDER BY response_date DESC, incident_number DESC'
-    query += ' LIMIT ? OFFSET ?'
-    params.extend([per_page, (page - 1) * per_page])
+    if sort_key:
+        query += ' LIMIT ?'
+        params.append(per_page)
+    else:
+        query += ' LIMIT ? OFFSET ?'
+        params.extend([per_page, (page - 1) * per_page])
     
     cursor.execute(query, params)
     calls = cursor.fetchall()
     
-    conn.close()
+    # Cursor for the following page, encoding the last row's sort key
+    next_cursor = encode_cursor((calls[-1][1], calls[-1][0])) if len(calls) == per_page else None
     
     return {
         'calls': calls,
         'total': total_count,
         'page': page,
         'per_page': per_page,
-        'total_pages': (total_count + per_page - 1) // per_page
+        'total_pages': (total_count + per_page - 1) // per_page if total_count is not None else None,
+        'next_cursor': next_cursor
     }
 
 def get_calls_filter_options():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get unique problems (top 50 most common)
-    cursor.execute('''
-        SELECT problem, COUNT(*) as count 
-        FROM calls_for_service 
-        GROUP BY problem 
-        ORDER BY count DESC 
-        LIMIT 50
-    ''')
-    problems = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique priorities
-    cursor.execute('SELECT DISTINCT priority FROM calls_for_service ORDER BY priority')
-    priorities = [row[0] for row in cursor.fetchall()]
-    
-    # Get call types
-    cursor.execute('SELECT DISTINCT call_type FROM calls_for_service ORDER BY call_type')
-    call_types = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique service areas
-    cursor.execute('SELECT DISTINCT service_area FROM calls_for_service ORDER BY service_area')
-    service_areas = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique zip codes
-    cursor.execute('''
-        SELECT DISTINCT postal_code FROM calls_for_service 
-        WHERE postal_code NOT LIKE '%Out of%' AND postal_code != 'Unknown'
-        ORDER BY postal_code
-    ''')
-    postal_codes = [row[0] for row in cursor.fetchall()]
-    
-    conn.close()
+    """Dropdown values for the calls list, from label_counts and cached per data version"""
+    return memoized('calls_filter_options', get_data_version(), _calls_filter_options)
+
+def _calls_filter_options():
+    cursor = get_read_connection().cursor()
     
     return {
-        'problems': problems,
-        'priorities': priorities,
-        'call_types': call_types,
-        'service_areas': service_areas,
-        'postal_codes': postal_codes
+        # Top 50 most common
+        'problems': CALL_TABLE.label_values(cursor, 'problem', by_count=True, limit=50),
+        'priorities': CALL_TABLE.label_values(cursor, 'priority'),
+        'call_types': CALL_TABLE.label_values(cursor, 'call_type'),
+        'service_areas': CALL_TABLE.label_values(cursor, 'service_area'),
+        'postal_codes': CALL_TABLE.label_values(cursor, 'postal_code', LISTED_ZIP_CODES)
     }
\ No newline at end of file
@@ -0,0 +1,222 @@
+import threading
+from config import ANALYTICS_ENGINE, COLUMNAR_WINDOW_DAYS
+from connections import get_read_connection
+from compact_storage import load_labels
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def engine_enabled():
+    """The columnar engine is used when NumPy is installed and not disabled in config"""
+    return np is not None and ANALYTICS_ENGINE == 'numpy'
+
+def _sqlite_order(value):
+    # NULL sorts first, then numbers, then text, then blobs, as in SQLite
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, value)
+
+def contains(value, text):
+    """value LIKE '%text%' for a text value (case-insensitive, NULL never matches)"""
+    return isinstance(value, str) and text.lower() in value.lower()
+
+def by_count(counts, limit=None):
+    """(value, count) pairs like ORDER BY count DESC, ties in GROUP BY order"""
+    ranked = sorted(counts.items(), key=lambda item: -item[1])
+    return ranked[:limit] if limit else ranked
+
+def by_key(counts):
+    """(value, count) pairs like ORDER BY value"""
+    return list(counts.items())
+
+class _Dictionary:
+    """Maps the distinct values of a column to dense integer codes"""
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+    
+    def encode(self, column):
+        codes = self.codes
+        values = self.values
+        encoded = np.empty(len(column), dtype=np.int32)
+        for i, value in enumerate(column):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(values)
+                values.append(value)
+            encoded[i] = code
+        return encoded
+
+class ColumnarTable:
+    """
+    Dictionary-encoded NumPy copy of the recent rows of one table.
+    
+    day_column is the day number windows are measured on (the 'day'
+    column). columns maps names to categorical SQL expressions, labels
+    maps names to label ids that are decoded to their text, and measures
+    maps names to numeric expressions (NULL becomes NaN). Rows within
+    COLUMNAR_WINDOW_DAYS of
+    the newest day are loaded once; later rows are appended as their IDs
+    appear, and the copy is rebuilt when too much of it has aged out.
+    """
+    def __init__(self, table, day_column, columns=None, labels=None, measures=None):
+        self.table = table
+        self.day_column = day_column
+        self.labels = labels or {}
+        self.columns = dict(columns or {}, **self.labels, day=day_column)
+        self.measures = measures or {}
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        self.last_id = 0
+        self.horizon_start = None
+        self.dictionaries = {name: _Dictionary() for name in self.columns}
+        self.codes = {name: np.empty(0, dtype=np.int32) for name in self.columns}
+        self.values = {name: np.empty(0, dtype=np.float64) for name in self.measures}
+    
+    def _select(self, cursor, where, params):
+        names = list(self.columns) + list(self.measures)
+        expressions = list(self.columns.values()) + [
+            f'CAST({expression} AS REAL)' for expression in self.measures.values()
+        ]
+        cursor.execute(f'''
+            SELECT {', '.join(expressions)} FROM {self.table}
+            WHERE {where}
+            ORDER BY id
+        ''', params)
+        rows = cursor.fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        return dict(zip(names, columns))
+    
+    def _append(self, cursor, loaded):
+        if self.labels and loaded['day']:
+            text = load_labels(cursor)
+            for name in self.labels:
+                loaded[name] = [text.get(label_id) for label_id in loaded[name]]
+        for name in self.columns:
+            encoded = self.dictionaries[name].encode(loaded[name])
+            self.codes[name] = np.concatenate([self.codes[name], encoded])
+        for name in self.measures:
+            column = np.array([np.nan if value is None else value for value in loaded[name]],
+                              dtype=np.float64)
+            self.values[name] = np.concatenate([self.values[name], column])
+    
+    def _horizon(self, cursor):
+        cursor.execute(f'SELECT MAX({self.day_column}) - ? FROM {self.table}',
+                       (COLUMNAR_WINDOW_DAYS - 1,))
+        return cursor.fetchone()[0]
+    
+    def refresh(self):
+        """Load rows added since the last refresh, rebuilding if the copy has gone stale"""
+        cursor = get_read_connection().cursor()
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {self.table}')
+        max_id = cursor.fetchone()[0]
+        
+        with self._lock:
+            if max_id == self.last_id:
+                return
+            if max_id < self.last_id:
+                # Table was replaced underneath us
+                self._reset()
+            
+            horizon = self._horizon(cursor)
+            if self.horizon_start is not None and horizon is not None:
+                # Rebuild once a quarter of the rows have fallen out of every window
+                day_values = np.array([day is not None and day < horizon
+                                       for day in self.dictionaries['day'].values], dtype=bool)
+                aged = day_values[self.codes['day']].sum() if day_values.size else 0
+                if aged * 4 > len(self.codes['day']):
+                    self._reset()
+            
+            if self.last_id == 0:
+                self.horizon_start = horizon
+                loaded = self._select(cursor, f'id <= ? AND {self.day_column} >= ?',
+                                      (max_id, horizon))
+            else:
+                loaded = self._select(cursor, 'id > ? AND id <= ?', (self.last_id, max_id))
+            self._append(cursor, loaded)
+            self.last_id = max_id
+    
+    def window(self, days):
+        """
+        The rows of the last `days` days (ending on the newest day), or None
+        when the engine is disabled, the table is empty or the window
+        reaches further back than the loaded rows.
+        """
+        if not engine_enabled():
+            return None
+        self.refresh()
+        
+        with self._lock:
+            day_dictionary = self.dictionaries['day']
+            present = [day for day in day_dictionary.values if day is not None]
+            if not present or self.horizon_start is None:
+                return None
+            
+            start = max(present) - (days - 1)
+            if start < self.horizon_start:
+                return None
+            
+            in_window = np.array([day is not None and day >= start
+                                  for day in day_dictionary.values], dtype=bool)
+            return _Window(self, in_window[self.codes['day']])
+
+class _Window:
+    """A row mask over a ColumnarTable with vectorized aggregations"""
+    def __init__(self, table, mask):
+        self.dictionaries = table.dictionaries
+        self.codes = {name: codes[mask] for name, codes in table.codes.items()}
+        self.values = {name: values[mask] for name, values in table.values.items()}
+        self.size = int(mask.sum())
+    
+    def matching(self, column, predicate):
+        """Row mask for rows whose column value satisfies predicate, tested once per distinct value"""
+        accepted = np.array([bool(predicate(value)) for value in self.dictionaries[column].values],
+                            dtype=bool)
+        if not accepted.size:
+            return np.zeros(self.size, dtype=bool)
+        return accepted[self.codes[column]]
+    
+    def total(self, where=None):
+        return self.size if where is None else int(where.sum())
+    
+    def counts(self, column, where=None):
+        """{value: count} for values present, in SQLite GROUP BY order"""
+        codes = self.codes[column] if where is None else self.codes[column][where]
+        values = self.dictionaries[column].values
+        counts = np.bincount(codes, minlength=len(values))
+        present = np.nonzero(counts)[0]
+        ordered = sorted(present.tolist(), key=lambda code: _sqlite_order(values[code]))
+        return {values[code]: int(counts[code]) for code in ordered}
+    
+    def grouped(self, columns):
+        """(value, ..., count) rows for each distinct combination of columns"""
+        if not self.size:
+            return []
+        sizes = [len(self.dictionaries[column].values) for column in columns]
+        key = np.zeros(self.size, dtype=np.int64)
+        for column, size in zip(columns, sizes):
+            key = key * size + self.codes[column]
+        keys, counts = np.unique(key, return_counts=True)
+        
+        rows = []
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            values = []
+            for column, size in zip(reversed(columns), reversed(sizes)):
+                key, code = divmod(key, size)
+                values.append(self.dictionaries[column].values[code])
+            rows.append(tuple(reversed(values)) + (count,))
+        return rows
+    
+    def mean(self, measure, where=None):
+        """Mean of the non-NULL values of a measure, or None if there are none"""
+        values = self.values[measure] if where is None else self.values[measure][where]
+        values = values[~np.isnan(values)]
+        return float(values.sum() / len(values)) if len(values) else None
@@ -0,0 +1,291 @@
+import re
+import sqlite3
+from datetime import date, timedelta
+from connections import get_read_connection, writer
+
+# Day numbers count whole days since 1970-01-01
+EPOCH = date(1970, 1, 1)
+EPOCH_JULIAN_DAY = 2440587.5
+
+# Zip code labels offered as filters; leaves out 'Out of City' and the like
+LISTED_ZIP_CODES = "value NOT LIKE '%Out of%' AND value != 'Unknown'"
+
+# Vacuum at startup once this fraction of the file is free pages, e.g.
+# after a table has been migrated to compact storage
+VACUUM_FREE_FRACTION = 0.25
+
+def day_number_sql(expression):
+    """SQL for the day number of a date or timestamp (NULL if it isn't one)"""
+    return f"CAST(julianday(date({expression})) - {EPOCH_JULIAN_DAY} AS INTEGER)"
+
+def day_text_sql(expression):
+    """SQL for the YYYY-MM-DD text of a day number"""
+    return f"date({expression} * 86400, 'unixepoch')"
+
+# Dates and timestamps SQLite's date() reads, so day_number_sql won't give NULL
+SQLITE_DATE = re.compile(r'\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])'
+                         r'([ T]([01]\d|2[0-3]):[0-5]\d(:[0-5]\d(\.\d+)?)?)?'
+                         r'(Z|[+-]([01]\d|2[0-3]):[0-5]\d)?')
+
+def checked_date(value):
+    """
+    value, if it is a date day columns can store; raises ValueError so
+    ingest rejects the record rather than the NOT NULL day column
+    silently dropping it
+    """
+    if not isinstance(value, str) or not SQLITE_DATE.fullmatch(value):
+        raise ValueError(f"invalid date {value!r}")
+    return value
+
+def day_text(day_number):
+    return (EPOCH + timedelta(days=day_number)).isoformat()
+
+def label_id_sql(expression):
+    return f"(SELECT id FROM labels WHERE value = {expression})"
+
+def label_sql(expression):
+    return f"(SELECT value FROM labels WHERE id = {expression})"
+
+def labels_where(condition):
+    """SQL for the ids of labels whose value satisfies condition, e.g. "value LIKE ?" """
+    return f'(SELECT id FROM labels WHERE {condition})'
+
+def _fts5_available():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(value)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+# Search boxes fall back to LIKE on SQLite builds without FTS5
+FTS5_AVAILABLE = _fts5_available()
+
+# Shortest prefix labels_search indexes (its prefix='2 3'); shorter search
+# words would scan the whole index, and are matched with LIKE instead
+FTS5_MIN_PREFIX = 2
+
+def init_labels(cursor):
+    """Create the dictionary shared by every label column and its search index"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS labels (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        )
+    ''')
+    
+    # Rows per label of each label column, kept current at ingest so the
+    # filter dropdowns never scan the fact tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS label_counts (
+            table_name TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            label_id INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (table_name, column_name, label_id)
+        ) WITHOUT ROWID
+    ''')
+    
+    if not FTS5_AVAILABLE:
+        return
+    
+    # Every searchable text column is a label column, so one external-content
+    # index over the dictionary covers them all. Rows are added in add_labels;
+    # the index is rebuilt if it is new or out of step with the dictionary.
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS labels_search USING fts5(
+            value, content='labels', content_rowid='id', prefix='2 3'
+        )
+    ''')
+    cursor.execute('''
+        SELECT (SELECT COUNT(*) FROM labels_search_docsize) != (SELECT COUNT(*) FROM labels)
+    ''')
+    if cursor.fetchone()[0]:
+        cursor.execute("INSERT INTO labels_search (labels_search) VALUES ('rebuild')")
+
+def search_labels(text, table, columns):
+    """
+    SQL for the ids of labels matching a search box term, and its parameter.
+    
+    Each word of the term must start a word of the label ("veh th" finds
+    "Motor Vehicle Theft"). The term is matched as a substring instead,
+    value LIKE '%term%' as before the index, if that finds no label of the
+    searched columns of table (so "heft" still finds "Theft"), if a word is
+    shorter than FTS5_MIN_PREFIX, if it has no word characters, or on
+    builds without FTS5.
+    """
+    like = labels_where('value LIKE ?'), f'%{text}%'
+    words = re.findall(r'\w+', text)
+    if not FTS5_AVAILABLE or not words or min(map(len, words)) < FTS5_MIN_PREFIX:
+        return like
+    
+    match = ' '.join(f'"{word}"*' for word in words)
+    cursor = get_read_connection().cursor()
+    cursor.execute(f'''
+        SELECT 1 FROM labels_search
+        JOIN label_counts ON label_counts.label_id = labels_search.rowid
+        WHERE labels_search MATCH ? AND table_name = ? AND count > 0
+        AND column_name IN ({', '.join('?' * len(columns))})
+        LIMIT 1
+    ''', (match, table, *columns))
+    if cursor.fetchone() is None:
+        return like
+    return '(SELECT rowid FROM labels_search WHERE labels_search MATCH ?)', match
+
+def load_labels(cursor):
+    """{id: value} for every label"""
+    cursor.execute('SELECT id, value FROM labels')
+    return dict(cursor.fetchall())
+
+class Column:
+    """
+    One original column of a compact table: its name in the view, the
+    storage column holding it, and SQL to encode the original value
+    (over the original columns) and to decode the stored one.
+    """
+    def __init__(self, name, stored, encode, decode, is_label=False):
+        self.name = name
+        self.stored = stored
+        self.encode = encode
+        self.decode = decode
+        self.is_label = is_label
+
+def plain(name):
+    return Column(name, name, name, name)
+
+def label(name):
+    """A repeated text value, stored as the id of its label"""
+    return Column(name, f'{name}_id', label_id_sql(name), label_sql(f'{name}_id'), is_label=True)
+
+def day(name, stored, source=None):
+    """A date stored as a day number; source is the original column it comes from, if not name"""
+    return Column(name, stored, day_number_sql(source or name), day_text_sql(stored))
+
+class CompactTable:
+    """
+    A fact table kept in `storage` with label columns as integer ids and
+    dates as day numbers, read through a view named after the original
+    table. The view has every original column plus the stored integer
+    columns, so filters and sorts can use the integer indexes directly.
+    """
+    def __init__(self, name, storage, columns):
+        self.name = name
+        self.storage = storage
+        self.columns = columns
+    
+    def add_labels(self, cursor, source):
+        """Add the label values found in source (which has the original columns)"""
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM labels')
+        last_id = cursor.fetchone()[0]
+        
+        selects = ' UNION '.join(f'SELECT {column.name} AS value FROM {source}'
+                                 for column in self.columns if column.is_label)
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO labels (value)
+            SELECT value FROM ({selects}) WHERE value IS NOT NULL
+        ''')
+        
+        if FTS5_AVAILABLE:
+            cursor.execute('''
+                INSERT INTO labels_search (rowid, value)
+                SELECT id, value FROM labels WHERE id > ?
+            ''', (last_id,))
+    
+    def update_label_counts(self, cursor, last_id):
+        """Add the rows of storage with id > last_id to label_counts"""
+        for column in self.columns:
+            if not column.is_label:
+                continue
+            cursor.execute(f'''
+                INSERT INTO label_counts (table_name, column_name, label_id, count)
+                SELECT ?, ?, {column.stored}, COUNT(*)
+                FROM {self.storage}
+                WHERE id > ? AND {column.stored} IS NOT NULL
+                GROUP BY {column.stored}
+                ON CONFLICT (table_name, column_name, label_id)
+                DO UPDATE SET count = count + excluded.count
+            ''', (self.name, column.name, last_id))
+    
+    def init_label_counts(self, cursor):
+        """Backfill label_counts for databases created before it existed"""
+        cursor.execute('SELECT 1 FROM label_counts WHERE table_name = ? LIMIT 1', (self.name,))
+        if cursor.fetchone() is None:
+            self.update_label_counts(cursor, 0)
+    
+    def label_values(self, cursor, column, condition=None, by_count=False, limit=None):
+        """
+        The values of a label column present in the table, ordered by value
+        or (by_count) by number of rows, optionally only those satisfying a
+        condition on value
+        """
+        cursor.execute(f'''
+            SELECT labels.value FROM label_counts
+            JOIN labels ON labels.id = label_counts.label_id
+            WHERE table_name = ? AND column_name = ? AND count > 0
+            {f'AND ({condition})' if condition else ''}
+            ORDER BY {'count DESC' if by_count else 'labels.value'}
+            {f'LIMIT {int(limit)}' if limit else ''}
+        ''', (self.name, column))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def insert_sql(self, source, extra=()):
+        """INSERT OR IGNORE of source's rows into storage, encoding each column"""
+        stored = list(extra) + [column.stored for column in self.columns]
+        encoded = list(extra) + [column.encode for column in self.columns]
+        return f'''
+            INSERT OR IGNORE INTO {self.storage} ({', '.join(stored)})
+            SELECT {', '.join(encoded)} FROM {source} ORDER BY rowid
+        '''
+    
+    def create_view(self, cursor):
+        decoded = [f'{column.decode} AS {column.name}' for column in self.columns]
+        stored = [column.stored for column in self.columns
+                  if column.stored not in {c.name for c in self.columns}]
+        cursor.execute(f'''
+            CREATE VIEW IF NOT EXISTS {self.name} AS
+            SELECT id, {', '.join(decoded + stored)}, created_at
+            FROM {self.storage}
+        ''')
+    
+    def migrate(self, conn):
+        """
+        Move the rows of an original-schema table into storage and replace
+        the table with the view. IDs are kept, so anything keyed on them
+        stays valid. Returns True if there was a table to migrate; raises
+        RuntimeError, leaving the table in place, if any row can't be moved.
+        """
+        cursor = conn.cursor()
+        if not conn.in_transaction:
+            cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (self.name,))
+        row = cursor.fetchone()
+        if not row or row[0] != 'table':
+            return False
+        
+        cursor.execute(f'SELECT COUNT(*) FROM {self.name}')
+        total = cursor.fetchone()[0]
+        print(f"Migrating {total} rows of {self.name} to {self.storage}...")
+        
+        self.add_labels(cursor, self.name)
+        before = conn.total_changes
+        cursor.execute(self.insert_sql(self.name, extra=('id', 'created_at')))
+        migrated = conn.total_changes - before
+        
+        # Rows whose date or a required label can't be encoded would be lost
+        # with the table; refuse, rolling back, until they are fixed
+        if migrated < total:
+            raise RuntimeError(
+                f"{total - migrated} of {total} {self.name} rows can't be moved to {self.storage} "
+                f"(invalid date or missing value); fix or delete them, then restart. "
+                f"{self.name} is left as it was.")
+        
+        cursor.execute(f'DROP TABLE {self.name}')
+        return True
+
+def reclaim_free_space():
+    """VACUUM if a large part of the database file is unused pages"""
+    with writer() as conn:
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        pages = conn.execute('PRAGMA page_count').fetchone()[0]
+        if pages and free > pages * VACUUM_FREE_FRACTION:
+            print(f"Reclaiming {free} free pages...")
+            conn.execute('VACUUM')
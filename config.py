@@ -13,3 +13,49 @@ def get_db_path():
 
 # Single source of truth for database path
 DB_PATH = get_db_path()
+
+# CKAN datastore_search endpoint the fetchers page through; point it at a
+# stand-in server (benchmarks/ckan_server.py) to work without the portal
+FETCH_API_URL = os.environ.get(
+    'FETCH_API_URL', 'https://data.sanantonio.gov/api/3/action/datastore_search')
+
+# 'record' saves every fetched page under FETCH_CACHE_DIR; 'replay' serves
+# pages from there without touching the network; anything else does neither
+FETCH_CACHE_MODE = os.environ.get('FETCH_CACHE_MODE', '')
+FETCH_CACHE_DIR = os.environ.get(
+    'FETCH_CACHE_DIR', os.path.join(os.path.dirname(DB_PATH), 'fetch_cache'))
+
+# Politeness budget for data.sanantonio.gov, shared by every fetcher in the process
+FETCH_MAX_IN_FLIGHT = int(os.environ.get('FETCH_MAX_IN_FLIGHT', '4'))
+FETCH_REQUESTS_PER_SECOND = float(os.environ.get('FETCH_REQUESTS_PER_SECOND', '4'))
+
+# Retries of a failed page, waiting about FETCH_RETRY_BASE_DELAY seconds
+# and doubling (with jitter) up to FETCH_RETRY_MAX_DELAY between attempts
+FETCH_MAX_RETRIES = int(os.environ.get('FETCH_MAX_RETRIES', '5'))
+FETCH_RETRY_BASE_DELAY = float(os.environ.get('FETCH_RETRY_BASE_DELAY', '1'))
+FETCH_RETRY_MAX_DELAY = float(os.environ.get('FETCH_RETRY_MAX_DELAY', '60'))
+
+# SQLite tuning applied to every connection opened through connections.py
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', str(16 * 1024)))
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '30'))
+
+# Rate limiter state shared by all workers on the host; kept out of the main
+# database so request throttling never waits on a refresh's write lock
+RATE_LIMIT_DB_PATH = os.environ.get(
+    'RATE_LIMIT_DB_PATH', os.path.join(os.path.dirname(DB_PATH), 'rate_limits.db'))
+
+# Upper bound on identifiers tracked by the rate limiter; the least recently
+# seen are evicted first
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '100000'))
+
+# Backend for the dashboard stats: 'numpy' aggregates an in-memory columnar
+# copy of recent rows when NumPy is installed, 'sql' always queries SQLite
+ANALYTICS_ENGINE = os.environ.get('ANALYTICS_ENGINE', 'numpy')
+
+# Days of arrests and calls kept in the columnar copy; longer windows use SQL
+COLUMNAR_WINDOW_DAYS = int(os.environ.get('COLUMNAR_WINDOW_DAYS', '90'))
+
+# The refresh worker holding the refresh lease renews it every quarter of
+# this; if it dies, another worker may take over once this has passed
+REFRESH_LEASE_SECONDS = int(os.environ.get('REFRESH_LEASE_SECONDS', '120'))
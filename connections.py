@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from config import DB_PATH, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB, SQLITE_BUSY_TIMEOUT
+
+# Serializes writes within the process; the refresh threads queue here
+# instead of contending for SQLite's file lock
+write_lock = threading.RLock()
+
+_local = threading.local()
+_writer = None
+_writer_pid = None
+
+def _configure(conn):
+    """Apply the pragmas shared by readers and the writer"""
+    cursor = conn.cursor()
+    # WAL lets readers in every worker proceed while the writer commits
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+def _connect(check_same_thread=True):
+    conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT,
+                           check_same_thread=check_same_thread)
+    return _configure(conn)
+
+def get_read_connection():
+    """
+    Returns this thread's long-lived read connection, opening it on first use.
+    Connections are keyed on the process ID so forked gunicorn workers
+    never share a handle with their parent.
+    """
+    pid = os.getpid()
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'pid', None) != pid:
+        conn = _connect()
+        conn.execute('PRAGMA query_only=ON')
+        _local.conn = conn
+        _local.pid = pid
+    return conn
+
+@contextmanager
+def writer():
+    """
+    Yields the process's single writer connection while holding write_lock.
+    Commits when the block completes and rolls back if it raises.
+    """
+    global _writer, _writer_pid
+    with write_lock:
+        pid = os.getpid()
+        if _writer is None or _writer_pid != pid:
+            _writer = _connect(check_same_thread=False)
+            _writer_pid = pid
+        try:
+            yield _writer
+            _writer.commit()
+        except Exception:
+            _writer.rollback()
+            raise
@@ -1,51 +1,143 @@
-import sqlite3
+import json
 from datetime import datetime
 import os
-from config import DB_PATH
+from pagination import encode_cursor, decode_cursor, cached_count
+from ingest import bulk_insert, report_rejects
+from connections import get_read_connection, writer
+from result_cache import init_result_cache, memoized
+from refresh_status import init_refresh_status
+from us_crime_severity_weights import get_us_weighted_severity
+from compact_storage import (CompactTable, plain, label, day, init_labels, reclaim_free_space,
+                             label_id_sql, search_labels, day_number_sql, checked_date,
+                             LISTED_ZIP_CODES)
+
+# crimes is a view over crime_records, which stores label ids and day numbers
+CRIME_TABLE = CompactTable('crimes', 'crime_records', [
+    plain('report_id'),
+    day('report_date', 'report_epoch_day'),
+    label('crime_type'),
+    label('crime_against'),
+    label('service_area'),
+    label('zip_code'),
+    label('nibrs_group'),
+    plain('datetime_occurred'),
+])
 
 def init_database():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS crimes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            report_id TEXT UNIQUE NOT NULL,
-            report_date DATE NOT NULL,
-            crime_type TEXT NOT NULL,
-            crime_against TEXT NOT NULL,
-            service_area TEXT NOT NULL,
-            zip_code TEXT,
-            nibrs_group TEXT,
-            datetime_occurred TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_report_date ON crimes(report_date);
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_crime_type ON crimes(crime_type);
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_service_area ON crimes(service_area);
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS fetch_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fetch_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            records_fetched INTEGER,
-            date_range_start DATE,
-            date_range_end DATE
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    with writer() as conn:
+        cursor = conn.cursor()
+        
+        init_labels(cursor)
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crime_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                report_id TEXT UNIQUE NOT NULL,
+                report_epoch_day INTEGER NOT NULL,
+                crime_type_id INTEGER NOT NULL,
+                crime_against_id INTEGER NOT NULL,
+                service_area_id INTEGER NOT NULL,
+                zip_code_id INTEGER,
+                nibrs_group_id INTEGER,
+                datetime_occurred TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Databases created before compact storage have a crimes table
+        migrated = CRIME_TABLE.migrate(conn)
+        CRIME_TABLE.create_view(cursor)
+        CRIME_TABLE.init_label_counts(cursor)
+        
+        # Matches the list views' ORDER BY so keyset pages are index seeks
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_crime_records_day_id ON crime_records(report_epoch_day, report_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_crime_records_type ON crime_records(crime_type_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_crime_records_area ON crime_records(service_area_id);
+        ''')
+        
+        # With idx_crime_records_type, lets a search seek both of its columns
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_crime_records_group ON crime_records(nibrs_group_id);
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fetch_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fetch_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                records_fetched INTEGER,
+                date_range_start DATE,
+                date_range_end DATE
+            )
+        ''')
+        
+        # Daily counts per dimension combination, kept current at ingest so
+        # get_crime_stats never has to scan the raw crimes table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crime_daily_rollup (
+                report_date DATE NOT NULL,
+                crime_type TEXT NOT NULL,
+                crime_against TEXT NOT NULL,
+                service_area TEXT NOT NULL,
+                zip_code TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (report_date, crime_type, crime_against, service_area, zip_code)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Severity weight per (crime_type, crime_against), resolved once so
+        # CSI can be summed in SQL against the rollup
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crime_severity (
+                crime_type TEXT NOT NULL,
+                crime_against TEXT NOT NULL,
+                severity INTEGER NOT NULL,
+                PRIMARY KEY (crime_type, crime_against)
+            ) WITHOUT ROWID
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fetch_watermarks (
+                resource TEXT PRIMARY KEY,
+                watermark_date DATE NOT NULL,
+                boundary_ids TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Progress of a full refresh per resource, saved after every stored
+        # page so an interrupted one can resume from next_offset
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fetch_checkpoints (
+                resource TEXT PRIMARY KEY,
+                next_offset INTEGER NOT NULL,
+                records INTEGER NOT NULL,
+                inserted INTEGER NOT NULL,
+                start_date DATE,
+                end_date DATE,
+                days INTEGER NOT NULL,
+                newest_ids TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Rebuild the rollup from the migrated rows, whose dates are normalized
+        if migrated:
+            cursor.execute('DELETE FROM crime_daily_rollup')
+        
+        # Backfill the rollup for databases created before it existed
+        cursor.execute('SELECT 1 FROM crime_daily_rollup LIMIT 1')
+        if cursor.fetchone() is None:
+            update_crime_rollup(cursor, 0)
+        
+        # Re-resolve every known type so edits to the weight table take effect
+        refresh_crime_severity(cursor)
     
     # Also initialize arrests table
     from arrests_database import init_arrests_table
@@ -54,212 +146,277 @@ def init_database():
     # Also initialize calls table
     from calls_database import init_calls_table
     init_calls_table()
+    
+    # Shared cache for results derived from the data (e.g. insights)
+    init_result_cache()
+    
+    # Lease and progress records of the refresh worker
+    init_refresh_status()
+    
+    # Give back the space left by migrating to compact storage
+    reclaim_free_space()
 
-def insert_crime_records(records):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+CRIME_COLUMNS = (
+    'report_id', 'report_date', 'crime_type', 'crime_against',
+    'service_area', 'zip_code', 'nibrs_group', 'datetime_occurred'
+)
+
+def crime_record_to_row(record):
+    return (
+        record['Report_ID'],
+        checked_date(record['Report_Date']),
+        record['NIBRS_Code_Name'],
+        record['NIBRS_Crime_Against'],
+        record['Service_Area'],
+        record.get('Zip_Code', 'Unknown'),
+        record.get('NIBRS_Group', ''),
+        record.get('DateTime', record['Report_Date'])
+    )
+
+def update_crime_rollup(cursor, last_id):
+    """Add crimes with id > last_id to crime_daily_rollup"""
+    cursor.execute('''
+        INSERT INTO crime_daily_rollup (
+            report_date, crime_type, crime_against, service_area, zip_code, count
+        )
+        SELECT report_date, crime_type, crime_against, service_area,
+               COALESCE(zip_code, 'Unknown'), COUNT(*)
+        FROM crimes
+        WHERE id > ?
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (report_date, crime_type, crime_against, service_area, zip_code)
+        DO UPDATE SET count = count + excluded.count
+    ''', (last_id,))
+
+def _severity_rows(pairs):
+    return [(crime_type, crime_against, get_us_weighted_severity(crime_type, crime_against))
+            for crime_type, crime_against in pairs]
+
+def refresh_crime_severity(cursor):
+    """Resolve the severity of every crime type in the rollup"""
+    cursor.execute('SELECT DISTINCT crime_type, crime_against FROM crime_daily_rollup')
+    cursor.executemany('INSERT OR REPLACE INTO crime_severity VALUES (?, ?, ?)',
+                       _severity_rows(cursor.fetchall()))
+
+def update_crime_severity(cursor, last_id):
+    """Resolve the severity of crime types first seen in crimes with id > last_id"""
+    cursor.execute('''
+        SELECT DISTINCT crime_type, crime_against FROM crimes c
+        WHERE id > ?
+        AND NOT EXISTS (
+            SELECT 1 FROM crime_severity s
+            WHERE s.crime_type = c.crime_type AND s.crime_against = c.crime_against
+        )
+    ''', (last_id,))
+    cursor.executemany('INSERT INTO crime_severity VALUES (?, ?, ?)',
+                       _severity_rows(cursor.fetchall()))
+
+def update_crime_summaries(cursor, last_id):
+    """Bring the tables derived from crimes up to date with newly inserted rows"""
+    update_crime_rollup(cursor, last_id)
+    update_crime_severity(cursor, last_id)
+
+def insert_crime_records(records, rejects=None):
+    if rejects is None:
+        rejects = []
+    
+    with writer() as conn:
+        inserted_count = bulk_insert(conn, CRIME_TABLE, CRIME_COLUMNS, records,
+                                     crime_record_to_row, rejects,
+                                     on_insert=update_crime_summaries)
+    report_rejects(rejects, 'crime')
     
-    inserted_count = 0
-    for record in records:
-        try:
-            cursor.execute('''
-                INSERT OR IGNORE INTO crimes (
-                    report_id, report_date, crime_type, crime_against,
-                    service_area, zip_code, nibrs_group, datetime_occurred
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                record['Report_ID'],
-                record['Report_Date'],
-                record['NIBRS_Code_Name'],
-                record['NIBRS_Crime_Against'],
-                record['Service_Area'],
-                record.get('Zip_Code', 'Unknown'),
-                record.get('NIBRS_Group', ''),
-                record.get('DateTime', record['Report_Date'])
-            ))
-            if cursor.rowcount > 0:
-                inserted_count += 1
-        except Exception as e:
-            print(f"Error inserting record {record.get('Report_ID')}: {e}")
-    
-    conn.commit()
-    conn.close()
     return inserted_count
 
 def log_fetch(records_count, start_date, end_date):
-    conn = sqlite3.connect(DB_PATH)
+    with writer() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT INTO fetch_history (records_fetched, date_range_start, date_range_end)
+            VALUES (?, ?, ?)
+        ''', (records_count, start_date, end_date))
+
+def get_data_version():
+    """
+    Token that changes once per finished refresh: the newest finished
+    refresh run's ID. Sources log their fetches as they finish, so
+    fetch_history would move it up to three times per refresh.
+    """
+    conn = get_read_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO fetch_history (records_fetched, date_range_start, date_range_end)
-        VALUES (?, ?, ?)
-    ''', (records_count, start_date, end_date))
-    
-    conn.commit()
-    conn.close()
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM refresh_runs WHERE finished_at IS NOT NULL')
+    return cursor.fetchone()[0]
 
-def get_crime_stats(days=30):
-    conn = sqlite3.connect(DB_PATH)
+def get_fetch_watermark(resource):
+    """
+    Returns the stored watermark for a resource as
+    {'date': newest stored day, 'ids': set of IDs already stored on that day},
+    or None if the resource has never been fetched.
+    """
+    conn = get_read_connection()
     cursor = conn.cursor()
     
-    stats = {}
-    
-    # Get the most recent date in the database
-    cursor.execute('SELECT MAX(report_date) FROM crimes')
-    max_date_result = cursor.fetchone()
-    
-    if max_date_result and max_date_result[0]:
-        # Calculate date range based on most recent data
-        cursor.execute('''
-            SELECT COUNT(*) FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-        ''', (max_date_result[0], days-1))
-    else:
-        cursor.execute('SELECT COUNT(*) FROM crimes')
+    cursor.execute('''
+        SELECT watermark_date, boundary_ids FROM fetch_watermarks
+        WHERE resource = ?
+    ''', (resource,))
     
-    stats['total_crimes'] = cursor.fetchone()[0]
+    result = cursor.fetchone()
     
-    # Crimes by type
-    if max_date_result and max_date_result[0]:
-        cursor.execute('''
-            SELECT crime_type, COUNT(*) as count 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY crime_type 
-            ORDER BY count DESC 
-            LIMIT 10
-        ''', (max_date_result[0], days-1))
-    else:
+    if result:
+        return {'date': result[0], 'ids': set(json.loads(result[1]))}
+    return None
+
+def update_fetch_watermark(resource, day_ids):
+    """
+    Advance a resource's watermark from an iterable of (day, record_id) pairs.
+    IDs on the boundary day are merged with those already stored.
+    """
+    max_day = None
+    boundary_ids = set()
+    for day, record_id in day_ids:
+        if not day:
+            continue
+        if max_day is None or day > max_day:
+            max_day = day
+            boundary_ids = {record_id}
+        elif day == max_day:
+            boundary_ids.add(record_id)
+    
+    if max_day is None:
+        return
+    
+    current = get_fetch_watermark(resource)
+    if current:
+        if current['date'] > max_day:
+            return
+        if current['date'] == max_day:
+            boundary_ids |= current['ids']
+    
+    with writer() as conn:
+        cursor = conn.cursor()
+        
         cursor.execute('''
-            SELECT crime_type, COUNT(*) as count 
-            FROM crimes 
-            GROUP BY crime_type 
-            ORDER BY count DESC 
-            LIMIT 10
-        ''')
-    stats['crimes_by_type'] = cursor.fetchall()
+            INSERT OR REPLACE INTO fetch_watermarks (resource, watermark_date, boundary_ids, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (resource, max_day, json.dumps(sorted(boundary_ids))))
+
+def get_fetch_checkpoint(resource):
+    """
+    Returns the checkpoint of a resource's interrupted full refresh as
+    {'offset', 'records', 'inserted', 'start_date', 'end_date', 'days', 'newest_ids'},
+    or None if there is nothing to resume.
+    """
+    conn = get_read_connection()
+    cursor = conn.cursor()
     
-    # Crimes by category
-    if max_date_result and max_date_result[0]:
-        cursor.execute('''
-            SELECT crime_against, COUNT(*) as count 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY crime_against 
-            ORDER BY count DESC
-        ''', (max_date_result[0], days-1))
-    else:
-        cursor.execute('''
-            SELECT crime_against, COUNT(*) as count 
-            FROM crimes 
-            GROUP BY crime_against 
-            ORDER BY count DESC
-        ''')
-    stats['crimes_by_category'] = cursor.fetchall()
+    cursor.execute('''
+        SELECT next_offset, records, inserted, start_date, end_date, days, newest_ids
+        FROM fetch_checkpoints WHERE resource = ?
+    ''', (resource,))
     
-    # Crimes by service area
-    if max_date_result and max_date_result[0]:
-        cursor.execute('''
-            SELECT service_area, COUNT(*) as count 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY service_area 
-            ORDER BY count DESC
-        ''', (max_date_result[0], days-1))
-    else:
-        cursor.execute('''
-            SELECT service_area, COUNT(*) as count 
-            FROM crimes 
-            GROUP BY service_area 
-            ORDER BY count DESC
-        ''')
-    stats['crimes_by_area'] = cursor.fetchall()
+    result = cursor.fetchone()
     
-    # Top zip codes
-    if max_date_result and max_date_result[0]:
-        cursor.execute('''
-            SELECT zip_code, COUNT(*) as count 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND zip_code NOT LIKE '%Out of%' 
-            AND zip_code != 'Unknown'
-            GROUP BY zip_code 
-            ORDER BY count DESC 
-            LIMIT 10
-        ''', (max_date_result[0], days-1))
-    else:
-        cursor.execute('''
-            SELECT zip_code, COUNT(*) as count 
-            FROM crimes 
-            WHERE zip_code NOT LIKE '%Out of%' 
-            AND zip_code != 'Unknown'
-            GROUP BY zip_code 
-            ORDER BY count DESC 
-            LIMIT 10
-        ''')
-    stats['top_zip_codes'] = cursor.fetchall()
+    if result:
+        return {
+            'offset': result[0],
+            'records': result[1],
+            'inserted': result[2],
+            'start_date': result[3],
+            'end_date': result[4],
+            'days': result[5],
+            'newest_ids': json.loads(result[6])
+        }
+    return None
 
-    # All zip code counts
-    if max_date_result and max_date_result[0]:
-        cursor.execute('''
-            SELECT zip_code, COUNT(*) as count 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND zip_code NOT LIKE '%Out of%' 
-            AND zip_code != 'Unknown'
-            GROUP BY zip_code 
-            ORDER BY count DESC
-        ''', (max_date_result[0], days - 1))
-    else:
+def save_fetch_checkpoint(resource, next_offset, inserted, progress):
+    """Record that a full refresh has stored everything before next_offset"""
+    with writer() as conn:
+        cursor = conn.cursor()
+        
         cursor.execute('''
-            SELECT zip_code, COUNT(*) as count 
-            FROM crimes 
-            WHERE zip_code NOT LIKE '%Out of%' 
-            AND zip_code != 'Unknown'
-            GROUP BY zip_code 
-            ORDER BY count DESC 
-        ''')
-    stats['crime_count_zip_codes'] = cursor.fetchall()
+            INSERT OR REPLACE INTO fetch_checkpoints
+                (resource, next_offset, records, inserted, start_date, end_date, days, newest_ids, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (resource, next_offset, progress.records, inserted, progress.start_date,
+              progress.end_date, progress.days, json.dumps(sorted(progress.newest_ids))))
+
+def clear_fetch_checkpoint(resource):
+    with writer() as conn:
+        conn.execute('DELETE FROM fetch_checkpoints WHERE resource = ?', (resource,))
+
+def watermark_covers(watermark, day, record_id):
+    """True if a record with this day and ID is already covered by the watermark"""
+    if not watermark:
+        return False
+    return day < watermark['date'] or (day == watermark['date'] and record_id in watermark['ids'])
+
+VIOLENT_CRIME_KEYWORDS = ('assault', 'rape', 'robbery', 'homicide')
+
+def _is_mappable_zip(zip_code):
+    return 'out of' not in zip_code.lower() and zip_code != 'Unknown'
+
+def _top(counts, limit=None):
+    # Highest count first; ties broken by key for a stable order
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit] if limit else ranked
+
+def get_crime_stats(days=30):
+    conn = get_read_connection()
+    cursor = conn.cursor()
     
-    # Daily trend
-    if max_date_result and max_date_result[0]:
-        cursor.execute('''
-            SELECT report_date, COUNT(*) as count 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY report_date 
-            ORDER BY report_date
-        ''', (max_date_result[0], days-1))
-    else:
-        cursor.execute('''
-            SELECT report_date, COUNT(*) as count 
-            FROM crimes 
-            GROUP BY report_date 
-            ORDER BY report_date
-        ''')
-    stats['daily_trend'] = cursor.fetchall()
+    # Get the most recent date in the database
+    cursor.execute('SELECT MAX(report_date) FROM crime_daily_rollup')
+    max_date = cursor.fetchone()[0]
     
-    # Violent crimes count
-    if max_date_result and max_date_result[0]:
-        cursor.execute('''
-            SELECT COUNT(*) FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND (crime_type LIKE '%Assault%' OR crime_type LIKE '%Rape%' 
-                 OR crime_type LIKE '%Robbery%' OR crime_type LIKE '%Homicide%')
-        ''', (max_date_result[0], days-1))
-    else:
-        cursor.execute('''
-            SELECT COUNT(*) FROM crimes 
-            WHERE (crime_type LIKE '%Assault%' OR crime_type LIKE '%Rape%' 
-                 OR crime_type LIKE '%Robbery%' OR crime_type LIKE '%Homicide%')
-        ''')
-    stats['violent_crimes'] = cursor.fetchone()[0]
+    # Read the window from the rollup once and derive every breakdown from it
+    cursor.execute('''
+        SELECT report_date, crime_type, crime_against, service_area, zip_code, count
+        FROM crime_daily_rollup
+        WHERE report_date >= date(?, '-' || ? || ' days')
+    ''', (max_date, days-1))
+    
+    total = 0
+    by_type = {}
+    by_category = {}
+    by_area = {}
+    by_zip = {}
+    by_day = {}
+    violent = 0
+    violent_types = {}
+    
+    for report_date, crime_type, crime_against, service_area, zip_code, count in cursor:
+        total += count
+        by_type[crime_type] = by_type.get(crime_type, 0) + count
+        by_category[crime_against] = by_category.get(crime_against, 0) + count
+        by_area[service_area] = by_area.get(service_area, 0) + count
+        by_day[report_date] = by_day.get(report_date, 0) + count
+        if _is_mappable_zip(zip_code):
+            by_zip[zip_code] = by_zip.get(zip_code, 0) + count
+        
+        is_violent = violent_types.get(crime_type)
+        if is_violent is None:
+            lowered = crime_type.lower()
+            is_violent = any(word in lowered for word in VIOLENT_CRIME_KEYWORDS)
+            violent_types[crime_type] = is_violent
+        if is_violent:
+            violent += count
     
-    conn.close()
-    return stats
+    return {
+        'total_crimes': total,
+        'crimes_by_type': _top(by_type, 10),
+        'crimes_by_category': _top(by_category),
+        'crimes_by_area': _top(by_area),
+        'top_zip_codes': _top(by_zip, 10),
+        'crime_count_zip_codes': _top(by_zip),
+        'daily_trend': sorted(by_day.items()),
+        'violent_crimes': violent
+    }
 
 def get_last_fetch_info():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -270,7 +427,6 @@ def get_last_fetch_info():
     ''')
     
     result = cursor.fetchone()
-    conn.close()
     
     if result:
         return {
@@ -281,8 +437,8 @@ def get_last_fetch_info():
         }
     return None
 
-def get_crimes_list(page=1, per_page=100, filters=None):
-    conn = sqlite3.connect(DB_PATH)
+def get_crimes_list(page=1, per_page=100, filters=None, after=None, include_total=True):
+    conn = get_read_connection()
     cursor = conn.cursor()
     
     # Base query
@@ -297,77 +453,74 @@ def get_crimes_list(page=1, per_page=100, filters=None):
     # Apply filters
     if filters:
         if filters.get('crime_type'):
-            query += ' AND crime_type = ?'
+            query += f' AND crime_type_id = {label_id_sql("?")}'
             params.append(filters['crime_type'])
         
         if filters.get('service_area'):
-            query += ' AND service_area = ?'
+            query += f' AND service_area_id = {label_id_sql("?")}'
             params.append(filters['service_area'])
         
         if filters.get('zip_code'):
-            query += ' AND zip_code = ?'
+            query += f' AND zip_code_id = {label_id_sql("?")}'
             params.append(filters['zip_code'])
         
         if filters.get('date_from'):
-            query += ' AND report_date >= ?'
+            query += f' AND report_epoch_day >= {day_number_sql("?")}'
             params.append(filters['date_from'])
         
         if filters.get('date_to'):
-            query += ' AND report_date <= ?'
+            query += f' AND report_epoch_day <= {day_number_sql("?")}'
             params.append(filters['date_to'])
         
         if filters.get('search'):
-            query += ' AND (crime_type LIKE ? OR nibrs_group LIKE ?)'
-            search_term = f'%{filters["search"]}%'
+            # Matched against the label index, then the label ids' indexes
+            matching, search_term = search_labels(filters['search'], 'crimes', ('crime_type', 'nibrs_group'))
+            query += f' AND (crime_type_id IN {matching} OR nibrs_group_id IN {matching})'
             params.extend([search_term, search_term])
     
-    # Count total records
-    count_query = f'SELECT COUNT(*) FROM ({query})'
-    cursor.execute(count_query, params)
-    total_count = cursor.fetchone()[0]
+    # Count total records (cached until new rows arrive; optional for API clients)
+    total_count = cached_count(cursor, 'crimes', query, params) if include_total else None
+    
+    # Seek past the previous page's last row when a cursor is given,
+    # otherwise fall back to offset pagination
+    sort_key = decode_cursor(after)
+    if sort_key:
+        query += f' AND (report_epoch_day, report_id) < ({day_number_sql("?")}, ?)'
+        params.extend(sort_key)
     
     # Add ordering and pagination
-    query += ' ORDER BY report_date DESC, report_id DESC'
-    query += ' LIMIT ? OFFSET ?'
-    params.extend([per_page, (page - 1) * per_page])
+    query += ' ORDER BY report_epoch_day DESC, report_id DESC'
+    if sort_key:
+        query += ' LIMIT ?'
+        params.append(per_page)
+    else:
+        query += ' LIMIT ? OFFSET ?'
+        params.extend([per_page, (page - 1) * per_page])
     
     cursor.execute(query, params)
     crimes = cursor.fetchall()
     
-    conn.close()
+    # Cursor for the following page, encoding the last row's sort key
+    next_cursor = encode_cursor((crimes[-1][1], crimes[-1][0])) if len(crimes) == per_page else None
     
     return {
         'crimes': crimes,
         'total': total_count,
         'page': page,
         'per_page': per_page,
-        'total_pages': (total_count + per_page - 1) // per_page
+        'total_pages': (total_count + per_page - 1) // per_page if total_count is not None else None,
+        'next_cursor': next_cursor
     }
 
 def get_filter_options():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get unique crime types
-    cursor.execute('SELECT DISTINCT crime_type FROM crimes ORDER BY crime_type')
-    crime_types = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique service areas
-    cursor.execute('SELECT DISTINCT service_area FROM crimes ORDER BY service_area')
-    service_areas = [row[0] for row in cursor.fetchall()]
-    
-    # Get unique zip codes
-    cursor.execute('''
-        SELECT DISTINCT zip_code FROM crimes 
-        WHERE zip_code NOT LIKE '%Out of%' AND zip_code != 'Unknown'
-        ORDER BY zip_code
-    ''')
-    zip_codes = [row[0] for row in cursor.fetchall()]
-    
-    conn.close()
+    """Dropdown values for the crimes list, from label_counts and cached per data version"""
+    return memoized('crime_filter_options', get_data_version(), _filter_options)
+
+def _filter_options():
+    cursor = get_read_connection().cursor()
     
     return {
-        'crime_types': crime_types,
-        'service_areas': service_areas,
-        'zip_codes': zip_codes
+        'crime_types': CRIME_TABLE.label_values(cursor, 'crime_type'),
+        'service_areas': CRIME_TABLE.label_values(cursor, 'service_area'),
+        'zip_codes': CRIME_TABLE.label_values(cursor, 'zip_code', LISTED_ZIP_CODES)
     }
\ No newline at end of file
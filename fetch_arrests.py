@@ -1,52 +1,56 @@
-import requests
 import json
 from datetime import datetime, timedelta
 from arrests_database import init_arrests_table, insert_arrest_records
-import time
+from database import (get_fetch_watermark, update_fetch_watermark, watermark_covers, log_fetch,
+                      get_fetch_checkpoint, save_fetch_checkpoint, clear_fetch_checkpoint)
 import pytz
+from fetch_engine import fetch_page, iter_pages, DayCounter, FetchProgress, FetchFailed, UP_TO_DATE
 
 # CST timezone
 CST = pytz.timezone('America/Chicago')
 
-API_BASE_URL = "https://data.sanantonio.gov/api/3/action/datastore_search"
 RESOURCE_ID = "5bf98f1b-25c2-488c-aba7-082d7f8d38aa"
 RECORDS_PER_PAGE = 1000
 
-def fetch_arrests_data_page(offset=0):
-    params = {
-        'resource_id': RESOURCE_ID,
-        'limit': RECORDS_PER_PAGE,
-        'offset': offset,
-        'sort': 'Report_Date desc'
-    }
-    
-    try:
-        response = requests.get(API_BASE_URL, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching arrests data: {e}")
-        return None
+# The columns arrest_record_to_row stores
+FIELDS = ('Report_ID', 'Report_Date', 'Person', 'Offense', 'Severity',
+          'Service_Area', 'Report_Month', 'Zip_Code', 'DateTime')
+
+def fetch_arrests_data_page(offset=0, date_filter=None):
+    # Only the stored columns and, with a date_filter day, only records from
+    # that day on; fetch_page falls back to whole records if the portal refuses
+    return fetch_page(RESOURCE_ID, offset, RECORDS_PER_PAGE, 'Report_Date', FIELDS,
+                      date_filter, 'arrests data')
 
-def fetch_all_arrests_data(days=30, fetch_all=False):
+def fetch_all_arrests_data(days=30, fetch_all=False, watermark=None, checkpoint=None):
+    """
+    Yield (offset, page) pairs of arrest records, newest first, from a
+    checkpoint's offset when resuming. Only one page is held at a time so
+    memory stays flat on full refreshes. Raises FetchFailed if a page can't
+    be fetched.
+    """
     if fetch_all:
         print("Starting to fetch ALL arrests data...")
     else:
         print(f"Starting to fetch arrests data for the last {days} days...")
     
     # Get the most recent data available
-    all_records = []
-    offset = 0
+    fetched_count = checkpoint['records'] if checkpoint else 0
+    day_counter = DayCounter(days)
     total_records = None
     records_needed = days * 100 if not fetch_all else float('inf')  # No limit when fetching all
     
-    while len(all_records) < records_needed:
-        print(f"Fetching arrests records from offset {offset}...")
-        data = fetch_arrests_data_page(offset)
+    # Records older than the watermark day are already stored, so the portal
+    # needn't send them
+    since = watermark['date'] if watermark else None
+    
+    for offset, data in iter_pages(lambda offset: fetch_arrests_data_page(offset, since), RECORDS_PER_PAGE,
+                                   checkpoint['offset'] if checkpoint else 0):
+        print(f"Fetched arrests records from offset {offset}...")
         
         if not data or not data.get('success'):
             print("Failed to fetch arrests data")
-            break
+            raise FetchFailed(f"arrests data page at offset {offset}")
         
         result = data.get('result', {})
         records = result.get('records', [])
@@ -54,65 +58,86 @@ def fetch_all_arrests_data(days=30, fetch_all=False):
         if not records:
             break
         
-        # Just add all records - we'll get the most recent 30 days worth
-        all_records.extend(records)
+        # Stop once a whole page is already stored (sorted newest first)
+        if watermark and all(watermark_covers(watermark, r.get('Report_Date', ''), r.get('Report_ID'))
+                             for r in records):
+            print(f"Reached stored arrests watermark ({watermark['date']}), stopping")
+            break
         
         # Check if we have enough days of data (only when not fetching all)
-        if not fetch_all and all_records:
-            dates = sorted(set(r['Report_Date'] for r in all_records if 'Report_Date' in r), reverse=True)
-            if len(dates) >= days:
+        if not fetch_all:
+            day_counter.add(r.get('Report_Date') for r in records)
+            cutoff_date = day_counter.cutoff()
+            if cutoff_date:
                 print(f"Fetched {days} days of arrests data, stopping")
-                # Filter to exactly the most recent 30 days
-                cutoff_date = dates[days-1] if len(dates) >= days else dates[-1]
-                all_records = [r for r in all_records if r.get('Report_Date', '') >= cutoff_date]
+                # Earlier pages are all newer, so only this page needs trimming
+                records = [r for r in records if r.get('Report_Date', '') >= cutoff_date]
+                fetched_count += len(records)
+                yield offset, records
                 break
         
-        # Get total from first request
-        if total_records is None:
-            total_records = result.get('total', 0)
+        fetched_count += len(records)
+        yield offset, records
+        
+        # Get total from first request (date-filtered pages don't report one)
+        if total_records is None and 'total' in result:
+            total_records = result['total']
             print(f"Total arrests records available: {total_records}")
         
         # Check if we've fetched all records
         if len(records) < RECORDS_PER_PAGE:
             break
         
-        offset += RECORDS_PER_PAGE
-        
-        # Be nice to the API
-        time.sleep(0.5)
-    
-    print(f"Fetched {len(all_records)} arrests records total")
-    
-    # Get date range
-    if all_records:
-        dates = [r['Report_Date'] for r in all_records if 'Report_Date' in r]
-        start_date = min(dates) if dates else datetime.now().strftime('%Y-%m-%d')
-        end_date = max(dates) if dates else datetime.now().strftime('%Y-%m-%d')
-    else:
-        start_date = end_date = datetime.now().strftime('%Y-%m-%d')
+        if fetched_count >= records_needed:
+            break
     
-    return all_records, start_date, end_date
+    print(f"Fetched {fetched_count} arrests records total")
 
-def refresh_arrests_data(days=30, fetch_all=False):
+def refresh_arrests_data(days=30, fetch_all=False, resume=False):
     current_time = datetime.now(CST).strftime('%B %d, %Y at %I:%M %p CST')
     print(f"Refreshing arrests data - {current_time}")
     
     # Initialize arrests table if needed
     init_arrests_table()
     
-    # Fetch data
-    records, start_date, end_date = fetch_all_arrests_data(days, fetch_all)
+    # Full refreshes re-walk everything, checkpointing each stored page so an
+    # interrupted one can resume; incremental ones stop at the watermark
+    watermark = None if fetch_all else get_fetch_watermark('arrests')
+    checkpoint = get_fetch_checkpoint('arrests') if fetch_all and resume else None
+    if checkpoint:
+        print(f"Resuming arrests data from offset {checkpoint['offset']}")
+    elif fetch_all and resume:
+        print("No arrests data checkpoint to resume, starting from the newest records")
+    
+    # Insert each page as it arrives, committing per batch. A page that
+    # still fails after retries raises FetchFailed before the watermark
+    # moves, so the records past it are fetched next time, not skipped
+    progress = FetchProgress(checkpoint)
+    inserted_count = checkpoint['inserted'] if checkpoint else 0
+    for offset, records in fetch_all_arrests_data(days, fetch_all, watermark, checkpoint):
+        inserted_count += insert_arrest_records(records)
+        for r in records:
+            progress.add(r.get('Report_Date'), r.get('Report_ID'))
+        if fetch_all:
+            save_fetch_checkpoint('arrests', offset + len(records), inserted_count, progress)
     
-    if records:
-        # Insert into database
-        inserted_count = insert_arrest_records(records)
+    if fetch_all:
+        clear_fetch_checkpoint('arrests')
+    
+    if progress.records:
         print(f"Inserted {inserted_count} new arrest records into database")
         
+        update_fetch_watermark('arrests', progress.watermark_pairs())
+        
         # Log the fetch in the existing fetch_history table
-        from database import log_fetch
-        log_fetch(inserted_count, start_date, end_date)
+        today = datetime.now().strftime('%Y-%m-%d')
+        log_fetch(inserted_count, progress.start_date or today, progress.end_date or today)
         
         return True
+    elif watermark:
+        # Stopped at the watermark: nothing newer has been published
+        print("Arrests data is up to date")
+        return UP_TO_DATE
     else:
         print("No arrest records fetched")
         return False
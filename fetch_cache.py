@@ -0,0 +1,37 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from config import FETCH_CACHE_DIR
+
+def response_path(params):
+    """
+    File of the recorded response to a datastore_search request: one
+    directory per resource, named by offset plus a digest of every other
+    parameter (sort, limit, ...) so differently shaped requests don't collide.
+    datastore_search_sql queries have no resource_id or offset of their own
+    and go under sql/, named by the digest of the query.
+    """
+    rest = {key: value for key, value in params.items() if key not in ('resource_id', 'offset')}
+    digest = hashlib.sha1(json.dumps(rest, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    return os.path.join(FETCH_CACHE_DIR, str(params.get('resource_id', 'sql')),
+                        f"{int(params.get('offset', 0)):09d}-{digest}.json.gz")
+
+def load(params):
+    """The recorded response body for params, or None if it was never recorded"""
+    try:
+        with gzip.open(response_path(params), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def store(params, body):
+    """Record a response body; written to a temporary file first so a replay never sees half of one"""
+    path = response_path(params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with gzip.open(partial, 'wb') as f:
+        f.write(body)
+    os.replace(partial, path)
+
@@ -1,34 +1,39 @@
-import requests
 import json
 from datetime import datetime, timedelta
 from calls_database import init_calls_table, insert_call_records
-import time
+from database import (get_fetch_watermark, update_fetch_watermark, watermark_covers, log_fetch,
+                      get_fetch_checkpoint, save_fetch_checkpoint, clear_fetch_checkpoint)
 import pytz
+from fetch_engine import fetch_page, iter_pages, DayCounter, FetchProgress, FetchFailed, UP_TO_DATE
 
 # CST timezone
 CST = pytz.timezone('America/Chicago')
 
-API_BASE_URL = "https://data.sanantonio.gov/api/3/action/datastore_search"
 RESOURCE_ID = "9cb17985-ac16-49a6-ad69-6fe5ad8f2bf5"
 RECORDS_PER_PAGE = 1000
 
-def fetch_calls_data_page(offset=0):
-    params = {
-        'resource_id': RESOURCE_ID,
-        'limit': RECORDS_PER_PAGE,
-        'offset': offset,
-        'sort': 'Response_Date desc'
-    }
-    
-    try:
-        response = requests.get(API_BASE_URL, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching calls data: {e}")
-        return None
+# The columns call_record_to_row stores
+FIELDS = ('Master_Incident_Number', 'Response_Date', 'Priority', 'Problem', 'Type',
+          'Service_Area', 'Seconds', 'Weekday', 'Disposition_Groups',
+          'Disposition_Type', 'Postal_Code')
+
+def fetch_calls_data_page(offset=0, date_filter=None):
+    # Only the stored columns and, with a date_filter day, only records from
+    # that day on; fetch_page falls back to whole records if the portal refuses
+    return fetch_page(RESOURCE_ID, offset, RECORDS_PER_PAGE, 'Response_Date', FIELDS,
+                      date_filter, 'calls data')
+
+def response_day(record):
+    """Date portion of a call's Response_Date timestamp"""
+    return (record.get('Response_Date') or '').split(' ')[0]
 
-def fetch_all_calls_data(days=30, fetch_all=False):
+def fetch_all_calls_data(days=30, fetch_all=False, watermark=None, checkpoint=None):
+    """
+    Yield (offset, page) pairs of call records, newest first, from a
+    checkpoint's offset when resuming. Only one page is held at a time so
+    memory stays flat on full refreshes. Raises FetchFailed if a page can't
+    be fetched.
+    """
     if fetch_all:
         # When using --refresh, limit to 180 days max
         days = 180
@@ -37,18 +42,25 @@ def fetch_all_calls_data(days=30, fetch_all=False):
         print(f"Starting to fetch calls for service data for the last {days} days...")
     
     # Get the most recent data available
-    all_records = []
-    offset = 0
+    fetched_count = checkpoint['records'] if checkpoint else 0
+    day_counter = DayCounter(days)
+    # Full refreshes of calls keep the 180-day cutoff, so unlike the
+    # others a resumed one must continue the day count
+    day_counter.resume(checkpoint)
     total_records = None
     records_needed = days * 500  # Always use days limit now
     
-    while len(all_records) < records_needed:
-        print(f"Fetching calls records from offset {offset}...")
-        data = fetch_calls_data_page(offset)
+    # Records older than the watermark day are already stored, so the portal
+    # needn't send them
+    since = watermark['date'] if watermark else None
+    
+    for offset, data in iter_pages(lambda offset: fetch_calls_data_page(offset, since), RECORDS_PER_PAGE,
+                                   checkpoint['offset'] if checkpoint else 0):
+        print(f"Fetched calls records from offset {offset}...")
         
         if not data or not data.get('success'):
             print("Failed to fetch calls data")
-            break
+            raise FetchFailed(f"calls data page at offset {offset}")
         
         result = data.get('result', {})
         records = result.get('records', [])
@@ -56,87 +68,85 @@ def fetch_all_calls_data(days=30, fetch_all=False):
         if not records:
             break
         
-        # Just add all records - we'll get the most recent 30 days worth
-        all_records.extend(records)
+        # Stop once a whole page is already stored (sorted newest first)
+        if watermark and all(watermark_covers(watermark, response_day(r), r.get('Master_Incident_Number'))
+                             for r in records):
+            print(f"Reached stored calls watermark ({watermark['date']}), stopping")
+            break
         
         # Check if we have enough days of data
-        if all_records:
-            # Extract dates from response_date timestamps
-            dates = []
-            for r in all_records:
-                if 'Response_Date' in r and r['Response_Date']:
-                    try:
-                        # Parse the date portion only
-                        date_str = r['Response_Date'].split(' ')[0]
-                        dates.append(date_str)
-                    except:
-                        continue
-            
-            unique_dates = sorted(set(dates), reverse=True)
-            if len(unique_dates) >= days:
-                print(f"Fetched {days} days of calls data, stopping")
-                # Filter to exactly the most recent 30 days
-                cutoff_date = unique_dates[days-1] if len(unique_dates) >= days else unique_dates[-1]
-                all_records = [r for r in all_records if r.get('Response_Date', '').startswith(cutoff_date) or r.get('Response_Date', '') > cutoff_date]
-                break
+        day_counter.add(map(response_day, records))
+        cutoff_date = day_counter.cutoff()
+        if cutoff_date:
+            print(f"Fetched {days} days of calls data, stopping")
+            # Earlier pages are all newer, so only this page needs trimming
+            records = [r for r in records if response_day(r) >= cutoff_date]
+            fetched_count += len(records)
+            yield offset, records
+            break
         
-        # Get total from first request
-        if total_records is None:
-            total_records = result.get('total', 0)
+        fetched_count += len(records)
+        yield offset, records
+        
+        # Get total from first request (date-filtered pages don't report one)
+        if total_records is None and 'total' in result:
+            total_records = result['total']
             print(f"Total calls records available: {total_records}")
         
         # Check if we've fetched all records
         if len(records) < RECORDS_PER_PAGE:
             break
         
-        offset += RECORDS_PER_PAGE
-        
-        # Be nice to the API
-        time.sleep(0.5)
-    
-    print(f"Fetched {len(all_records)} calls records total")
-    
-    # Get date range
-    if all_records:
-        dates = []
-        for r in all_records:
-            if 'Response_Date' in r and r['Response_Date']:
-                try:
-                    date_str = r['Response_Date'].split(' ')[0]
-                    dates.append(date_str)
-                except:
-                    continue
-        
-        if dates:
-            start_date = min(dates)
-            end_date = max(dates)
-        else:
-            start_date = end_date = datetime.now().strftime('%Y-%m-%d')
-    else:
-        start_date = end_date = datetime.now().strftime('%Y-%m-%d')
+        if fetched_count >= records_needed:
+            break
     
-    return all_records, start_date, end_date
+    print(f"Fetched {fetched_count} calls records total")
 
-def refresh_calls_data(days=30, fetch_all=False):
+def refresh_calls_data(days=30, fetch_all=False, resume=False):
     current_time = datetime.now(CST).strftime('%B %d, %Y at %I:%M %p CST')
     print(f"Refreshing calls for service data - {current_time}")
     
     # Initialize calls table if needed
     init_calls_table()
     
-    # Fetch data
-    records, start_date, end_date = fetch_all_calls_data(days, fetch_all)
+    # Full refreshes re-walk everything, checkpointing each stored page so an
+    # interrupted one can resume; incremental ones stop at the watermark
+    watermark = None if fetch_all else get_fetch_watermark('calls')
+    checkpoint = get_fetch_checkpoint('calls') if fetch_all and resume else None
+    if checkpoint:
+        print(f"Resuming calls data from offset {checkpoint['offset']}")
+    elif fetch_all and resume:
+        print("No calls data checkpoint to resume, starting from the newest records")
     
-    if records:
-        # Insert into database
-        inserted_count = insert_call_records(records)
+    # Insert each page as it arrives, committing per batch. A page that
+    # still fails after retries raises FetchFailed before the watermark
+    # moves, so the records past it are fetched next time, not skipped
+    progress = FetchProgress(checkpoint)
+    inserted_count = checkpoint['inserted'] if checkpoint else 0
+    for offset, records in fetch_all_calls_data(days, fetch_all, watermark, checkpoint):
+        inserted_count += insert_call_records(records)
+        for r in records:
+            progress.add(response_day(r), r.get('Master_Incident_Number'))
+        if fetch_all:
+            save_fetch_checkpoint('calls', offset + len(records), inserted_count, progress)
+    
+    if fetch_all:
+        clear_fetch_checkpoint('calls')
+    
+    if progress.records:
         print(f"Inserted {inserted_count} new call records into database")
         
+        update_fetch_watermark('calls', progress.watermark_pairs())
+        
         # Log the fetch in the existing fetch_history table
-        from database import log_fetch
-        log_fetch(inserted_count, start_date, end_date)
+        today = datetime.now().strftime('%Y-%m-%d')
+        log_fetch(inserted_count, progress.start_date or today, progress.end_date or today)
         
         return True
+    elif watermark:
+        # Stopped at the watermark: nothing newer has been published
+        print("Calls for service data is up to date")
+        return UP_TO_DATE
     else:
         print("No call records fetched")
         return False
@@ -0,0 +1,337 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+import requests
+from requests.adapters import HTTPAdapter
+from config import (FETCH_API_URL, FETCH_CACHE_MODE, FETCH_MAX_IN_FLIGHT, FETCH_REQUESTS_PER_SECOND,
+                    FETCH_MAX_RETRIES, FETCH_RETRY_BASE_DELAY, FETCH_RETRY_MAX_DELAY)
+import fetch_cache
+
+# CKAN's SQL action sits next to datastore_search
+SQL_API_URL = FETCH_API_URL.rsplit('/', 1)[0] + '/datastore_search_sql'
+
+# Responses worth asking for again; other HTTP errors won't fix themselves
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Returned by a refresh that stopped at its watermark with nothing new.
+# Truthy, as nothing failed; only False means a refresh got no data.
+UP_TO_DATE = 'up to date'
+
+class FetchFailed(Exception):
+    """A page could not be fetched even after retries, so the fetch stopped short"""
+
+class RequestBudget:
+    """Caps concurrent requests and spaces request starts to a fixed rate"""
+    def __init__(self, max_in_flight, requests_per_second):
+        self.slots = threading.BoundedSemaphore(max(1, max_in_flight))
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+    
+    @contextmanager
+    def request(self):
+        with self.slots:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.next_start - now
+                self.next_start = max(now, self.next_start) + self.interval
+            if wait > 0:
+                time.sleep(wait)
+            yield
+
+def _build_session():
+    session = requests.Session()
+    # Keep enough pooled connections for every in-flight request so
+    # pages reuse TLS sessions instead of reconnecting
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, FETCH_MAX_IN_FLIGHT))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# Shared by all three resources so the budget applies to the whole process
+session = _build_session()
+budget = RequestBudget(FETCH_MAX_IN_FLIGHT, FETCH_REQUESTS_PER_SECOND)
+
+def retry_delay(attempt, retry_after=None):
+    """
+    Seconds to wait before retry number `attempt` (1, 2, ...): exponential
+    backoff with jitter, so concurrent fetchers don't retry in lockstep,
+    and never less than a server's Retry-After
+    """
+    ceiling = min(FETCH_RETRY_MAX_DELAY, FETCH_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(float(retry_after), FETCH_RETRY_MAX_DELAY))
+    return delay
+
+def fetch_json(params, label='data', url=FETCH_API_URL):
+    """
+    GET one datastore_search page, returning the decoded JSON or None on failure.
+    Connection errors, timeouts, bad JSON and 429/5xx responses are retried
+    up to FETCH_MAX_RETRIES times; the budget slot is given back while waiting.
+    Other errors aren't retried and return CKAN's {'success': False, ...}
+    body, or one made up if the response had none, so callers can tell a
+    refused request (to fall back from) from an unreachable server (None).
+    
+    With FETCH_CACHE_MODE 'record' each page is also saved to the fetch
+    cache; with 'replay' pages come only from the cache, without the
+    request budget since no server is involved.
+    """
+    if FETCH_CACHE_MODE == 'replay':
+        body = fetch_cache.load(params)
+        if body is None:
+            print(f"Error fetching {label}: no recorded response at offset {params.get('offset')}")
+            return None
+        return json.loads(body)
+    
+    for attempt in range(FETCH_MAX_RETRIES + 1):
+        with budget.request():
+            try:
+                response = session.get(url, params=params, timeout=30)
+                response.raise_for_status()
+                data = response.json()
+                if FETCH_CACHE_MODE == 'record':
+                    fetch_cache.store(params, response.content)
+                return data
+            except requests.exceptions.RequestException as e:
+                error = e
+        
+        response = error.response
+        if response is not None and response.status_code not in RETRYABLE_STATUS:
+            print(f"Error fetching {label}: {error}")
+            return _rejection(params, response)
+        if attempt == FETCH_MAX_RETRIES:
+            print(f"Error fetching {label}: {error}")
+            return None
+        
+        delay = retry_delay(attempt + 1, response.headers.get('Retry-After') if response is not None else None)
+        print(f"Error fetching {label}: {error}; retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+def _rejection(params, response):
+    """
+    CKAN's error body for a request it refused, or one standing in for it
+    when something else answered (e.g. a proxy's HTML 403 page), recorded
+    like a page so replays refuse it too
+    """
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or 'success' not in data:
+        data = {'success': False,
+                'error': {'message': f'HTTP {response.status_code} {response.reason}'}}
+    if FETCH_CACHE_MODE == 'record':
+        fetch_cache.store(params, json.dumps(data).encode())
+    return data
+
+# Server-side features still in use this process; each is dropped after
+# the portal first refuses it, and pages are requested the previous way
+server_side = {'fields': True, 'sql': True}
+
+# Field names of each resource, from a limit=0 request, so a projection
+# never names a column the portal doesn't have
+_resource_fields = {}
+
+def resource_fields(resource_id, label='data'):
+    """The resource's field names, or None if they couldn't be read"""
+    if resource_id not in _resource_fields:
+        data = fetch_json({'resource_id': resource_id, 'limit': 0}, label)
+        if data and not data.get('success'):
+            _refused('fields', label, data)
+        if not data or not data.get('success'):
+            return None
+        _resource_fields[resource_id] = [field['id'] for field in data['result'].get('fields', [])]
+    return _resource_fields[resource_id]
+
+def _refused(feature, label, data):
+    if server_side[feature]:
+        server_side[feature] = False
+        error = data.get('error', {})
+        print(f"Portal refused {feature} for {label} ({error.get('message', error)}); "
+              f"fetching {'all columns' if feature == 'fields' else 'without a date filter'} instead")
+
+def fetch_page(resource_id, offset, limit, sort_field, fields=None, since=None, label='data'):
+    """
+    One page of a resource, newest first by sort_field.
+    
+    Only the listed fields are requested, and with `since` (a YYYY-MM-DD
+    day) only records whose sort_field is on or after it, through
+    datastore_search_sql, which has no total so paging ends on a short
+    page. If the portal refuses either with any error that isn't worth
+    retrying, CKAN's or not (a proxy's 403 page, say), the page is
+    requested as before: every column, filtered by the caller.
+    """
+    columns = None
+    if fields and server_side['fields']:
+        available = resource_fields(resource_id, label)
+        if available is not None:
+            columns = [field for field in fields if field in available]
+    
+    if since and server_side['sql']:
+        since = date.fromisoformat(since[:10]).isoformat()
+        select = ', '.join(f'"{column}"' for column in columns) if columns else '*'
+        sql = (f'SELECT {select} FROM "{resource_id}" WHERE "{sort_field}" >= \'{since}\' '
+               f'ORDER BY "{sort_field}" DESC LIMIT {limit} OFFSET {offset}')
+        data = fetch_json({'sql': sql}, label, SQL_API_URL)
+        if data is None or data.get('success'):
+            return data
+        _refused('sql', label, data)
+    
+    params = {
+        'resource_id': resource_id,
+        'limit': limit,
+        'offset': offset,
+        'sort': f'{sort_field} desc'
+    }
+    if columns:
+        data = fetch_json(dict(params, fields=','.join(columns)), label)
+        if data is None or data.get('success'):
+            return data
+        _refused('fields', label, data)
+    return fetch_json(params, label)
+
+def iter_pages(fetch_page, page_size, start_offset=0):
+    """
+    Yield (offset, data) for consecutive pages in offset order.
+    
+    The first page is fetched on its own to learn the total; after that up
+    to FETCH_MAX_IN_FLIGHT following offsets are prefetched in parallel.
+    Iteration ends after a failed, empty or short page, or when the
+    consumer stops early, in which case outstanding prefetches are dropped.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, FETCH_MAX_IN_FLIGHT))
+    pending = deque()
+    next_offset = start_offset
+    total = None
+    
+    try:
+        while True:
+            # Until the total is known only one page is outstanding
+            limit = FETCH_MAX_IN_FLIGHT if total is not None else 1
+            while len(pending) < max(1, limit) and (total is None or next_offset < total):
+                pending.append((next_offset, executor.submit(fetch_page, next_offset)))
+                next_offset += page_size
+            
+            if not pending:
+                return
+            
+            offset, future = pending.popleft()
+            data = future.result()
+            yield offset, data
+            
+            if not data or not data.get('success'):
+                return
+            
+            result = data.get('result', {})
+            records = result.get('records', [])
+            if len(records) < page_size:
+                return
+            
+            if total is None:
+                total = result.get('total') or float('inf')
+    finally:
+        # The consumer may have stopped early (e.g. at the watermark); don't
+        # spend request budget on prefetched pages nobody will read
+        executor.shutdown(wait=False, cancel_futures=True)
+
+class DayCounter:
+    """
+    Running per-day record counts for a newest-first stream of pages.
+    Days are remembered in arrival order, so the cutoff (the Nth newest
+    day) is an index lookup rather than a sort over everything fetched.
+    """
+    def __init__(self, days):
+        self.days = days
+        self.counts = {}
+        self.order = []
+    
+    def add(self, page_days):
+        """Count the days of one page; falsy days are ignored"""
+        counts = self.counts
+        for day in page_days:
+            if not day:
+                continue
+            if day in counts:
+                counts[day] += 1
+            else:
+                counts[day] = 1
+                self.order.append(day)
+    
+    def cutoff(self):
+        """Oldest day to keep once `days` distinct days were seen, else None"""
+        if len(self.order) >= self.days:
+            return self.order[self.days - 1]
+        return None
+    
+    def resume(self, checkpoint):
+        """
+        Continue the count of an interrupted fetch from its checkpoint, which
+        saw `days` distinct days down to `start_date`. Only the oldest day
+        can reappear on the next page, so the earlier days are placeholders.
+        
+        Checkpoints are only kept by full refreshes, and of those only the
+        calls refresh counts days (its 180-day limit); crimes and arrests
+        fetch everything and don't resume a count.
+        """
+        if checkpoint and checkpoint['start_date']:
+            self.order = [None] * (checkpoint['days'] - 1) + [checkpoint['start_date']]
+            self.counts = {checkpoint['start_date']: 1}
+
+class FetchProgress:
+    """
+    Running totals for a streamed fetch: record count, covered date range,
+    number of distinct days and the IDs seen on the newest day (used to
+    advance the watermark). Starts from a checkpoint's totals when resuming.
+    """
+    def __init__(self, checkpoint=None):
+        self.records = checkpoint['records'] if checkpoint else 0
+        self.start_date = checkpoint['start_date'] if checkpoint else None
+        self.end_date = checkpoint['end_date'] if checkpoint else None
+        self.days = checkpoint['days'] if checkpoint else 0
+        self.newest_ids = set(checkpoint['newest_ids']) if checkpoint else set()
+    
+    def add(self, day, record_id):
+        self.records += 1
+        if not day:
+            return
+        if self.start_date is None or day < self.start_date:
+            # Records arrive newest first, so every new day is a new oldest day
+            self.start_date = day
+            self.days += 1
+        if self.end_date is None or day > self.end_date:
+            self.end_date = day
+            self.newest_ids = {record_id}
+        elif day == self.end_date:
+            self.newest_ids.add(record_id)
+    
+    def watermark_pairs(self):
+        """(day, id) pairs for update_fetch_watermark"""
+        return ((self.end_date, record_id) for record_id in self.newest_ids)
+
+def run_concurrently(jobs):
+    """
+    Run (label, callable) jobs in parallel threads and wait for all of them.
+    A job that raises or returns False (the refresh functions' "no data",
+    as opposed to UP_TO_DATE) is reported as failed without stopping the
+    others.
+    Returns a dict of label -> result (None for jobs that raised).
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as executor:
+        futures = {executor.submit(job): label for label, job in jobs}
+        for future, label in futures.items():
+            try:
+                results[label] = future.result()
+            except Exception as e:
+                print(f"Error during {label} refresh: {e}")
+                results[label] = None
+                continue
+            if results[label] is False:
+                print(f"Error during {label} refresh: no data was fetched")
+    return results
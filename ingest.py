@@ -0,0 +1,95 @@
+import sqlite3
+
+# Rows are pushed to the staging table in chunks of this size
+BATCH_SIZE = 5000
+
+def bulk_insert(conn, table, columns, records, to_row, rejects=None, on_insert=None):
+    """
+    Insert records into a CompactTable through a temporary staging table.
+    
+    Each record is converted with to_row into a tuple matching columns.
+    Records that cannot be converted or bound are appended to rejects as
+    (record, error) pairs instead of aborting the batch. Rows are loaded
+    with chunked executemany, their new labels are added, and they are
+    moved into the table's storage with a single encoding
+    INSERT OR IGNORE ... SELECT, so duplicates are skipped by the
+    storage's UNIQUE constraint exactly as with per-row inserts. The new
+    rows are then added to the table's label counts.
+    
+    If given, on_insert(cursor, last_id) runs in the same transaction after
+    the insert; rows with id > last_id are the ones just added, which lets
+    callers maintain derived tables incrementally.
+    
+    Returns the number of rows actually inserted.
+    """
+    if rejects is None:
+        rejects = []
+    
+    cursor = conn.cursor()
+    staging = f'staging_{table.name}'
+    column_list = ', '.join(columns)
+    placeholders = ', '.join('?' for _ in columns)
+    
+    cursor.execute(f'''
+        CREATE TEMP TABLE IF NOT EXISTS {staging} AS
+        SELECT {column_list} FROM main.{table.name} WHERE 0
+    ''')
+    cursor.execute(f'DELETE FROM {staging}')
+    
+    staging_sql = f'INSERT INTO {staging} ({column_list}) VALUES ({placeholders})'
+    
+    chunk = []
+    for record in records:
+        try:
+            chunk.append((record, to_row(record)))
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            rejects.append((record, f"{type(e).__name__}: {e}"))
+            continue
+        
+        if len(chunk) >= BATCH_SIZE:
+            _load_chunk(cursor, staging_sql, chunk, rejects)
+            chunk = []
+    
+    if chunk:
+        _load_chunk(cursor, staging_sql, chunk, rejects)
+    
+    cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM main.{table.storage}')
+    last_id = cursor.fetchone()[0]
+    
+    table.add_labels(cursor, staging)
+    
+    before = conn.total_changes
+    cursor.execute(table.insert_sql(staging))
+    inserted_count = conn.total_changes - before
+    
+    if inserted_count:
+        table.update_label_counts(cursor, last_id)
+    
+    if on_insert and inserted_count:
+        on_insert(cursor, last_id)
+    
+    cursor.execute(f'DELETE FROM {staging}')
+    return inserted_count
+
+def _load_chunk(cursor, staging_sql, chunk, rejects):
+    """Load one chunk into staging, isolating rows the driver refuses to bind"""
+    try:
+        cursor.executemany(staging_sql, [row for _, row in chunk])
+    except (sqlite3.InterfaceError, sqlite3.ProgrammingError):
+        # A single bad value fails the whole executemany; retry row by row
+        # so only the offending records are rejected. Rows already staged
+        # before the failure may be staged twice, which the target's
+        # UNIQUE constraint absorbs.
+        for record, row in chunk:
+            try:
+                cursor.execute(staging_sql, row)
+            except (sqlite3.InterfaceError, sqlite3.ProgrammingError) as e:
+                rejects.append((record, f"{type(e).__name__}: {e}"))
+
+def report_rejects(rejects, label):
+    """Print a single summary line for rejected records"""
+    if not rejects:
+        return
+    sample = rejects[0]
+    print(f"Skipped {len(rejects)} malformed {label} records "
+          f"(first: {sample[1]})")
@@ -1,17 +1,33 @@
-import sqlite3
+import math
+from bisect import bisect_right
+from collections import Counter
 from datetime import datetime, timedelta
 import pytz
-from us_crime_severity_weights import get_us_weighted_severity
-from config import DB_PATH
+from connections import get_read_connection
+from database import get_data_version
+from arrests_database import arrest_window
+from calls_database import calls_window
+from compact_storage import day_text, day_text_sql, day_number_sql
+from result_cache import cached_result, store_result
 CST = pytz.timezone('America/Chicago')
 
 def get_multi_period_insights():
+    """
+    Get insights for 30, 60, and 90 day periods, shared across workers
+    until the next refresh logs new data
+    """
+    return cached_result('multi_period_insights', get_data_version(),
+                         compute_multi_period_insights)
+
+def warm_multi_period_insights():
+    """Compute the insights for the current data and store them for every worker"""
+    return store_result('multi_period_insights', get_data_version(),
+                        compute_multi_period_insights)
+
+def compute_multi_period_insights():
     """Get insights for 30, 60, and 90 day periods with proper rate-based trends"""
     periods = [30, 60, 90]
-    all_insights = {}
-    
-    for period in periods:
-        all_insights[period] = get_combined_insights(period)
+    all_insights = compute_period_insights(periods)
     
     # Calculate RATE-BASED trends between periods
     # Since CSI is already normalized per day, we compare the daily rates directly
@@ -60,48 +76,238 @@ def get_multi_period_insights():
     return all_insights
 
 def get_combined_insights(days=30):
-    conn = sqlite3.connect(DB_PATH)
+    return compute_period_insights([days])[days]
+
+def compute_period_insights(periods):
+    """
+    Build the insights dict for every period in periods from a single read
+    of the longest window.
+    
+    Each source is read once, grouped by day and dimension. Rows are
+    bucketed by how many days they fall before the source's newest day,
+    and the counts for each window are running sums over those buckets,
+    so shorter periods never go back to the database.
+    """
+    conn = get_read_connection()
     cursor = conn.cursor()
-    
-    insights = {}
+    longest = max(periods)
     
     # Get the most recent dates from each table
-    cursor.execute('SELECT MAX(report_date) FROM crimes')
+    cursor.execute(f"SELECT {day_text_sql('MAX(report_epoch_day)')} FROM crimes")
     crime_max_date = cursor.fetchone()[0]
     
-    cursor.execute('SELECT MAX(report_date) FROM arrests')
+    cursor.execute(f"SELECT {day_text_sql('MAX(report_epoch_day)')} FROM arrests")
     arrest_max_date = cursor.fetchone()[0]
     
-    cursor.execute('SELECT MAX(date(response_date)) FROM calls_for_service')
+    cursor.execute(f"SELECT {day_text_sql('MAX(response_epoch_day)')} FROM calls_for_service")
     calls_max_date = cursor.fetchone()[0]
     
-    # Overall Public Safety Metrics
+    crime_rows = []
+    severity_rows = []
     if crime_max_date:
         cursor.execute('''
-            SELECT COUNT(*) FROM crimes 
+            SELECT report_date, crime_type, crime_against, service_area, zip_code, count
+            FROM crime_daily_rollup
             WHERE report_date >= date(?, '-' || ? || ' days')
-        ''', (crime_max_date, days-1))
-        total_crimes = cursor.fetchone()[0]
-    else:
-        total_crimes = 0
-    
-    if arrest_max_date:
+        ''', (crime_max_date, max(longest, 7) - 1))
+        crime_rows = cursor.fetchall()
+        
+        # Weighted severity per day, split into crimes against persons and the rest
         cursor.execute('''
-            SELECT COUNT(*) FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-        ''', (arrest_max_date, days-1))
-        total_arrests = cursor.fetchone()[0]
-    else:
-        total_arrests = 0
+            SELECT r.report_date, upper(r.crime_against) = 'PERSON', SUM(s.severity * r.count)
+            FROM crime_daily_rollup r
+            JOIN crime_severity s
+                ON s.crime_type = r.crime_type AND s.crime_against = r.crime_against
+            WHERE r.report_date >= date(?, '-' || ? || ' days')
+            GROUP BY 1, 2
+        ''', (crime_max_date, max(longest, 7) - 1))
+        severity_rows = cursor.fetchall()
+    
+    # Arrests and calls come from the in-memory columnar copies when available
+    arrest_rows = []
+    recent_arrests = arrest_window.window(longest) if arrest_max_date else None
+    if recent_arrests is not None:
+        arrest_rows = [(day_text(day), *row) for day, *row
+                       in recent_arrests.grouped(['day', 'service_area', 'zip_code'])]
+    elif arrest_max_date:
+        cursor.execute(f'''
+            SELECT report_date, service_area, zip_code, COUNT(*)
+            FROM arrests
+            WHERE report_epoch_day >= {day_number_sql('?')} - ?
+            GROUP BY report_epoch_day, service_area_id, zip_code_id
+        ''', (arrest_max_date, longest-1))
+        arrest_rows = cursor.fetchall()
+    
+    call_rows = []
+    recent_calls = calls_window.window(longest) if calls_max_date else None
+    if recent_calls is not None:
+        call_rows = [(day_text(day), *row) for day, *row
+                     in recent_calls.grouped(['day', 'response_hour'])]
+    elif calls_max_date:
+        cursor.execute(f'''
+            SELECT response_day, response_hour, COUNT(*)
+            FROM calls_for_service
+            WHERE response_epoch_day >= {day_number_sql('?')} - ?
+            GROUP BY response_epoch_day, response_hour
+        ''', (calls_max_date, longest-1))
+        call_rows = cursor.fetchall()
+    
+    # The 7-day window feeds the CSI trend
+    crime_windows = _window_counts(crime_rows, crime_max_date, set(periods) | {7}, {
+        'day': lambda row: row[0],
+        'area': lambda row: row[3],
+        'zip': lambda row: row[4],
+    })
+    arrest_windows = _window_counts(arrest_rows, arrest_max_date, set(periods), {
+        'day': lambda row: row[0],
+        'area': lambda row: row[1],
+        'zip': lambda row: row[2],
+    })
+    severity_windows = _window_counts(severity_rows, crime_max_date, set(periods) | {7}, {
+        'person': lambda row: row[1],
+    })
+    call_windows = _window_counts(call_rows, calls_max_date, set(periods), {
+        'hour': lambda row: row[1],
+    })
     
-    if calls_max_date:
-        cursor.execute('''
-            SELECT COUNT(*) FROM calls_for_service 
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-        ''', (calls_max_date, days-1))
-        total_calls = cursor.fetchone()[0]
-    else:
-        total_calls = 0
+    # The trending comparison is anchored on the newest crime date, not the period
+    trending_crimes = _trending_crimes(cursor, crime_max_date)
+    
+    all_insights = {}
+    for days in periods:
+        all_insights[days] = _period_insights(
+            days, crime_windows[days], arrest_windows[days], call_windows[days],
+            severity_windows[days]['person'], severity_windows[7]['person'], trending_crimes
+        )
+    return all_insights
+
+def _window_counts(rows, max_date, windows, dimensions):
+    """
+    Count rows along each dimension for every window ending on max_date.
+    
+    rows are (day, ..., count) tuples and dimensions maps a name to a
+    function returning that dimension's key for a row. Returns
+    {window: {name: Counter}}.
+    """
+    longest = max(windows)
+    buckets = [{name: Counter() for name in dimensions} for _ in range(longest)]
+    
+    if max_date:
+        newest = datetime.strptime(max_date[:10], '%Y-%m-%d')
+        # First day of each window, oldest first
+        starts = [(newest - timedelta(days=n)).strftime('%Y-%m-%d')
+                  for n in range(longest - 1, -1, -1)]
+        
+        for row in rows:
+            # Days before max_date, using the same string comparison as the SQL filters
+            age = longest - bisect_right(starts, row[0])
+            if age >= longest:
+                continue
+            for name, key in dimensions.items():
+                buckets[age][name][key(row)] += row[-1]
+    
+    results = {}
+    running = {name: Counter() for name in dimensions}
+    for age, bucket in enumerate(buckets):
+        for name, counts in bucket.items():
+            running[name].update(counts)
+        if age + 1 in windows:
+            results[age + 1] = {name: Counter(counts) for name, counts in running.items()}
+    return results
+
+def _grouped(counts):
+    """(key, count) pairs in the order SQLite's GROUP BY returns them"""
+    return [(key, counts[key]) for key in sorted(counts, key=lambda key: (key is not None, key))]
+
+def _is_scored_zip(zip_code):
+    return zip_code is not None and 'out of' not in zip_code.lower() and zip_code != 'Unknown'
+
+def _trending_crimes(cursor, crime_max_date):
+    """Trending Crime Types (30-day comparison)"""
+    if not crime_max_date:
+        return []
+    
+    # Check how many days of data we actually have
+    cursor.execute(f'''
+        SELECT COUNT(DISTINCT report_epoch_day) as days_available
+        FROM crimes
+        WHERE report_epoch_day <= {day_number_sql('?')}
+    ''', (crime_max_date,))
+    days_available = cursor.fetchone()[0]
+    
+    if days_available >= 60:
+        # We have enough data for a proper 30-day comparison
+        cursor.execute(f'''
+            WITH recent AS (
+                SELECT crime_type, COUNT(*) as recent_count
+                FROM crimes
+                WHERE report_epoch_day > {day_number_sql('?')} - 30
+                AND report_epoch_day <= {day_number_sql('?')}
+                GROUP BY crime_type
+            ),
+            previous AS (
+                SELECT crime_type, COUNT(*) as prev_count
+                FROM crimes
+                WHERE report_epoch_day > {day_number_sql('?')} - 60
+                AND report_epoch_day <= {day_number_sql('?')} - 30
+                GROUP BY crime_type
+            )
+            SELECT 
+                COALESCE(r.crime_type, p.crime_type) as crime_type,
+                COALESCE(r.recent_count, 0) as recent,
+                COALESCE(p.prev_count, 0) as previous,
+                CASE 
+                    WHEN COALESCE(p.prev_count, 0) = 0 THEN 
+                        CASE WHEN COALESCE(r.recent_count, 0) > 0 THEN 100 ELSE 0 END
+                    ELSE ((COALESCE(r.recent_count, 0) - COALESCE(p.prev_count, 0)) * 100.0 / 
+                          COALESCE(p.prev_count, 0))
+                END as change_percent
+            FROM recent r
+            FULL OUTER JOIN previous p ON r.crime_type = p.crime_type
+            WHERE COALESCE(r.recent_count, 0) >= 10  -- Minimum threshold for significance
+            ORDER BY ABS(change_percent) DESC  -- Sort by absolute change to show biggest movers
+            LIMIT 10
+        ''', (crime_max_date, crime_max_date, crime_max_date, crime_max_date))
+        
+        trending_crimes = []
+        for row in cursor.fetchall():
+            trending_crimes.append({
+                'type': row[0],
+                'recent': row[1],
+                'previous': row[2],
+                'change': round(row[3], 1)
+            })
+        return trending_crimes
+    
+    # Not enough data for comparison, just show top crime types from available data
+    cursor.execute(f'''
+        SELECT crime_type, COUNT(*) as count
+        FROM crimes
+        WHERE report_epoch_day > {day_number_sql('?')} - ?
+        AND report_epoch_day <= {day_number_sql('?')}
+        GROUP BY crime_type
+        HAVING COUNT(*) >= 10
+        ORDER BY count DESC
+        LIMIT 10
+    ''', (crime_max_date, min(days_available-1, 29), crime_max_date))
+    
+    trending_crimes = []
+    for row in cursor.fetchall():
+        trending_crimes.append({
+            'type': row[0],
+            'recent': row[1],
+            'previous': None,  # Use None to indicate no data
+            'change': None
+        })
+    return trending_crimes
+
+def _period_insights(days, crimes, arrests, calls, severity, severity_7_days, trending_crimes):
+    insights = {}
+    
+    # Overall Public Safety Metrics
+    total_crimes = sum(crimes['day'].values())
+    total_arrests = sum(arrests['day'].values())
+    total_calls = sum(calls['hour'].values())
     
     insights['total_incidents'] = total_crimes + total_arrests
     insights['total_crimes'] = total_crimes
@@ -117,29 +323,15 @@ def get_combined_insights(days=30):
     # Combined Service Area Analysis
     area_data = {}
     
-    if crime_max_date:
-        cursor.execute('''
-            SELECT service_area, COUNT(*) as count 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY service_area
-        ''', (crime_max_date, days-1))
-        for area, count in cursor.fetchall():
-            if area not in area_data:
-                area_data[area] = {'crimes': 0, 'arrests': 0, 'calls': 0}
-            area_data[area]['crimes'] = count
-    
-    if arrest_max_date:
-        cursor.execute('''
-            SELECT service_area, COUNT(*) as count 
-            FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY service_area
-        ''', (arrest_max_date, days-1))
-        for area, count in cursor.fetchall():
-            if area not in area_data:
-                area_data[area] = {'crimes': 0, 'arrests': 0, 'calls': 0}
-            area_data[area]['arrests'] = count
+    for area, count in _grouped(crimes['area']):
+        if area not in area_data:
+            area_data[area] = {'crimes': 0, 'arrests': 0, 'calls': 0}
+        area_data[area]['crimes'] = count
+    
+    for area, count in _grouped(arrests['area']):
+        if area not in area_data:
+            area_data[area] = {'crimes': 0, 'arrests': 0, 'calls': 0}
+        area_data[area]['arrests'] = count
     
     # Removed calls data from area analysis due to limited data availability
     
@@ -158,42 +350,18 @@ def get_combined_insights(days=30):
     )[:7]  # Top 7 areas
     
     # Time Analysis - Hour of Day Pattern (for calls)
-    if calls_max_date:
-        cursor.execute('''
-            SELECT strftime('%H', response_date) as hour, COUNT(*) as count
-            FROM calls_for_service
-            WHERE date(response_date) >= date(?, '-' || ? || ' days')
-            GROUP BY hour
-            ORDER BY hour
-        ''', (calls_max_date, days-1))
-        insights['hourly_pattern'] = cursor.fetchall()
-    else:
-        insights['hourly_pattern'] = []
+    insights['hourly_pattern'] = _grouped(calls['hour'])
     
     # High-Risk Zip Codes (combined metric)
     zip_scores = {}
     
-    if crime_max_date:
-        cursor.execute('''
-            SELECT zip_code, COUNT(*) * 3 as weighted_count
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND zip_code NOT LIKE '%Out of%' AND zip_code != 'Unknown'
-            GROUP BY zip_code
-        ''', (crime_max_date, days-1))
-        for zip_code, score in cursor.fetchall():
-            zip_scores[zip_code] = zip_scores.get(zip_code, 0) + score
+    for zip_code, count in _grouped(crimes['zip']):
+        if _is_scored_zip(zip_code):
+            zip_scores[zip_code] = zip_scores.get(zip_code, 0) + count * 3
     
-    if arrest_max_date:
-        cursor.execute('''
-            SELECT zip_code, COUNT(*) * 2 as weighted_count
-            FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND zip_code NOT LIKE '%Out of%' AND zip_code != 'Unknown'
-            GROUP BY zip_code
-        ''', (arrest_max_date, days-1))
-        for zip_code, score in cursor.fetchall():
-            zip_scores[zip_code] = zip_scores.get(zip_code, 0) + score
+    for zip_code, count in _grouped(arrests['zip']):
+        if _is_scored_zip(zip_code):
+            zip_scores[zip_code] = zip_scores.get(zip_code, 0) + count * 2
     
     # Removed calls data from zip code analysis due to limited data availability
     
@@ -203,83 +371,7 @@ def get_combined_insights(days=30):
         reverse=True
     )[:10]
     
-    # Trending Crime Types (30-day comparison)
-    if crime_max_date:
-        # Check how many days of data we actually have
-        cursor.execute('''
-            SELECT COUNT(DISTINCT report_date) as days_available
-            FROM crimes
-            WHERE report_date <= ?
-        ''', (crime_max_date,))
-        days_available = cursor.fetchone()[0]
-        
-        if days_available >= 60:
-            # We have enough data for a proper 30-day comparison
-            cursor.execute('''
-                WITH recent AS (
-                    SELECT crime_type, COUNT(*) as recent_count
-                    FROM crimes
-                    WHERE report_date > date(?, '-30 days')
-                    AND report_date <= ?
-                    GROUP BY crime_type
-                ),
-                previous AS (
-                    SELECT crime_type, COUNT(*) as prev_count
-                    FROM crimes
-                    WHERE report_date > date(?, '-60 days')
-                    AND report_date <= date(?, '-30 days')
-                    GROUP BY crime_type
-                )
-                SELECT 
-                    COALESCE(r.crime_type, p.crime_type) as crime_type,
-                    COALESCE(r.recent_count, 0) as recent,
-                    COALESCE(p.prev_count, 0) as previous,
-                    CASE 
-                        WHEN COALESCE(p.prev_count, 0) = 0 THEN 
-                            CASE WHEN COALESCE(r.recent_count, 0) > 0 THEN 100 ELSE 0 END
-                        ELSE ((COALESCE(r.recent_count, 0) - COALESCE(p.prev_count, 0)) * 100.0 / 
-                              COALESCE(p.prev_count, 0))
-                    END as change_percent
-                FROM recent r
-                FULL OUTER JOIN previous p ON r.crime_type = p.crime_type
-                WHERE COALESCE(r.recent_count, 0) >= 10  -- Minimum threshold for significance
-                ORDER BY ABS(change_percent) DESC  -- Sort by absolute change to show biggest movers
-                LIMIT 10
-            ''', (crime_max_date, crime_max_date, crime_max_date, crime_max_date))
-            
-            trending_crimes = []
-            for row in cursor.fetchall():
-                trending_crimes.append({
-                    'type': row[0],
-                    'recent': row[1],
-                    'previous': row[2],
-                    'change': round(row[3], 1)
-                })
-            insights['trending_crimes'] = trending_crimes
-        else:
-            # Not enough data for comparison, just show top crime types from available data
-            cursor.execute('''
-                SELECT crime_type, COUNT(*) as count
-                FROM crimes
-                WHERE report_date > date(?, '-' || ? || ' days')
-                AND report_date <= ?
-                GROUP BY crime_type
-                HAVING COUNT(*) >= 10
-                ORDER BY count DESC
-                LIMIT 10
-            ''', (crime_max_date, min(days_available-1, 29), crime_max_date))
-            
-            trending_crimes = []
-            for row in cursor.fetchall():
-                trending_crimes.append({
-                    'type': row[0],
-                    'recent': row[1],
-                    'previous': None,  # Use None to indicate no data
-                    'change': None
-                })
-            insights['trending_crimes'] = trending_crimes
-    else:
-        insights['trending_crimes'] = []
+    insights['trending_crimes'] = [dict(crime) for crime in trending_crimes]
     
     # Crime Severity Index using weighted methodology
     # Based on research into Canadian CSI and UK Crime Harm Index
@@ -287,30 +379,10 @@ def get_combined_insights(days=30):
     population = 1500000  # San Antonio population
     
     # Calculate weighted crime severity
-    total_weighted_severity = 0
-    violent_weighted_severity = 0
-    property_weighted_severity = 0
-    
-    if crime_max_date:
-        # Get all crimes with their types and categories
-        cursor.execute('''
-            SELECT crime_type, crime_against, COUNT(*) as count
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY crime_type, crime_against
-        ''', (crime_max_date, days-1))
-        
-        crime_counts = cursor.fetchall()
-        
-        for crime_type, crime_against, count in crime_counts:
-            severity = get_us_weighted_severity(crime_type, crime_against)
-            weighted_value = severity * count
-            total_weighted_severity += weighted_value
-            
-            if crime_against and crime_against.upper() == 'PERSON':
-                violent_weighted_severity += weighted_value
-            else:
-                property_weighted_severity += weighted_value
+    # severity holds SUM(severity * count) keyed on whether the crime is against a person
+    total_weighted_severity = sum(severity.values())
+    violent_weighted_severity = severity.get(1, 0)
+    property_weighted_severity = total_weighted_severity - violent_weighted_severity
     
     # Calculate the Crime Severity Index (per 100k population)
     # Similar to Canadian CSI formula but scaled down by factor of 100
@@ -319,41 +391,19 @@ def get_combined_insights(days=30):
     property_csi = (property_weighted_severity / population) * 100000 / days * 365 / 100
     
     # Calculate trend (weighted severity comparison)
+    # Last 7 days against the rest of the period; Counter subtraction leaves
+    # nothing when the period is itself 7 days or shorter
     recent_trend_weighted = 0
-    if crime_max_date:
-        # Last 7 days weighted severity
-        cursor.execute('''
-            SELECT crime_type, crime_against, COUNT(*) as count
-            FROM crimes 
-            WHERE report_date >= date(?, '-6 days')
-            GROUP BY crime_type, crime_against
-        ''', (crime_max_date,))
-        
-        recent_severity = 0
-        for crime_type, crime_against, count in cursor.fetchall():
-            recent_severity += get_us_weighted_severity(crime_type, crime_against) * count
-        
-        # Previous period weighted severity
-        cursor.execute('''
-            SELECT crime_type, crime_against, COUNT(*) as count
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            AND report_date < date(?, '-6 days')
-            GROUP BY crime_type, crime_against
-        ''', (crime_max_date, days-1, crime_max_date))
-        
-        prev_severity = 0
-        for crime_type, crime_against, count in cursor.fetchall():
-            prev_severity += get_us_weighted_severity(crime_type, crime_against) * count
-        
-        if prev_severity > 0:
-            expected_weekly_severity = (prev_severity / (days - 7)) * 7
-            recent_trend_weighted = ((recent_severity - expected_weekly_severity) / expected_weekly_severity) * 100
+    recent_severity = sum(severity_7_days.values())
+    prev_severity = sum((severity - severity_7_days).values())
+    
+    if prev_severity > 0:
+        expected_weekly_severity = (prev_severity / (days - 7)) * 7
+        recent_trend_weighted = ((recent_severity - expected_weekly_severity) / expected_weekly_severity) * 100
     
     # Normalize CSI to 0-100 scale for display
     # For San Antonio data, observed range is roughly 0-15000
     # We'll use a logarithmic scale for better visualization
-    import math
     if crime_severity_index > 0:
         # Log scale: 100 = 1, 1000 = 2, 10000 = 3, 100000 = 4
         log_value = math.log10(max(1, crime_severity_index))
@@ -375,29 +425,15 @@ def get_combined_insights(days=30):
     # Daily trends for all three metrics
     combined_daily = {}
     
-    if crime_max_date:
-        cursor.execute('''
-            SELECT report_date, COUNT(*) 
-            FROM crimes 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY report_date
-        ''', (crime_max_date, days-1))
-        for date, count in cursor.fetchall():
-            if date not in combined_daily:
-                combined_daily[date] = {'crimes': 0, 'arrests': 0, 'calls': 0}
-            combined_daily[date]['crimes'] = count
-    
-    if arrest_max_date:
-        cursor.execute('''
-            SELECT report_date, COUNT(*) 
-            FROM arrests 
-            WHERE report_date >= date(?, '-' || ? || ' days')
-            GROUP BY report_date
-        ''', (arrest_max_date, days-1))
-        for date, count in cursor.fetchall():
-            if date not in combined_daily:
-                combined_daily[date] = {'crimes': 0, 'arrests': 0, 'calls': 0}
-            combined_daily[date]['arrests'] = count
+    for date, count in crimes['day'].items():
+        if date not in combined_daily:
+            combined_daily[date] = {'crimes': 0, 'arrests': 0, 'calls': 0}
+        combined_daily[date]['crimes'] = count
+    
+    for date, count in arrests['day'].items():
+        if date not in combined_daily:
+            combined_daily[date] = {'crimes': 0, 'arrests': 0, 'calls': 0}
+        combined_daily[date]['arrests'] = count
     
     # Set calls to 0 for all dates for compatibility
     for date in combined_daily:
@@ -408,7 +444,6 @@ def get_combined_insights(days=30):
     # Key Insights Text
     insights['key_findings'] = generate_key_findings(insights)
     
-    conn.close()
     return insights
 
 def generate_key_findings(insights):
@@ -0,0 +1,36 @@
+import math
+
+# Buckets are log-spaced so a quantile is reported within this fraction of
+# the true value whatever its size; histograms over any set of days merge
+# by adding the counts of equal buckets
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+def bucket_of(value):
+    """Bucket of a positive value: values in (GAMMA**(b-1), GAMMA**b] fall in bucket b"""
+    return math.ceil(math.log(value) / LOG_GAMMA)
+
+def bucket_value(bucket):
+    """The value reported for a bucket, within RELATIVE_ACCURACY of anything in it"""
+    return 2 * GAMMA ** bucket / (GAMMA + 1)
+
+def quantiles(bucket_counts, fractions):
+    """
+    Values at each fraction (e.g. 0.9) of a histogram given as {bucket: count},
+    taking the nearest-rank value like sorted(values)[ceil(n * fraction) - 1].
+    None for each fraction if the histogram is empty.
+    """
+    total = sum(bucket_counts.values())
+    if not total:
+        return [None for _ in fractions]
+    
+    ranks = [max(1, math.ceil(total * fraction)) for fraction in fractions]
+    values = [None] * len(ranks)
+    seen = 0
+    for bucket in sorted(bucket_counts):
+        seen += bucket_counts[bucket]
+        for i, rank in enumerate(ranks):
+            if values[i] is None and rank <= seen:
+                values[i] = bucket_value(bucket)
+    return values
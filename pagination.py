@@ -0,0 +1,61 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
+
+# Upper bound on remembered COUNT(*) results across all list queries
+COUNT_CACHE_SIZE = 256
+
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+def encode_cursor(sort_key):
+    """Encode the sort key of the last row on a page as an opaque token"""
+    raw = json.dumps(list(sort_key), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """
+    Decode a token from encode_cursor back into a sort key list.
+    Returns None for missing or malformed tokens, including ones whose
+    values aren't strings, numbers or null and so can't be bound as query
+    parameters, so callers can fall back to offset pagination.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(sort_key, list) or len(sort_key) != 2:
+        return None
+    if not all(value is None or isinstance(value, (str, int, float)) for value in sort_key):
+        return None
+    return sort_key
+
+def cached_count(cursor, table, query, params):
+    """
+    COUNT(*) over a filtered list query, cached until the table changes.
+    The table's MAX(id) is part of the key, so new rows invalidate the
+    entry without any explicit bookkeeping.
+    """
+    cursor.execute(f'SELECT MAX(id) FROM {table}')
+    version = cursor.fetchone()[0]
+    key = (query, tuple(params), version)
+    
+    with _count_cache_lock:
+        if key in _count_cache:
+            _count_cache.move_to_end(key)
+            return _count_cache[key]
+    
+    cursor.execute(f'SELECT COUNT(*) FROM ({query})', params)
+    total_count = cursor.fetchone()[0]
+    
+    with _count_cache_lock:
+        _count_cache[key] = total_count
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    
+    return total_count
@@ -0,0 +1,207 @@
+import os
+import socket
+import threading
+import time
+from config import REFRESH_LEASE_SECONDS
+from connections import get_read_connection, writer
+
+LEASE_NAME = 'refresh'
+
+def init_refresh_status():
+    """Create the refresh lease and refresh run tables if they don't exist"""
+    with writer() as conn:
+        cursor = conn.cursor()
+        
+        # One row per lease; expires_at is pushed forward by the holder's heartbeat
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS refresh_lease (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                acquired_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS refresh_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mode TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP,
+                seconds REAL
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS refresh_run_sources (
+                run_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                status TEXT NOT NULL,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP,
+                seconds REAL,
+                PRIMARY KEY (run_id, source)
+            ) WITHOUT ROWID
+        ''')
+
+def worker_id():
+    """Identifies this process in the lease and the runs it records"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+class RefreshLease:
+    """
+    Lease that lets exactly one process refresh the database, however many
+    web workers, refresh workers or containers share it.
+    
+    The holder renews the lease from a heartbeat thread. If the holder dies
+    the lease expires after REFRESH_LEASE_SECONDS and another worker may
+    take it over; `lost` is set if that happens to a holder that was only
+    stalled, so it can step down.
+    """
+    
+    def __init__(self):
+        self.owner = worker_id()
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._heartbeat = None
+    
+    def acquire(self):
+        """Take the lease if it is free, expired or already ours"""
+        now = time.time()
+        with writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO refresh_lease (name, owner, acquired_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (LEASE_NAME, self.owner, now, now + REFRESH_LEASE_SECONDS))
+            cursor.execute('''
+                UPDATE refresh_lease SET owner = ?, acquired_at = ?, expires_at = ?
+                WHERE name = ? AND owner != ? AND expires_at < ?
+            ''', (self.owner, now, now + REFRESH_LEASE_SECONDS, LEASE_NAME, self.owner, now))
+            cursor.execute('SELECT owner FROM refresh_lease WHERE name = ?', (LEASE_NAME,))
+            acquired = cursor.fetchone()[0] == self.owner
+        
+        if acquired and self._heartbeat is None:
+            self.lost.clear()
+            self._stop.clear()
+            self._heartbeat = threading.Thread(target=self._renew_until_stopped, daemon=True)
+            self._heartbeat.start()
+        return acquired
+    
+    def release(self):
+        if self._heartbeat is not None:
+            self._stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+        with writer() as conn:
+            conn.execute('DELETE FROM refresh_lease WHERE name = ? AND owner = ?',
+                         (LEASE_NAME, self.owner))
+    
+    def holder(self):
+        """Owner of the lease if it is currently held, else None"""
+        cursor = get_read_connection().cursor()
+        cursor.execute('SELECT owner FROM refresh_lease WHERE name = ? AND expires_at >= ?',
+                       (LEASE_NAME, time.time()))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def _renew(self):
+        with writer() as conn:
+            before = conn.total_changes
+            conn.execute('UPDATE refresh_lease SET expires_at = ? WHERE name = ? AND owner = ?',
+                         (time.time() + REFRESH_LEASE_SECONDS, LEASE_NAME, self.owner))
+            return conn.total_changes > before
+    
+    def _renew_until_stopped(self):
+        while not self._stop.wait(REFRESH_LEASE_SECONDS / 4):
+            try:
+                renewed = self._renew()
+            except Exception as e:
+                # A busy database is retried on the next beat, well before expiry
+                print(f"Error renewing refresh lease: {e}")
+                continue
+            if not renewed:
+                print(f"Refresh lease lost by {self.owner}")
+                self.lost.set()
+                return
+
+def start_refresh_run(mode):
+    """Record a refresh as running and return its run ID"""
+    with writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO refresh_runs (mode, owner, status) VALUES (?, ?, 'running')",
+                       (mode, worker_id()))
+        return cursor.lastrowid
+
+def record_refresh_source(run_id, source, status, seconds=None):
+    """
+    Record a source's progress within a run: 'running' then its outcome,
+    'succeeded', 'up to date', 'no data' or 'failed'
+    """
+    with writer() as conn:
+        if status == 'running':
+            conn.execute('''
+                INSERT OR REPLACE INTO refresh_run_sources (run_id, source, status)
+                VALUES (?, ?, ?)
+            ''', (run_id, source, status))
+        else:
+            conn.execute('''
+                UPDATE refresh_run_sources
+                SET status = ?, finished_at = CURRENT_TIMESTAMP, seconds = ?
+                WHERE run_id = ? AND source = ?
+            ''', (status, seconds, run_id, source))
+
+def finish_refresh_run(run_id, status, seconds):
+    with writer() as conn:
+        conn.execute('''
+            UPDATE refresh_runs SET status = ?, finished_at = CURRENT_TIMESTAMP, seconds = ?
+            WHERE id = ?
+        ''', (status, seconds, run_id))
+
+def abandon_refresh_runs():
+    """
+    Mark runs left 'running' by a worker that died as abandoned. Only
+    called by the lease holder, so no other run can still be in progress.
+    """
+    with writer() as conn:
+        conn.execute("UPDATE refresh_run_sources SET status = 'abandoned' WHERE status = 'running'")
+        conn.execute("UPDATE refresh_runs SET status = 'abandoned' WHERE status = 'running'")
+
+def get_refresh_runs(limit=10):
+    """The most recent refresh runs, newest first, with each source's progress"""
+    cursor = get_read_connection().cursor()
+    cursor.execute('''
+        SELECT id, mode, owner, status, started_at, finished_at, seconds
+        FROM refresh_runs ORDER BY id DESC LIMIT ?
+    ''', (limit,))
+    runs = [{
+        'id': row[0],
+        'mode': row[1],
+        'owner': row[2],
+        'status': row[3],
+        'started_at': row[4],
+        'finished_at': row[5],
+        'seconds': row[6],
+        'sources': []
+    } for row in cursor.fetchall()]
+    
+    by_id = {run['id']: run for run in runs}
+    if by_id:
+        placeholders = ','.join('?' * len(by_id))
+        cursor.execute(f'''
+            SELECT run_id, source, status, started_at, finished_at, seconds
+            FROM refresh_run_sources WHERE run_id IN ({placeholders})
+            ORDER BY started_at, source
+        ''', list(by_id))
+        for run_id, source, status, started_at, finished_at, seconds in cursor.fetchall():
+            by_id[run_id]['sources'].append({
+                'source': source,
+                'status': status,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'seconds': seconds
+            })
+    return runs
+
@@ -0,0 +1,91 @@
+"""
+Refresh worker: the one process that writes fetched data to the database.
+
+Runs the nightly refresh on its own, outside the web server, so ingest
+never competes with requests for a web worker's GIL. Every refresh is
+taken under the refresh lease, so however many workers are started
+against the same database (one per container, say) exactly one refreshes;
+the others stand by and take over if it dies.
+
+Usage:
+    python refresh_worker.py            # daily refresh at 2 AM CST
+    python refresh_worker.py --once     # one 90-day refresh, then exit
+    python refresh_worker.py --full     # fetch all history, then exit
+    python refresh_worker.py --full --resume  # continue an interrupted --full
+    python refresh_worker.py --status   # recent refresh runs
+"""
+
+import sys
+import time
+from config import REFRESH_LEASE_SECONDS
+from database import init_database, get_last_fetch_info
+from refresh_status import RefreshLease, abandon_refresh_runs, get_refresh_runs
+from scheduler import scheduled_refresh, full_refresh, run_scheduler, warm_caches
+
+def refresh_once(full=False, resume=False):
+    """
+    Run one refresh under the lease; with resume, a full refresh continues
+    from its checkpoints. Returns False without refreshing if another
+    worker holds the lease.
+    """
+    lease = RefreshLease()
+    if not lease.acquire():
+        print(f"Refresh lease is held by {lease.holder()}; not refreshing")
+        return False
+    
+    try:
+        abandon_refresh_runs()
+        if full:
+            full_refresh(resume)
+        else:
+            scheduled_refresh()
+    finally:
+        lease.release()
+    return True
+
+def serve():
+    """
+    Stand by until the lease is free, then run the daily schedule for as
+    long as the lease is held
+    """
+    lease = RefreshLease()
+    while True:
+        if not lease.acquire():
+            time.sleep(REFRESH_LEASE_SECONDS / 2)
+            continue
+        
+        print(f"Refresh worker {lease.owner} holds the refresh lease")
+        abandon_refresh_runs()
+        
+        # Nothing fetched yet (e.g. a new volume): don't wait for 2 AM.
+        # Otherwise store the shared results now, so web workers don't each
+        # compute their own if none are stored (e.g. after an upgrade)
+        if get_last_fetch_info() is None:
+            scheduled_refresh()
+        else:
+            warm_caches()
+        
+        run_scheduler(stop=lease.lost)
+        
+        # Stalled past the lease and another worker took over; stand by
+        lease.release()
+
+def print_status():
+    for run in get_refresh_runs():
+        seconds = f"{run['seconds']:.1f}s" if run['seconds'] is not None else '-'
+        print(f"#{run['id']} {run['mode']} {run['status']} started {run['started_at']} "
+              f"({seconds}) by {run['owner']}")
+        for source in run['sources']:
+            seconds = f"{source['seconds']:.1f}s" if source['seconds'] is not None else '-'
+            print(f"    {source['source']:<18} {source['status']:<10} {seconds}")
+
+if __name__ == "__main__":
+    init_database()
+    
+    if '--status' in sys.argv:
+        print_status()
+    elif '--full' in sys.argv or '--once' in sys.argv:
+        sys.exit(0 if refresh_once(full='--full' in sys.argv, resume='--resume' in sys.argv) else 1)
+    else:
+        serve()
+
@@ -0,0 +1,102 @@
+import pickle
+import sqlite3
+import threading
+import time
+from connections import get_read_connection, writer
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+def init_result_cache():
+    """Create the shared result cache table if it doesn't exist"""
+    with writer() as conn:
+        cursor = conn.cursor()
+        
+        # Tables from when web workers claimed and stored results themselves
+        # hold only cached values, so they are simply replaced
+        cursor.execute("SELECT 1 FROM pragma_table_info('result_cache') WHERE name = 'claimed_at'")
+        if cursor.fetchone():
+            cursor.execute('DROP TABLE result_cache')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS result_cache (
+                name TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (name, version)
+            )
+        ''')
+
+def cached_result(name, version, compute):
+    """
+    Return the result for the given data version, shared by every worker
+    process through the database.
+    
+    Results live in an in-process memo and in the result_cache table,
+    which only the refresh worker writes (see store_result), once per
+    finished refresh. Web workers only read it, and until the refresh
+    worker has stored the result for a new version they keep serving the
+    newest stored one. compute() is only called by a worker that finds
+    nothing stored at all, e.g. before the first refresh has finished.
+    """
+    with _memo_lock:
+        hit = _memo.get(name)
+    if hit and hit[0] == version:
+        return hit[1]
+    
+    stored = _load(name, version)
+    if stored is not None:
+        stored_version, payload = stored
+        if hit and hit[0] == stored_version:
+            return hit[1]
+        return _remember(name, stored_version, pickle.loads(payload))
+    return _remember(name, version, compute())
+
+def store_result(name, version, compute):
+    """
+    Compute a result and store it in result_cache for every worker,
+    dropping older versions of name. Called by the refresh worker only.
+    """
+    value = compute()
+    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    with writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO result_cache (name, version, payload, stored_at)
+            VALUES (?, ?, ?, ?)
+        ''', (name, version, payload, time.time()))
+        cursor.execute('DELETE FROM result_cache WHERE name = ? AND version < ?',
+                       (name, version))
+    return _remember(name, version, value)
+
+def memoized(name, version, compute):
+    """
+    Return compute() for the given data version, cached in this process
+    only. For results cheap enough that every worker may compute its own.
+    """
+    with _memo_lock:
+        hit = _memo.get(name)
+    if hit and hit[0] == version:
+        return hit[1]
+    return _remember(name, version, compute())
+
+def _remember(name, version, value):
+    with _memo_lock:
+        _memo[name] = (version, value)
+    return value
+
+def _load(name, version):
+    """(version, payload) of the newest result stored for name up to version, or None"""
+    cursor = get_read_connection().cursor()
+    try:
+        cursor.execute('''
+            SELECT version, payload FROM result_cache
+            WHERE name = ? AND version <= ?
+            ORDER BY version DESC LIMIT 1
+        ''', (name, version))
+    except sqlite3.OperationalError:
+        # No table until the refresh worker has initialized the database
+        return None
+    return cursor.fetchone()
+
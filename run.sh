@@ -4,11 +4,22 @@
 source venv/bin/activate
 
 # Check for --refresh flag
+# (--refresh --resume continues an interrupted refresh)
 if [ "$1" = "--refresh" ]; then
     echo "Force refreshing database..."
-    python app.py --refresh
-else
-    # Run the Flask application normally
-    echo "Starting San Antonio Crime Dashboard..."
-    python app.py
-fi
\ No newline at end of file
+    python refresh_worker.py --full $2
+fi
+
+# Daily refreshes run in their own process so ingest never slows the web server,
+# restarted if it exits; everything started here is stopped with the app
+(while true; do
+    python refresh_worker.py
+    echo "Refresh worker exited with status $?, restarting in 10s"
+    sleep 10
+done) &
+REFRESH_LOOP_PID=$!
+trap 'pkill -P $REFRESH_LOOP_PID; kill $REFRESH_LOOP_PID 2>/dev/null' EXIT
+
+# Run the Flask application
+echo "Starting San Antonio Crime Dashboard..."
+python app.py
\ No newline at end of file
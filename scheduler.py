@@ -4,6 +4,9 @@ from datetime import datetime
 from fetch_data import refresh_crime_data
 from fetch_arrests import refresh_arrests_data
 from fetch_calls import refresh_calls_data
+from fetch_engine import run_concurrently, UP_TO_DATE
+from insights import warm_multi_period_insights
+from refresh_status import start_refresh_run, record_refresh_source, finish_refresh_run
 import threading
 import pytz
 
@@ -13,40 +16,101 @@ CST = pytz.timezone('America/Chicago')
 def scheduled_refresh():
     current_time = datetime.now(CST).strftime('%I:%M %p CST')
     print(f"Starting scheduled refresh at {current_time}")
-    try:
-        # Refresh crime data (90 days)
-        refresh_crime_data(90)
-        print("Crime data refresh completed successfully")
-        
-        # Refresh arrests data (90 days)
-        refresh_arrests_data(90)
-        print("Arrests data refresh completed successfully")
-        
-        # Refresh calls for service data (90 days)
-        refresh_calls_data(90)
-        print("Calls for service data refresh completed successfully")
-        
+    # Refresh all three sources (90 days) concurrently; the fetch engine's
+    # shared budget keeps the combined request rate polite
+    results = run_refresh('daily', [
+        ('crime', lambda: refresh_crime_data(90)),
+        ('arrests', lambda: refresh_arrests_data(90)),
+        ('calls for service', lambda: refresh_calls_data(90)),
+    ])
+    
+    for label, result in results.items():
+        if result == UP_TO_DATE:
+            print(f"{label.capitalize()} data was already up to date")
+        elif result:
+            print(f"{label.capitalize()} data refresh completed successfully")
+    
+    if all(results.values()):
         print("All scheduled refreshes completed successfully")
+
+def full_refresh(resume=False):
+    """
+    Fetches ALL available data from all three sources.
+    Used by --refresh to populate the entire database; with resume, each
+    source continues from the checkpoint of an interrupted full refresh.
+    """
+    # Fetch ALL data from the three sources concurrently
+    results = run_refresh('resume' if resume else 'full', [
+        ('crime', lambda: refresh_crime_data(fetch_all=True, resume=resume)),
+        ('arrests', lambda: refresh_arrests_data(fetch_all=True, resume=resume)),
+        ('calls for service', lambda: refresh_calls_data(fetch_all=True, resume=resume)),
+    ])
+    
+    for label, result in results.items():
+        if result:
+            print(f"All {label} data fetched successfully")
+    
+    if all(results.values()):
+        print("\nAll historical data has been fetched successfully!")
+
+def run_refresh(mode, jobs):
+    """
+    Run the (source, callable) refresh jobs concurrently, recording the run
+    and each source's status and timing in refresh_runs and
+    refresh_run_sources as they finish, then warm the caches.
+    Returns run_concurrently's results.
+    """
+    run_id = start_refresh_run(mode)
+    started = time.monotonic()
+    
+    def tracked(source, job):
+        def run():
+            record_refresh_source(run_id, source, 'running')
+            source_started = time.monotonic()
+            status = 'failed'
+            try:
+                result = job()
+                # Stopping at the watermark with nothing new is a success
+                status = 'up to date' if result == UP_TO_DATE else 'succeeded' if result else 'no data'
+                return result
+            finally:
+                record_refresh_source(run_id, source, status, time.monotonic() - source_started)
+        return run
+    
+    results = run_concurrently([(source, tracked(source, job)) for source, job in jobs])
+    
+    # Up-to-date sources count as succeeded; raised or 'no data' ones fail the run
+    status = 'succeeded' if all(results.values()) else 'failed'
+    finish_refresh_run(run_id, status, time.monotonic() - started)
+    
+    warm_caches()
+    return results
+
+def warm_caches():
+    """
+    Recompute the shared per-data-version results right after a refresh
+    and store them for the web workers, which only read them, so the
+    first page view doesn't pay for them
+    """
+    try:
+        warm_multi_period_insights()
+        print("Insights cache warmed")
     except Exception as e:
-        print(f"Error during scheduled refresh: {e}")
+        print(f"Error warming caches: {e}")
 
-def run_scheduler():
+def run_scheduler(stop=None):
+    """
+    Run the daily refresh at 2 AM CST until stop (a threading.Event) is set.
+    Only called by the refresh worker holding the refresh lease.
+    """
+    stop = stop or threading.Event()
+    
     # Schedule daily refresh at 2 AM CST
+    schedule.clear()
     schedule.every().day.at("02:00").do(scheduled_refresh)
     
     print("Scheduler started. Will refresh data daily at 2:00 AM CST")
     
-    while True:
+    while not stop.is_set():
         schedule.run_pending()
-        time.sleep(60)  # Check every minute
-
-def start_scheduler_thread():
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    print("Background scheduler thread started")
-
-if __name__ == "__main__":
-    # Test the scheduler
-    print("Testing scheduler - will run refresh immediately and then wait for scheduled time")
-    scheduled_refresh()
-    run_scheduler()
\ No newline at end of file
+        stop.wait(60)  # Check every minute
\ No newline at end of file
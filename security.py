@@ -5,42 +5,158 @@ import secrets
 from functools import wraps
 from datetime import datetime, timedelta
 from flask import request, jsonify, current_app
-from collections import defaultdict
+import sqlite3
+import threading
 import time
 import ipaddress
+from config import RATE_LIMIT_DB_PATH, RATE_LIMIT_MAX_CLIENTS
 
 class RateLimiter:
-    """Simple in-memory rate limiter"""
-    def __init__(self):
-        self.requests = defaultdict(list)
-        self.blocked_ips = {}
+    """
+    Sliding-window rate limiter shared by every worker process on the host.
+    
+    Each identifier keeps two counters (the current and previous fixed
+    window) in a small SQLite database in WAL mode, so memory per client
+    is constant and all gunicorn workers enforce one combined limit.
+    Each check is a single UPSERT, so the write lock is held for one
+    statement rather than a read-decide-write round trip. Identifiers idle
+    for longer than IDLE_TTL are evicted, and the table is capped at
+    RATE_LIMIT_MAX_CLIENTS identifiers, dropping the least recently seen
+    first.
+    """
+    # Seconds an identifier stays blocked after exceeding its limit
+    BLOCK_DURATION = 300
+    # Seconds without a request before an identifier's counters are dropped
+    IDLE_TTL = 600
+    # Run the eviction sweep on roughly one check in this many
+    SWEEP_EVERY = 1000
+    
+    # A stored row's counters rolled forward to :window_start, for the UPSERT
+    # in _check: the current window becomes the previous one, or both reset
+    # after a gap
+    ROLLED_CURRENT = "CASE window_start WHEN :window_start THEN current_count ELSE 0 END"
+    ROLLED_PREVIOUS = ("CASE window_start WHEN :window_start THEN previous_count "
+                       "WHEN :window_start - :window THEN current_count ELSE 0 END")
+    # Previous window weighted by its overlap with the sliding window, plus the current one
+    OVER_LIMIT = f"({ROLLED_PREVIOUS} * :overlap + {ROLLED_CURRENT} >= :max_requests)"
+    
+    def __init__(self, db_path=RATE_LIMIT_DB_PATH, max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.db_path = db_path
+        self.max_clients = max_clients
+        self._local = threading.local()
+        self._checks = 0
+        self._checks_lock = threading.Lock()
+    
+    def _connection(self):
+        """Per-thread connection, re-opened after a fork"""
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    identifier TEXT NOT NULL,
+                    window INTEGER NOT NULL,
+                    window_start INTEGER NOT NULL,
+                    current_count INTEGER NOT NULL,
+                    previous_count INTEGER NOT NULL,
+                    blocked_until REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    PRIMARY KEY (identifier, window)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limits_last_seen ON rate_limits(last_seen)')
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
     
     def is_allowed(self, identifier, max_requests=60, window=60):
         """Check if request is allowed within rate limit"""
         now = time.time()
+        # API keys are part of some identifiers; never store them in the clear
+        key = hashlib.sha256(identifier.encode()).hexdigest()[:32]
+        window_start = int(now // window) * window
         
-        # Check if IP is temporarily blocked
-        if identifier in self.blocked_ips:
-            if now < self.blocked_ips[identifier]:
-                return False, "IP temporarily blocked due to rate limit violations"
-            else:
-                del self.blocked_ips[identifier]
-        
-        # Clean old requests
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier] 
-            if req_time > now - window
-        ]
-        
-        # Check rate limit
-        if len(self.requests[identifier]) >= max_requests:
-            # Block IP for 5 minutes after violation
-            self.blocked_ips[identifier] = now + 300
-            return False, f"Rate limit exceeded: {max_requests} requests per {window} seconds"
+        try:
+            conn = self._connection()
+            allowed, message = self._check(conn, key, now, max_requests, window, window_start)
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter store must not take the site down
+            print(f"Rate limiter unavailable: {e}")
+            return True, None
         
-        # Add current request
-        self.requests[identifier].append(now)
+        with self._checks_lock:
+            self._checks += 1
+            sweep = self._checks % self.SWEEP_EVERY == 0
+        if sweep:
+            self.evict_idle()
+        
+        return allowed, message
+    
+    def _check(self, conn, key, now, max_requests, window, window_start):
+        """
+        Count one request and return (allowed, message). The request is
+        refused if the identifier is blocked, and blocks it if OVER_LIMIT.
+        """
+        new_block = now + self.BLOCK_DURATION
+        blocked_until, = conn.execute(f'''
+            INSERT INTO rate_limits
+            (identifier, window, window_start, current_count, previous_count, blocked_until, last_seen)
+            VALUES (:key, :window, :window_start, :first, 0, :first_block, :now)
+            ON CONFLICT (identifier, window) DO UPDATE SET
+                current_count = CASE WHEN blocked_until > :now OR {self.OVER_LIMIT}
+                                     THEN {self.ROLLED_CURRENT} ELSE {self.ROLLED_CURRENT} + 1 END,
+                previous_count = {self.ROLLED_PREVIOUS},
+                blocked_until = CASE WHEN blocked_until > :now THEN blocked_until
+                                     WHEN {self.OVER_LIMIT} THEN :new_block
+                                     ELSE blocked_until END,
+                window_start = :window_start,
+                last_seen = :now
+            RETURNING blocked_until
+        ''', {
+            'key': key, 'window': window, 'window_start': window_start, 'now': now,
+            'max_requests': max_requests, 'new_block': new_block,
+            # Weight of the previous window: how much of it still overlaps the sliding window
+            'overlap': (window_start + window - now) / window,
+            # A first request counts unless the limit is zero
+            'first': 1 if max_requests > 0 else 0,
+            'first_block': 0 if max_requests > 0 else new_block,
+        }).fetchone()
+        
+        if blocked_until == new_block:
+            # Block for 5 minutes after violation
+            return False, f"Rate limit exceeded: {max_requests} requests per {window} seconds"
+        if now < blocked_until:
+            return False, "IP temporarily blocked due to rate limit violations"
         return True, None
+    
+    def evict_idle(self):
+        """Drop idle identifiers, then the least recently seen beyond max_clients"""
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('''
+                    DELETE FROM rate_limits WHERE last_seen < ? AND blocked_until < ?
+                ''', (now - self.IDLE_TTL, now))
+                # Each identifier has a row per window size, so cap identifiers, not rows
+                conn.execute('''
+                    DELETE FROM rate_limits WHERE identifier IN (
+                        SELECT identifier FROM rate_limits
+                        GROUP BY identifier
+                        ORDER BY MAX(last_seen) DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_clients,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"Rate limiter eviction failed: {e}")
 
 class APIKeyManager:
     """Manage API keys securely"""
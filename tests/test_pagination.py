@@ -0,0 +1,36 @@
+import base64
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pagination import encode_cursor, decode_cursor
+
+def token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+class DecodeCursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(('2024-01-05', 'SAPD-1'))), ['2024-01-05', 'SAPD-1'])
+    
+    def test_missing_or_not_base64_json(self):
+        self.assertIsNone(decode_cursor(None))
+        self.assertIsNone(decode_cursor(''))
+        self.assertIsNone(decode_cursor('not a cursor!'))
+    
+    def test_wrong_shape(self):
+        self.assertIsNone(decode_cursor(token({'a': 1})))
+        self.assertIsNone(decode_cursor(token(['2024-01-05'])))
+        self.assertIsNone(decode_cursor(token(['2024-01-05', 'SAPD-1', 3])))
+    
+    def test_values_that_cannot_be_bound(self):
+        # W3t9LHt9XQ is [{}, {}], which used to reach the query and fail with a 500
+        self.assertIsNone(decode_cursor('W3t9LHt9XQ'))
+        self.assertIsNone(decode_cursor(token([[1], 'SAPD-1'])))
+        self.assertIsNone(decode_cursor(token(['2024-01-05', {'id': 1}])))
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 # US-Based Crime Severity Weights using Federal Sentencing Guidelines
 # Based on US Sentencing Commission Guidelines Manual
 # Weights represent days of imprisonment based on offense levels
@@ -96,10 +98,12 @@ US_CRIME_WEIGHTS = {
     'TRAFFIC VIOLATIONS': 7,  # Level 4
 }
 
+@lru_cache(maxsize=None)
 def get_us_crime_weight(crime_type):
     """
     Get the severity weight for a specific crime type based on Federal Sentencing Guidelines.
     Returns a default weight if crime type not found.
+    Results are memoized since the partial-match scan below is linear in the table.
     """
     # Convert to uppercase for matching
     crime_upper = crime_type.upper().strip()
@@ -147,6 +151,7 @@ def calculate_violent_crime_multiplier(crime_against):
         return 1.25  # 25% enhancement for crimes against persons
     return 1.0
 
+@lru_cache(maxsize=None)
 def get_us_weighted_severity(crime_type, crime_against=None):
     """
     Calculate the final weighted severity score using US Federal Sentencing Guidelines.
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import threading
+
+# Statewide ZCTA boundaries, as downloaded
+SOURCE_PATH = 'static/texas_zip_codes.geojson'
+
+# Bexar-area subset derived from SOURCE_PATH by build_zip_geometry()
+CACHE_PATH = 'static/bexar_zip_codes.geojson'
+
+# (west, south, east, north) around Bexar County with a margin for
+# zips that straddle the county line
+BEXAR_BOUNDS = (-98.95, 28.95, -97.95, 29.95)
+
+# Douglas-Peucker tolerance in degrees. The dashboard map is fixed at zoom
+# 10, where one pixel is about 0.0014 degrees, so this is sub-pixel.
+SIMPLIFY_TOLERANCE = 0.0005
+
+# Coordinates are rounded to this many decimals (about 1 m)
+COORDINATE_PRECISION = 5
+
+# Grid size for TopoJSON quantization; ample for the zoom-10 dashboard map
+TOPOLOGY_QUANTIZATION = 10000
+
+_features = None
+_features_lock = threading.Lock()
+_topology = None
+
+def _simplify_ring(ring, tolerance):
+    """Douglas-Peucker simplification of a closed ring"""
+    if len(ring) <= 4:
+        return ring
+    
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = ring[first][:2]
+        x2, y2 = ring[last][:2]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+        
+        max_dist_sq = 0
+        index = None
+        for i in range(first + 1, last):
+            x, y = ring[i][:2]
+            if length_sq == 0:
+                dist_sq = (x - x1) ** 2 + (y - y1) ** 2
+            else:
+                # Distance to the segment, clamped to its endpoints
+                t = max(0, min(1, ((x - x1) * dx + (y - y1) * dy) / length_sq))
+                dist_sq = (x - x1 - t * dx) ** 2 + (y - y1 - t * dy) ** 2
+            if dist_sq > max_dist_sq:
+                max_dist_sq = dist_sq
+                index = i
+        
+        if index is not None and max_dist_sq > tolerance * tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    
+    return [point for point, kept in zip(ring, keep) if kept]
+
+def _simplify_polygon(rings, tolerance):
+    simplified = []
+    for position, ring in enumerate(rings):
+        points = [[round(x, COORDINATE_PRECISION), round(y, COORDINATE_PRECISION)]
+                  for x, y in (point[:2] for point in ring)]
+        points = _simplify_ring(points, tolerance)
+        if len(points) >= 4:
+            simplified.append(points)
+        elif position == 0:
+            # Never drop the outer ring, even if it collapses at this tolerance
+            return None
+    return simplified
+
+def _simplify_geometry(geometry, tolerance):
+    if geometry['type'] == 'Polygon':
+        rings = _simplify_polygon(geometry['coordinates'], tolerance)
+        coordinates = rings if rings else geometry['coordinates']
+        return {'type': 'Polygon', 'coordinates': coordinates}
+    
+    polygons = []
+    for polygon in geometry['coordinates']:
+        rings = _simplify_polygon(polygon, tolerance)
+        polygons.append(rings if rings else polygon)
+    return {'type': 'MultiPolygon', 'coordinates': polygons}
+
+def _bounds(geometry):
+    polygons = geometry['coordinates']
+    if geometry['type'] == 'Polygon':
+        polygons = [polygons]
+    xs = [point[0] for polygon in polygons for ring in polygon for point in ring]
+    ys = [point[1] for polygon in polygons for ring in polygon for point in ring]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def _in_bexar_area(geometry):
+    west, south, east, north = _bounds(geometry)
+    area_west, area_south, area_east, area_north = BEXAR_BOUNDS
+    return west <= area_east and east >= area_west and south <= area_north and north >= area_south
+
+def _build_settings():
+    return {
+        'bounds': list(BEXAR_BOUNDS),
+        'tolerance': SIMPLIFY_TOLERANCE,
+        'precision': COORDINATE_PRECISION
+    }
+
+def build_zip_geometry(source_path=SOURCE_PATH, cache_path=CACHE_PATH):
+    """
+    Extract the Bexar-area zips from the statewide GeoJSON, simplify them
+    for the dashboard map and write the result to cache_path.
+    Returns the extracted FeatureCollection.
+    """
+    print(f"Building zip geometry from {source_path}...")
+    with open(source_path) as f:
+        geojson_data = json.load(f)
+    
+    features = []
+    for feature in geojson_data['features']:
+        geometry = feature.get('geometry')
+        if not geometry or geometry['type'] not in ('Polygon', 'MultiPolygon'):
+            continue
+        if not _in_bexar_area(geometry):
+            continue
+        features.append({
+            'type': 'Feature',
+            'properties': {'ZCTA5CE10': feature['properties']['ZCTA5CE10']},
+            'geometry': _simplify_geometry(geometry, SIMPLIFY_TOLERANCE)
+        })
+    
+    collection = {
+        'type': 'FeatureCollection',
+        'settings': _build_settings(),
+        'features': features
+    }
+    
+    # Write atomically so concurrent workers never read a partial file
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(collection, f, separators=(',', ':'))
+    os.replace(temp_path, cache_path)
+    
+    print(f"Wrote {len(features)} zip code boundaries to {cache_path}")
+    return collection
+
+def _load_cached_geometry():
+    """Returns the cached subset if it is current, otherwise None"""
+    if not os.path.exists(CACHE_PATH):
+        return None
+    if os.path.exists(SOURCE_PATH) and os.path.getmtime(SOURCE_PATH) > os.path.getmtime(CACHE_PATH):
+        return None
+    
+    with open(CACHE_PATH) as f:
+        collection = json.load(f)
+    if collection.get('settings') != _build_settings():
+        return None
+    return collection
+
+def get_zip_features():
+    """
+    Returns {zip_code: (position, feature)} for the Bexar-area zips, loading
+    the preprocessed file once per process and building it on first use.
+    """
+    global _features
+    if _features is None:
+        with _features_lock:
+            if _features is None:
+                collection = _load_cached_geometry() or build_zip_geometry()
+                _features = {
+                    feature['properties']['ZCTA5CE10']: (position, feature)
+                    for position, feature in enumerate(collection['features'])
+                }
+    return _features
+
+def _polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    return geometry['coordinates']
+
+def build_zip_topology(features):
+    """
+    Encode features as TopoJSON with quantized, delta-encoded arcs.
+    Each ring becomes its own arc; geometry ids are the zip codes.
+    """
+    points = [point for feature in features
+              for polygon in _polygons(feature['geometry'])
+              for ring in polygon for point in ring]
+    west = min(point[0] for point in points)
+    south = min(point[1] for point in points)
+    east = max(point[0] for point in points)
+    north = max(point[1] for point in points)
+    scale_x = (east - west) / (TOPOLOGY_QUANTIZATION - 1) or 1
+    scale_y = (north - south) / (TOPOLOGY_QUANTIZATION - 1) or 1
+    
+    arcs = []
+    
+    def encode_ring(ring):
+        quantized = []
+        for x, y in (point[:2] for point in ring):
+            point = (round((x - west) / scale_x), round((y - south) / scale_y))
+            # Neighbouring points often land in the same grid cell
+            if not quantized or point != quantized[-1]:
+                quantized.append(point)
+        if len(quantized) < 4:
+            return None
+        
+        arc = [list(quantized[0])]
+        for (x0, y0), (x1, y1) in zip(quantized, quantized[1:]):
+            arc.append([x1 - x0, y1 - y0])
+        arcs.append(arc)
+        return [len(arcs) - 1]
+    
+    geometries = []
+    for feature in features:
+        polygons = []
+        for polygon in _polygons(feature['geometry']):
+            rings = [encode_ring(ring) for ring in polygon]
+            if rings and rings[0] is not None:
+                polygons.append([ring for ring in rings if ring is not None])
+        if not polygons:
+            continue
+        
+        geometry = {'id': feature['properties']['ZCTA5CE10']}
+        if len(polygons) == 1:
+            geometry.update(type='Polygon', arcs=polygons[0])
+        else:
+            geometry.update(type='MultiPolygon', arcs=polygons)
+        geometries.append(geometry)
+    
+    return {
+        'type': 'Topology',
+        'bbox': [west, south, east, north],
+        'transform': {'scale': [scale_x, scale_y], 'translate': [west, south]},
+        'objects': {'zips': {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs
+    }
+
+def get_zip_topology():
+    """
+    Returns (body, etag) for the Bexar-area zips as serialized TopoJSON.
+    Built and serialized once per process; the etag changes only when
+    the geometry does.
+    """
+    global _topology
+    if _topology is None:
+        features = [feature for _, feature in sorted(get_zip_features().values(),
+                                                     key=lambda item: item[0])]
+        body = json.dumps(build_zip_topology(features), separators=(',', ':')).encode()
+        _topology = (body, hashlib.sha256(body).hexdigest()[:16])
+    return _topology
+
+if __name__ == "__main__":
+    build_zip_geometry()